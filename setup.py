@@ -33,6 +33,12 @@ nfelib_require = [
 mdfelib_require = [
     "mdfelib",
 ]
+aiohttp_require = [
+    "aiohttp",
+]
+parquet_require = [
+    "pyarrow",
+]
 
 
 def read(*names, **kwargs):
@@ -104,6 +110,8 @@ setup(
         "nfselib.issnet": nfselib_issnet_require,
         "nfelib": nfelib_require,
         "mdfelib": mdfelib_require,
+        "aiohttp": aiohttp_require,
+        "parquet": parquet_require,
     },
     setup_requires=[],
     entry_points={
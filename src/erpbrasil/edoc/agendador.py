@@ -0,0 +1,202 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import collections
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+_logger = logging.getLogger(__name__)
+
+
+class Recibo:
+    """Recibo (nRec da NF-e/MDF-e ou Protocolo da NFS-e) acompanhado pelo
+    AgendadorRecibos.
+
+    Ao final do processamento ``proc_recibo`` contém o retorno da última
+    consulta, já com o processo montado (monta_processo), ou ``erro`` a
+    exceção ocorrida na consulta (CancelledError quando o agendador é
+    encerrado antes da conclusão).
+    """
+
+    def __init__(self, documento, proc_envio, edoc=None, callback=None):
+        self.documento = documento
+        self.proc_envio = proc_envio
+        self.edoc = edoc
+        self.callback = callback
+        self.tentativa = 0
+        self.proc_recibo = None
+        self.erro = None
+        self.concluido = threading.Event()
+
+    def resultado(self, timeout=None):
+        """Aguarda o fim do processamento e retorna o proc_recibo."""
+        if not self.concluido.wait(timeout):
+            raise TimeoutError("Recibo ainda em processamento")
+        if self.erro is not None:
+            raise self.erro
+        return self.proc_recibo
+
+
+class AgendadorRecibos:
+    """Consulta os recibos de vários envios assíncronos sem bloquear uma
+    thread por envio.
+
+    Os recibos ficam em um heap ordenado pelo momento da próxima consulta,
+    calculado a partir do tempo médio de processamento (_tempo_espera do
+    documento). Uma única thread aguarda o próximo vencimento e entrega a
+    consulta (consulta_recibo) a um pool com ``threads`` threads. Enquanto o
+    lote estiver em processamento a consulta é reagendada, até o limite de
+    '_maximo_tentativas_consulta_recibo' do documento.
+
+    Os recibos concluídos são entregues ao ``callback`` informado em
+    ``agendar`` (executado na thread da consulta) ou, sem callback, pelo
+    iterador ``concluidos``::
+
+        agendador = AgendadorRecibos()
+        for edoc in edocs:
+            proc_envio = nfe.envia_documento(edoc)
+            agendador.agendar(nfe, proc_envio, edoc)
+        for recibo in agendador.concluidos():
+            # seu código aqui
+    """
+
+    def __init__(self, threads=4, relogio=time.monotonic):
+        self.relogio = relogio
+        self._heap = []
+        self._sequencia = itertools.count()
+        self._condicao = threading.Condition()
+        self._executor = ThreadPoolExecutor(threads)
+        self._concluidos = collections.deque()
+        self._condicao_concluidos = threading.Condition()
+        self._pendentes = 0
+        self._fechado = False
+        self._thread = None
+
+    def __len__(self):
+        return self._pendentes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+    def agendar(self, documento, proc_envio, edoc=None, callback=None):
+        """Agenda a consulta ao recibo do envio.
+
+        :param documento: NFe, MDFe, NFSe... utilizado no envio
+        :param proc_envio: retorno do envio assíncrono
+        :param edoc: documento enviado, repassado ao monta_processo
+        :param callback: função chamada com o Recibo ao fim do processamento
+        :return: Recibo
+        """
+        recibo = Recibo(documento, proc_envio, edoc, callback)
+        with self._condicao:
+            if self._fechado:
+                raise RuntimeError("Agendador encerrado")
+            self._pendentes += 1
+            self._agendar(recibo)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._executar, name="AgendadorRecibos", daemon=True
+                )
+                self._thread.start()
+        return recibo
+
+    def _agendar(self, recibo):
+        vencimento = self.relogio() + recibo.documento._tempo_espera(recibo.proc_envio)
+        heapq.heappush(self._heap, (vencimento, next(self._sequencia), recibo))
+        self._condicao.notify()
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                while not self._fechado:
+                    if self._heap:
+                        espera = self._heap[0][0] - self.relogio()
+                        if espera <= 0:
+                            break
+                        self._condicao.wait(espera)
+                    else:
+                        self._condicao.wait()
+                if self._fechado:
+                    return
+                recibo = heapq.heappop(self._heap)[2]
+                # Submetido com a condição adquirida: fechar() só encerra o
+                # executor depois de marcar o agendador como fechado
+                self._executor.submit(self._consultar, recibo)
+
+    def _consultar(self, recibo):
+        documento = recibo.documento
+        try:
+            proc_recibo = documento.consulta_recibo(proc_envio=recibo.proc_envio)
+            if (
+                proc_recibo.resposta
+                and documento._edoc_situacao_em_processamento(proc_recibo)
+                and recibo.tentativa < documento._maximo_tentativas_consulta_recibo
+            ):
+                with self._condicao:
+                    if not self._fechado:
+                        recibo.tentativa += 1
+                        self._agendar(recibo)
+                        return
+                raise CancelledError("Agendador encerrado")
+            if proc_recibo.resposta:
+                documento.monta_processo(recibo.edoc, recibo.proc_envio, proc_recibo)
+            recibo.proc_recibo = proc_recibo
+        except CancelledError as erro:
+            recibo.erro = erro
+        except Exception as erro:
+            _logger.warning("Falha na consulta ao recibo: %s", erro)
+            recibo.erro = erro
+        self._concluir(recibo)
+
+    def _concluir(self, recibo):
+        recibo.concluido.set()
+        if recibo.callback is not None:
+            try:
+                recibo.callback(recibo)
+            except Exception:
+                _logger.exception("Erro no callback do recibo")
+        with self._condicao_concluidos:
+            if recibo.callback is None:
+                self._concluidos.append(recibo)
+            with self._condicao:
+                self._pendentes -= 1
+            self._condicao_concluidos.notify_all()
+
+    def concluidos(self, timeout=None):
+        """Itera sobre os recibos concluídos (sem callback), na ordem em que
+        terminam, até que não haja recibos pendentes.
+
+        :param timeout: tempo máximo de espera por cada recibo
+        """
+        while True:
+            with self._condicao_concluidos:
+                if not self._condicao_concluidos.wait_for(
+                    lambda: self._concluidos or not self._pendentes, timeout
+                ):
+                    raise TimeoutError("Nenhum recibo concluído no tempo limite")
+                if not self._concluidos:
+                    return
+                recibo = self._concluidos.popleft()
+            yield recibo
+
+    def fechar(self):
+        """Encerra o agendador. Os recibos ainda não consultados, ou que
+        seriam consultados novamente, são concluídos com ``erro``
+        CancelledError.
+        """
+        with self._condicao:
+            self._fechado = True
+            cancelados = [recibo for _, _, recibo in self._heap]
+            self._heap.clear()
+            self._condicao.notify_all()
+        self._executor.shutdown()
+        for recibo in cancelados:
+            recibo.erro = CancelledError("Agendador encerrado")
+            self._concluir(recibo)
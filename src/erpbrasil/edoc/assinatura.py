@@ -0,0 +1,219 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import atexit
+import base64
+import collections
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import signxml
+from lxml import etree
+
+from erpbrasil.assinatura.assinatura import XMLSignerWithSHA1
+from erpbrasil.assinatura.certificado import Certificado
+
+from .pool import impressao_digital
+
+C14N = "http://www.w3.org/TR/2001/REC-xml-c14n-20010315"
+
+
+class _ChaveCertificado:
+    """Chave privada e certificado (PEM) já carregados, no formato aceito
+    pelo signxml."""
+
+    def __init__(self, certificado):
+        self.key = certificado.key
+        self.cert = certificado._cert
+
+
+class _AssinadorXML(XMLSignerWithSHA1):
+    """Assina o próprio elemento recebido. O signxml assina uma cópia, lida
+    novamente do XML serializado, para que o elemento não herde namespaces
+    de um elemento pai; um elemento raiz (sem pai) não tem o que herdar.
+    """
+
+    def get_root(self, data):
+        if isinstance(data, etree._Element) and data.getparent() is None:
+            return data
+        return super().get_root(data)
+
+
+def _assina_elemento(chave, xml, id, getchildren):
+    """Mesma assinatura do Assinatura.assina_xml2, feita no próprio elemento
+    e sem quebras de linha nos valores em base64 da assinatura.
+
+    :return: elemento raiz assinado
+    """
+    if not isinstance(xml, etree._Element):
+        xml = etree.fromstring(xml)
+    for elemento in xml.iter("*"):
+        if elemento.text is not None and not elemento.text.strip():
+            elemento.text = None
+        if elemento.tail is not None and not elemento.tail.strip():
+            elemento.tail = None
+
+    assinador = _AssinadorXML(
+        method=signxml.methods.enveloped,
+        signature_algorithm="rsa-sha1",
+        digest_algorithm="sha1",
+        c14n_algorithm=C14N,
+    )
+    assinador.excise_empty_xmlns_declarations = True
+    assinador.namespaces = {None: signxml.namespaces.ds}
+    raiz = assinador.sign(
+        xml, key=chave.key, cert=chave.cert, reference_uri="#" + id if id else None
+    )
+
+    assinatura = raiz.find(".//{http://www.w3.org/2000/09/xmldsig#}Signature")
+    if assinatura is None:
+        return raiz
+    if id and not getchildren:
+        assinado = raiz.find(".//*[@Id='%s']" % id)
+        if assinado is not None:
+            assinado.getparent().append(assinatura)
+    for elemento in assinatura.iter():
+        if elemento.text:
+            elemento.text = elemento.text.replace("\n", "").replace("\r", "")
+        elemento.tail = None
+    return raiz
+
+
+def _assina(chave, xml, id, getchildren):
+    return etree.tostring(_assina_elemento(chave, xml, id, getchildren), encoding=str)
+
+
+# Chave dos processos do ProcessPoolExecutor, carregada uma única vez na
+# inicialização de cada processo
+_chave_processo = None
+
+
+def _inicializa_processo(arquivo, senha):
+    global _chave_processo
+    certificado = Certificado(base64.b64encode(arquivo), senha, raise_expirado=False)
+    _chave_processo = _ChaveCertificado(certificado)
+
+
+def _assina_processo(xml, id, getchildren):
+    return _assina(_chave_processo, xml, id, getchildren)
+
+
+class ServicoAssinatura:
+    """Assinatura de XML com a chave do certificado carregada uma única vez.
+
+    A assinatura (RSA e canonicalização) é limitada pela CPU e mantém o GIL,
+    por isso os lotes são distribuídos entre ``processos`` processos, cada um
+    com o seu próprio certificado carregado. Lotes com menos de
+    ``minimo_paralelo`` itens, ou quando ``processos`` é 1, são assinados na
+    própria thread.
+
+    :param certificado: erpbrasil.assinatura.certificado
+    :param processos: quantidade de processos, por padrão os.cpu_count()
+    :param minimo_paralelo: tamanho mínimo do lote assinado em paralelo
+    """
+
+    def __init__(self, certificado, processos=None, minimo_paralelo=4):
+        self.certificado = certificado
+        self.processos = processos or os.cpu_count() or 1
+        self.minimo_paralelo = minimo_paralelo
+        self._chave = _ChaveCertificado(certificado)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def assina(self, xml, id, getchildren=False):
+        """Assina o XML (str, bytes ou elemento lxml) na thread atual.
+
+        :return: str com o XML assinado
+        """
+        return _assina(self._chave, xml, id, getchildren)
+
+    def assina_elemento(self, xml, id, getchildren=False):
+        """Assina o XML na thread atual. Um elemento lxml sem pai é assinado
+        e retornado sem cópias.
+
+        :return: elemento raiz assinado
+        """
+        return _assina_elemento(self._chave, xml, id, getchildren)
+
+    def assina_lote(self, itens):
+        """Assina vários XML em paralelo.
+
+        :param itens: lista de tuplas (xml, id) ou (xml, id, getchildren)
+        :return: lista com os XML assinados (str), na ordem recebida
+        """
+        itens = [tuple(item) + (False,) * (3 - len(item)) for item in itens]
+        if self.processos == 1 or len(itens) < max(self.minimo_paralelo, 2):
+            return [self.assina(*item) for item in itens]
+
+        xmls, ids, getchildrens = zip(*itens)
+        xmls = [
+            etree.tostring(xml) if isinstance(xml, etree._Element) else xml
+            for xml in xmls
+        ]
+        return list(
+            self._executor_processos().map(
+                _assina_processo,
+                xmls,
+                ids,
+                getchildrens,
+                chunksize=max(1, len(itens) // (self.processos * 4)),
+            )
+        )
+
+    def _executor_processos(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: o fork de um processo com threads (pool de clientes,
+                # servidores web) pode herdar locks em estado inconsistente
+                self._executor = ProcessPoolExecutor(
+                    self.processos,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_inicializa_processo,
+                    initargs=(self.certificado._arquivo, self.certificado._senha),
+                )
+            return self._executor
+
+    def fechar(self):
+        """Encerra os processos de assinatura."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+# Serviços de assinatura mantidos, pelos certificados utilizados mais
+# recentemente; os excedentes são encerrados
+MAXIMO_SERVICOS_ASSINATURA = 16
+
+_servicos_assinatura = collections.OrderedDict()
+_lock_servicos_assinatura = threading.Lock()
+
+
+def servico_assinatura(certificado):
+    """Retorna o ServicoAssinatura compartilhado do certificado, identificado
+    pela impressão digital."""
+    chave = impressao_digital(certificado)
+    descartados = []
+    with _lock_servicos_assinatura:
+        servico = _servicos_assinatura.get(chave)
+        if servico is None:
+            servico = _servicos_assinatura[chave] = ServicoAssinatura(certificado)
+            while len(_servicos_assinatura) > MAXIMO_SERVICOS_ASSINATURA:
+                descartados.append(_servicos_assinatura.popitem(last=False)[1])
+        else:
+            _servicos_assinatura.move_to_end(chave)
+    for descartado in descartados:
+        descartado.fechar()
+    return servico
+
+
+def encerrar_servicos_assinatura():
+    """Encerra os processos de todos os serviços de assinatura."""
+    with _lock_servicos_assinatura:
+        while _servicos_assinatura:
+            _servicos_assinatura.popitem()[1].fechar()
+
+
+atexit.register(encerrar_servicos_assinatura)
@@ -0,0 +1,131 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import asyncio
+import threading
+import weakref
+from contextlib import suppress
+
+from requests import HTTPError
+from zeep.wsdl.utils import etree_to_string
+
+from .pool import contexto_ssl, impressao_digital
+
+with suppress(ImportError):
+    import aiohttp
+
+
+class RetornoHTTP:
+    """Resposta HTTP da chamada assíncrona, com a mesma interface utilizada
+    do requests.Response (analisar_retorno_raw e zeep).
+    """
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = "utf-8"
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+
+class SessaoAssincrona:
+    """Sessão aiohttp de um certificado, compartilhada pelas chamadas
+    assíncronas aos webservices.
+
+    As mensagens SOAP são montadas pelo mesmo cliente zeep (WSDL) utilizado
+    nas chamadas síncronas; apenas o envio HTTP é assíncrono.
+
+    :param certificado: erpbrasil.assinatura.certificado
+    :param limite_conexoes: número máximo de conexões simultâneas
+    :param timeout: tempo máximo de cada requisição, em segundos
+    """
+
+    def __init__(self, certificado, limite_conexoes=100, timeout=60):
+        self.certificado = certificado
+        self.limite_conexoes = limite_conexoes
+        self.timeout = timeout
+        self._contexto_ssl = contexto_ssl(certificado)
+        self._sessao = None
+
+    @property
+    def sessao(self):
+        if self._sessao is None or self._sessao.closed:
+            self._sessao = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    ssl=self._contexto_ssl, limit=self.limite_conexoes
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._sessao
+
+    async def post(self, url, dados, cabecalhos):
+        async with self.sessao.post(url, data=dados, headers=cabecalhos) as resposta:
+            conteudo = await resposta.read()
+            return RetornoHTTP(
+                str(resposta.url), resposta.status, resposta.headers, conteudo
+            )
+
+    async def enviar(self, cliente, operacao, args, kwargs=None):
+        """Envia a operação do webservice descrito pelo cliente zeep.
+
+        :param args: argumentos posicionais da operação
+        :param kwargs: argumentos nomeados da operação (partes da mensagem,
+            _soapheaders)
+        :return: RetornoHTTP (resposta bruta, como o raw_response do zeep)
+        """
+        binding = cliente.service._binding
+        envelope, cabecalhos = binding._create(
+            operacao, args, kwargs or {}, client=cliente
+        )
+        return await self.post(
+            cliente.service._binding_options["address"],
+            etree_to_string(envelope),
+            cabecalhos,
+        )
+
+    async def fechar(self):
+        if self._sessao is not None:
+            await self._sessao.close()
+            self._sessao = None
+
+
+# As sessões aiohttp pertencem a um event loop: uma sessão por certificado
+# (impressão digital) em cada loop
+_sessoes_assincronas = weakref.WeakKeyDictionary()
+_lock_sessoes_assincronas = threading.Lock()
+
+
+def sessao_assincrona(certificado):
+    """Retorna a SessaoAssincrona compartilhada do certificado no event loop
+    em execução.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock_sessoes_assincronas:
+        sessoes = _sessoes_assincronas.setdefault(loop, {})
+        chave = impressao_digital(certificado)
+        sessao = sessoes.get(chave)
+        if sessao is None:
+            sessao = sessoes[chave] = SessaoAssincrona(certificado)
+        return sessao
+
+
+async def fechar_sessoes_assincronas():
+    """Fecha as sessões assíncronas do event loop em execução."""
+    with _lock_sessoes_assincronas:
+        sessoes = _sessoes_assincronas.pop(asyncio.get_running_loop(), {})
+    for sessao in sessoes.values():
+        await sessao.fechar()
@@ -0,0 +1,215 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import abc
+import collections
+import sqlite3
+import threading
+import time
+
+# Estados de um documento na caixa de saída, na ordem em que ocorrem
+ESTADO_ASSINADO = "assinado"
+ESTADO_ENVIADO = "enviado"
+ESTADO_RECIBO = "recibo"
+ESTADO_AUTORIZADO = "autorizado"
+ESTADO_REJEITADO = "rejeitado"
+
+# NFC-e assinada em contingência offline (tpEmis 9), aguardando a
+# transmissão (ver FilaContingenciaNFCe)
+ESTADO_CONTINGENCIA = "contingencia"
+
+# Estados em que o documento é incluído, com o XML assinado
+ESTADOS_ASSINATURA = (ESTADO_ASSINADO, ESTADO_CONTINGENCIA)
+ESTADOS_FINAIS = (ESTADO_AUTORIZADO, ESTADO_REJEITADO)
+
+# cStat do protocolo de um documento autorizado: 100 e 150 (fora de prazo)
+SITUACOES_AUTORIZADO = ("100", "150")
+
+# Situação atual de um documento: ``xml`` é o documento assinado e
+# ``contingencia`` indica se o recibo foi emitido pela SVC
+DocumentoSaida = collections.namedtuple(
+    "DocumentoSaida", ["chave", "estado", "recibo", "contingencia", "xml"]
+)
+
+# Mudança de estado de um documento, com o XML da etapa: o documento
+# assinado, o retorno do envio ou o protocolo
+TransicaoSaida = collections.namedtuple(
+    "TransicaoSaida", ["chave", "estado", "c_stat", "xml", "data"]
+)
+
+
+class ArmazenamentoSaida(metaclass=abc.ABCMeta):
+    """Caixa de saída persistente dos documentos emitidos: registra cada
+    mudança de estado (assinado, enviado, recibo recebido, autorizado ou
+    rejeitado) para que os recibos pendentes sejam retomados após uma
+    interrupção (ver NFe.retomar_saida), sem reenviar os documentos.
+
+    Para utilizar outro armazenamento (PostgreSQL, Redis...) basta
+    implementar os métodos ``registrar``, ``documento``, ``pendentes`` e
+    ``transicoes``.
+    """
+
+    @abc.abstractmethod
+    def registrar(
+        self, chave, estado, xml=None, recibo=None, contingencia=False, c_stat=None
+    ):
+        """Registra a mudança de estado do documento.
+
+        :param chave: chave de acesso
+        :param estado: ESTADO_ASSINADO, ESTADO_ENVIADO, ESTADO_RECIBO...
+        :param xml: XML da etapa; o do ESTADO_ASSINADO (ou
+            ESTADO_CONTINGENCIA) é mantido no documento
+        :param recibo: número do recibo (ESTADO_RECIBO)
+        :param contingencia: recibo emitido pela SVC
+        :param c_stat: cStat do retorno
+        """
+
+    @abc.abstractmethod
+    def documento(self, chave):
+        """Retorna o DocumentoSaida da chave ou None"""
+
+    @abc.abstractmethod
+    def pendentes(self):
+        """Retorna os DocumentoSaida ainda sem autorização ou rejeição"""
+
+    @abc.abstractmethod
+    def transicoes(self, chave):
+        """Retorna as TransicaoSaida do documento, da mais antiga à atual"""
+
+
+class ArmazenamentoSaidaMemoria(ArmazenamentoSaida):
+    """Caixa de saída mantida apenas em memória."""
+
+    def __init__(self, relogio=time.time):
+        self.relogio = relogio
+        self._documentos = {}
+        self._transicoes = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def registrar(
+        self, chave, estado, xml=None, recibo=None, contingencia=False, c_stat=None
+    ):
+        with self._lock:
+            anterior = self._documentos.get(chave)
+            if estado in ESTADOS_ASSINATURA or anterior is None:
+                # Documento novo ou assinado novamente
+                anterior = DocumentoSaida(chave, estado, None, False, None)
+            self._documentos[chave] = anterior._replace(
+                estado=estado,
+                recibo=recibo or anterior.recibo,
+                contingencia=bool(contingencia) or anterior.contingencia,
+                xml=xml if estado in ESTADOS_ASSINATURA else anterior.xml,
+            )
+            self._transicoes[chave].append(
+                TransicaoSaida(chave, estado, c_stat, xml, self.relogio())
+            )
+
+    def documento(self, chave):
+        return self._documentos.get(chave)
+
+    def pendentes(self):
+        with self._lock:
+            return [
+                documento
+                for documento in self._documentos.values()
+                if documento.estado not in ESTADOS_FINAIS
+            ]
+
+    def transicoes(self, chave):
+        return list(self._transicoes.get(chave, ()))
+
+
+class ArmazenamentoSaidaSQLite(ArmazenamentoSaida):
+    """Caixa de saída em um banco SQLite, compartilhado pelas threads do
+    processo. Cada registro é gravado em uma transação, no modo WAL.
+
+    :param caminho: arquivo do banco de dados
+    """
+
+    _TABELAS = """
+        CREATE TABLE IF NOT EXISTS documento (
+            chave TEXT PRIMARY KEY,
+            estado TEXT NOT NULL,
+            recibo TEXT,
+            contingencia INTEGER NOT NULL DEFAULT 0,
+            xml TEXT
+        );
+        CREATE INDEX IF NOT EXISTS documento_estado ON documento (estado);
+        CREATE TABLE IF NOT EXISTS transicao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chave TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            c_stat TEXT,
+            xml TEXT,
+            data REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS transicao_chave ON transicao (chave);
+    """
+
+    def __init__(self, caminho, relogio=time.time):
+        self.caminho = caminho
+        self.relogio = relogio
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        with self._lock, self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.executescript(self._TABELAS)
+
+    def registrar(
+        self, chave, estado, xml=None, recibo=None, contingencia=False, c_stat=None
+    ):
+        with self._lock, self._conexao:
+            if estado in ESTADOS_ASSINATURA:
+                # Documento novo ou assinado novamente
+                self._conexao.execute(
+                    "INSERT OR REPLACE INTO documento"
+                    " (chave, estado, recibo, contingencia, xml)"
+                    " VALUES (?, ?, NULL, 0, ?)",
+                    (chave, estado, xml),
+                )
+            else:
+                self._conexao.execute(
+                    "INSERT INTO documento (chave, estado, recibo, contingencia)"
+                    " VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (chave) DO UPDATE SET estado = excluded.estado,"
+                    " recibo = COALESCE(excluded.recibo, recibo),"
+                    " contingencia = MAX(excluded.contingencia, contingencia)",
+                    (chave, estado, recibo, int(bool(contingencia))),
+                )
+            self._conexao.execute(
+                "INSERT INTO transicao (chave, estado, c_stat, xml, data)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (chave, estado, c_stat, xml, self.relogio()),
+            )
+
+    def _documentos(self, condicao, parametros):
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT chave, estado, recibo, contingencia, xml FROM documento"
+                " WHERE " + condicao,
+                parametros,
+            ).fetchall()
+        return [
+            DocumentoSaida(chave, estado, recibo, bool(contingencia), xml)
+            for chave, estado, recibo, contingencia, xml in linhas
+        ]
+
+    def documento(self, chave):
+        documentos = self._documentos("chave = ?", (chave,))
+        return documentos[0] if documentos else None
+
+    def pendentes(self):
+        return self._documentos("estado NOT IN (?, ?)", ESTADOS_FINAIS)
+
+    def transicoes(self, chave):
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT chave, estado, c_stat, xml, data FROM transicao"
+                " WHERE chave = ? ORDER BY id",
+                (chave,),
+            ).fetchall()
+        return [TransicaoSaida(*linha) for linha in linhas]
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
@@ -15,8 +15,35 @@ Why does this file exist, and why not put this in __main__?
   Also see (1) from http://click.pocoo.org/5/setuptools/#setuptools-integration
 """
 
+import argparse
+import getpass
+import os
 import sys
 
+# Variável de ambiente com a senha do certificado; quando ausente a senha é
+# solicitada no terminal (a senha não é aceita como argumento, pois ficaria
+# visível no ps e no histórico do shell)
+VARIAVEL_SENHA_CERTIFICADO = "ERPBRASIL_EDOC_SENHA_CERTIFICADO"
+
+
+def senha_certificado():
+    senha = os.environ.get(VARIAVEL_SENHA_CERTIFICADO)
+    if senha is None:
+        senha = getpass.getpass("Senha do certificado: ")
+    return senha
+
+
+def atualizar_wsdl(args):
+    from erpbrasil.assinatura.certificado import Certificado
+    from erpbrasil.edoc.wsdl import atualizar_cache_wsdl
+
+    certificado = Certificado(args.certificado, senha_certificado())
+    atualizadas, falhas = atualizar_cache_wsdl(certificado, args.diretorio)
+    print(f"{len(atualizadas)} WSDL atualizados, {len(falhas)} falhas")
+    for url in falhas:
+        print(f"  falha: {url}")
+    return 1 if falhas else 0
+
 
 def main(argv=sys.argv):
     """
@@ -26,7 +53,24 @@ def main(argv=sys.argv):
     Returns:
         int: A return code
 
-    Does stuff.
+    Subcomandos:
+        atualizar-wsdl: baixa os WSDL de todos os webservices para o cache
+        offline (erpbrasil.edoc.wsdl.CacheWSDL). A senha do certificado é
+        lida da variável ERPBRASIL_EDOC_SENHA_CERTIFICADO ou solicitada no
+        terminal.
     """
-    print(argv)
-    return 0
+    parser = argparse.ArgumentParser(prog="erpbrasil.edoc")
+    subparsers = parser.add_subparsers(dest="comando")
+
+    wsdl = subparsers.add_parser(
+        "atualizar-wsdl", help="Atualiza o cache offline dos WSDL"
+    )
+    wsdl.add_argument("--certificado", required=True, help="Arquivo PFX")
+    wsdl.add_argument("--diretorio", default=None, help="Diretório do cache dos WSDL")
+    wsdl.set_defaults(funcao=atualizar_wsdl)
+
+    args = parser.parse_args(argv[1:])
+    if not args.comando:
+        parser.print_help()
+        return 0
+    return args.funcao(args)
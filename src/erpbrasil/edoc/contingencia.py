@@ -0,0 +1,219 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import collections
+import copy
+import logging
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from lxml import etree
+
+from erpbrasil.edoc.caixa_saida import (
+    ESTADO_AUTORIZADO,
+    ESTADO_CONTINGENCIA,
+    ESTADO_REJEITADO,
+    SITUACOES_AUTORIZADO,
+    ArmazenamentoSaidaMemoria,
+)
+from erpbrasil.edoc.limite import LimitadorRequisicoes
+from erpbrasil.edoc.resposta import localizar_corpo_soap
+
+_logger = logging.getLogger(__name__)
+
+NAMESPACE_NFE = "http://www.portalfiscal.inf.br/nfe"
+
+# Prazo, em segundos, para a transmissão da NFC-e emitida em contingência
+# offline (tpEmis 9): 24 horas após a emissão
+PRAZO_CONTINGENCIA_OFFLINE = 24 * 3600
+
+# Antecedência, em segundos, com que os documentos são informados como
+# próximos do fim do prazo
+MARGEM_PRAZO_CONTINGENCIA = 2 * 3600
+
+# cStat 204: duplicidade de NF-e, a NFC-e já foi recebida anteriormente
+DUPLICIDADE = "204"
+
+_DH_EMI = re.compile(r"<(?:\w+:)?dhEmi>([^<]+)<")
+
+# Resultado da transmissão de uma NFC-e da fila, com a exceção em ``erro``
+# quando a transmissão falhou (o documento permanece em contingência)
+EnvioContingencia = collections.namedtuple(
+    "EnvioContingencia", ["chave", "estado", "c_stat", "erro"]
+)
+
+
+def _emissao(documento):
+    """Retorna o dhEmi da NFC-e assinada do DocumentoSaida (timestamp)"""
+    return datetime.fromisoformat(_DH_EMI.search(documento.xml).group(1)).timestamp()
+
+
+class FilaContingenciaNFCe:
+    """Emissão offline da NFC-e em contingência (tpEmis 9).
+
+    ``emitir`` assina a NFC-e uma única vez e a grava na caixa de saída, no
+    ESTADO_CONTINGENCIA, sem transmiti-la: o XML retornado é o utilizado na
+    impressão do DANFE.
+    Com a conexão restabelecida, ``transmitir`` envia as NFC-e pendentes
+    pela ordem de emissão, sem assiná-las novamente, em até
+    ``concorrencia`` envios síncronos simultâneos, espaçados pelo
+    ``limitador``.
+
+    As NFC-e devem ser transmitidas em até ``prazo`` segundos após a
+    emissão; ``a_vencer`` informa as pendentes próximas do fim do prazo,
+    também registradas no log a cada transmissão.
+
+    :param nfce: NFCe utilizada na assinatura e transmissão
+    :param armazenamento: ArmazenamentoSaida, por padrão em memória; o
+        protNFe da autorização ou rejeição é a última transição do documento.
+        Pode ser a própria caixa de saída da NFCe (_caixa_saida): as NFC-e
+        permanecem em contingência até o retorno da transmissão
+    :param limitador: LimitadorRequisicoes das transmissões, por padrão o
+        limitador da NFCe (_limitador) ou, sem ele, um LimitadorRequisicoes
+        com a REGRA_LIMITE_PADRAO
+    """
+
+    def __init__(
+        self,
+        nfce,
+        armazenamento=None,
+        prazo=PRAZO_CONTINGENCIA_OFFLINE,
+        concorrencia=4,
+        limitador=None,
+        relogio=time.time,
+    ):
+        self.nfce = nfce
+        self.armazenamento = armazenamento or ArmazenamentoSaidaMemoria()
+        self.prazo = prazo
+        self.concorrencia = concorrencia
+        self.limitador = limitador or nfce._limitador or LimitadorRequisicoes()
+        self.relogio = relogio
+
+    def emitir(self, edoc):
+        """Assina a NFC-e e a inclui na fila.
+
+        :return: XML da NFC-e assinada
+        """
+        xml_assinado = etree.tostring(self.nfce.assina_documento(edoc), encoding=str)
+        self.armazenamento.registrar(
+            edoc.infNFe.Id[3:], ESTADO_CONTINGENCIA, xml=xml_assinado
+        )
+        return xml_assinado
+
+    def pendentes(self):
+        """Retorna os DocumentoSaida ainda não transmitidos, pela ordem de
+        emissão"""
+        return sorted(
+            (
+                documento
+                for documento in self.armazenamento.pendentes()
+                if documento.estado == ESTADO_CONTINGENCIA
+            ),
+            key=_emissao,
+        )
+
+    def a_vencer(self, margem=MARGEM_PRAZO_CONTINGENCIA):
+        """Retorna as NFC-e pendentes cujo prazo de transmissão termina em
+        até ``margem`` segundos (ou já terminou).
+
+        :return: lista de tuplas (DocumentoSaida, segundos restantes)
+        """
+        agora = self.relogio()
+        restantes = (
+            (documento, _emissao(documento) + self.prazo - agora)
+            for documento in self.pendentes()
+        )
+        return [
+            (documento, restante)
+            for documento, restante in restantes
+            if restante <= margem
+        ]
+
+    def transmitir(self):
+        """Transmite as NFC-e pendentes, da mais antiga à mais recente.
+
+        Após uma falha de transmissão (conexão novamente indisponível) as
+        NFC-e ainda não enviadas permanecem em contingência, para a próxima
+        chamada.
+
+        :return: gerador de EnvioContingencia, na ordem em que os envios
+            terminam
+        """
+        for documento, restante in self.a_vencer():
+            _logger.warning(
+                "NFC-e %s em contingência: %s",
+                documento.chave,
+                "prazo de transmissão encerrado"
+                if restante <= 0
+                else "prazo de transmissão termina em %.0f minutos" % (restante / 60),
+            )
+        nfce = self._nfce_transmissao()
+        with ThreadPoolExecutor(self.concorrencia) as executor:
+            pendentes = set()
+            falha = False
+            for documento in self.pendentes():
+                if len(pendentes) >= self.concorrencia:
+                    concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for futuro in concluidos:
+                        envio = futuro.result()
+                        falha = falha or envio.erro is not None
+                        yield envio
+                if falha:
+                    break
+                pendentes.add(executor.submit(self._transmitir, nfce, documento))
+            while pendentes:
+                concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    yield futuro.result()
+
+    def _nfce_transmissao(self):
+        """NFCe utilizada nas transmissões, com o limitador da fila"""
+        if self.limitador is self.nfce._limitador:
+            return self.nfce
+        nfce = copy.copy(self.nfce)
+        nfce._limitador = self.limitador
+        return nfce
+
+    def _transmitir(self, nfce, documento):
+        try:
+            # Enviada sem os registros da caixa de saída (envia_assinado): a
+            # NFC-e só deixa a contingência com o protocolo do retorno
+            proc = nfce._post(*nfce._prepara_envia_assinado(documento.xml))
+            protocolo, c_stat = self._protocolo(proc)
+            if c_stat == DUPLICIDADE:
+                # Recebida em uma transmissão anterior, sem o retorno
+                protocolo, c_stat = self._protocolo(
+                    nfce.consulta_documento(documento.chave)
+                )
+        except Exception as erro:
+            _logger.warning(
+                "Falha na transmissão da NFC-e %s: %s", documento.chave, erro
+            )
+            return EnvioContingencia(documento.chave, ESTADO_CONTINGENCIA, None, erro)
+        if protocolo is None:
+            # Lote rejeitado: a NFC-e permanece em contingência
+            return EnvioContingencia(documento.chave, ESTADO_CONTINGENCIA, c_stat, None)
+        estado = (
+            ESTADO_AUTORIZADO if c_stat in SITUACOES_AUTORIZADO else ESTADO_REJEITADO
+        )
+        self.armazenamento.registrar(
+            documento.chave, estado, xml=protocolo, c_stat=c_stat
+        )
+        return EnvioContingencia(documento.chave, estado, c_stat, None)
+
+    @staticmethod
+    def _protocolo(proc):
+        """Retorna o protNFe (XML) e o cStat do protocolo do retorno, ou None
+        e o cStat do retorno quando não há protocolo"""
+        corpo = proc.resposta and localizar_corpo_soap(proc.retorno.content)
+        protocolo = (
+            corpo.find(f".//{{{NAMESPACE_NFE}}}protNFe") if corpo is not None else None
+        )
+        if protocolo is None:
+            return None, proc.resposta and proc.resposta.cStat
+        return (
+            etree.tostring(protocolo, encoding="unicode"),
+            protocolo.findtext(f"{{{NAMESPACE_NFE}}}infProt/{{{NAMESPACE_NFE}}}cStat"),
+        )
@@ -0,0 +1,283 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import abc
+import binascii
+import collections
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+
+from lxml import etree
+
+from .resposta import construir_resposta
+
+_logger = logging.getLogger(__name__)
+
+NSU_INICIAL = "0" * 15
+
+# NT 2014.002: sem documentos novos (ultNSU == maxNSU ou cStat 137) e após
+# consumo indevido (cStat 656) a próxima consulta só pode ser feita após 1 hora
+INTERVALO_CONSULTA_DISTRIBUICAO = 3600
+
+DISTRIBUICAO_DOCUMENTOS_LOCALIZADOS = "138"
+DISTRIBUICAO_NENHUM_DOCUMENTO = "137"
+DISTRIBUICAO_CONSUMO_INDEVIDO = "656"
+
+CursorDistribuicao = collections.namedtuple(
+    "CursorDistribuicao", ["ult_nsu", "max_nsu", "proxima_consulta"]
+)
+CursorDistribuicao.__new__.__defaults__ = (NSU_INICIAL, None, 0)
+
+# Tamanho, em caracteres base64, de cada bloco descompactado
+TAMANHO_BLOCO_DOC_ZIP = 64 * 1024
+
+_ESPACOS = re.compile(r"\s")
+
+
+class DocumentoDistribuicao(
+    collections.namedtuple("DocumentoDistribuicao", ["nsu", "schema", "xml"])
+):
+    """Documento (resNFe, procNFe, resEvento, procEventoNFe...) descompactado
+    de um docZip da distribuição de DF-e.
+
+    :param nsu: NSU do documento
+    :param schema: schema do documento, por exemplo ``resNFe_v1.01.xsd``
+    :param xml: XML do documento (bytes)
+    """
+
+    __slots__ = ()
+
+    @property
+    def tipo(self):
+        """Nome do schema sem versão: resNFe, procNFe, resEvento..."""
+        return self.schema.split("_")[0]
+
+    def etree(self):
+        """Interpreta o XML do documento (lxml)"""
+        return etree.fromstring(self.xml)
+
+    def binding(self, classe):
+        """Constrói o objeto generateDS do documento.
+
+        :param classe: classe do elemento raiz (por exemplo
+            retEnviNFe.TNfeProc) ou módulo generateDS
+        """
+        if hasattr(classe, "factory"):
+            objeto = classe.factory()
+            objeto.build(self.etree())
+            return objeto
+        return construir_resposta(classe, self.etree())
+
+
+def descompactar_doc_zip(doc_zip, tamanho_bloco=TAMANHO_BLOCO_DOC_ZIP):
+    """Converte um docZip do retDistDFeInt em DocumentoDistribuicao.
+
+    O conteúdo base64 é decodificado e descompactado em blocos, sem gerar uma
+    cópia intermediária do documento compactado inteiro.
+    """
+    conteudo = doc_zip.valueOf_
+    if _ESPACOS.search(conteudo):
+        conteudo = _ESPACOS.sub("", conteudo)
+    descompactador = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    partes = [
+        descompactador.decompress(
+            binascii.a2b_base64(conteudo[inicio : inicio + tamanho_bloco])
+        )
+        for inicio in range(0, len(conteudo), tamanho_bloco)
+    ]
+    partes.append(descompactador.flush())
+    return DocumentoDistribuicao(doc_zip.NSU, doc_zip.schema, b"".join(partes))
+
+
+def documentos_distribuicao(resposta, liberar=False):
+    """Itera sobre os documentos do retDistDFeInt (resposta do
+    consultar_distribuicao), descompactando um docZip de cada vez.
+
+    :param resposta: retDistDFeInt
+    :param liberar: descarta o conteúdo de cada docZip após a descompactação,
+        liberando a memória da página à medida que é lida
+    :return: gerador de DocumentoDistribuicao
+    """
+    if not resposta or not resposta.loteDistDFeInt:
+        return
+    for doc_zip in resposta.loteDistDFeInt.docZip:
+        documento = descompactar_doc_zip(doc_zip)
+        if liberar:
+            doc_zip.valueOf_ = None
+        yield documento
+
+
+class ArmazenamentoCursor(metaclass=abc.ABCMeta):
+    """Armazena o cursor (CursorDistribuicao) de cada CNPJ/CPF consultado
+    pelo SincronizadorDistribuicao.
+
+    Para utilizar outro armazenamento (banco de dados, Redis...) basta
+    implementar os métodos ``ler`` e ``gravar``.
+    """
+
+    @abc.abstractmethod
+    def ler(self, cnpj_cpf):
+        """Retorna o CursorDistribuicao do CNPJ/CPF ou None"""
+
+    @abc.abstractmethod
+    def gravar(self, cnpj_cpf, cursor):
+        pass
+
+
+class ArmazenamentoCursorMemoria(ArmazenamentoCursor):
+    """Cursores mantidos apenas em memória."""
+
+    def __init__(self):
+        self._cursores = {}
+
+    def ler(self, cnpj_cpf):
+        return self._cursores.get(cnpj_cpf)
+
+    def gravar(self, cnpj_cpf, cursor):
+        self._cursores[cnpj_cpf] = cursor
+
+
+class ArmazenamentoCursorArquivo(ArmazenamentoCursor):
+    """Cursores gravados em arquivos JSON, um por CNPJ/CPF.
+
+    :param diretorio: diretório dos arquivos
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+
+    def _arquivo(self, cnpj_cpf):
+        return os.path.join(self.diretorio, cnpj_cpf + ".json")
+
+    def ler(self, cnpj_cpf):
+        try:
+            with open(self._arquivo(cnpj_cpf)) as arquivo:
+                return CursorDistribuicao(**json.load(arquivo))
+        except FileNotFoundError:
+            return None
+
+    def gravar(self, cnpj_cpf, cursor):
+        with self._lock:
+            os.makedirs(self.diretorio, exist_ok=True)
+            temporario = self._arquivo(cnpj_cpf) + ".tmp"
+            with open(temporario, "w") as arquivo:
+                json.dump(cursor._asdict(), arquivo)
+            os.replace(temporario, self._arquivo(cnpj_cpf))
+
+
+class SincronizadorDistribuicao:
+    """Sincronização incremental dos documentos da distribuição de DF-e
+    (consultar_distribuicao) de cada CNPJ/CPF.
+
+    A partir do último NSU gravado no armazenamento, consulta as páginas
+    seguintes até que ultNSU seja igual ao maxNSU, entregando cada documento
+    descompactado assim que é lido. O cursor é gravado ao fim de cada página,
+    portanto uma sincronização interrompida recomeça a partir da última
+    página concluída.
+
+    Quando não há mais documentos, ou a SEFAZ rejeita a consulta por consumo
+    indevido (656), a próxima consulta do CNPJ/CPF é agendada para daqui a
+    ``intervalo`` segundos e as chamadas anteriores a esse horário são
+    ignoradas::
+
+        sincronizador = SincronizadorDistribuicao(
+            nfe, ArmazenamentoCursorArquivo("/var/lib/dfe")
+        )
+        for documento in sincronizador.sincronizar("99999999000191"):
+            # seu código aqui
+
+    :param nfe: NFe utilizada nas consultas
+    :param armazenamento: ArmazenamentoCursor, por padrão em memória
+    :param intervalo: espera, em segundos, após chegar ao maxNSU
+    :param relogio: função que retorna o horário atual (time.time)
+    """
+
+    def __init__(
+        self,
+        nfe,
+        armazenamento=None,
+        intervalo=INTERVALO_CONSULTA_DISTRIBUICAO,
+        relogio=time.time,
+    ):
+        self.nfe = nfe
+        self.armazenamento = armazenamento or ArmazenamentoCursorMemoria()
+        self.intervalo = intervalo
+        self.relogio = relogio
+
+    def cursor(self, cnpj_cpf):
+        return self.armazenamento.ler(cnpj_cpf) or CursorDistribuicao()
+
+    def proxima_consulta(self, cnpj_cpf):
+        """Horário (time.time) a partir do qual o CNPJ/CPF pode ser consultado"""
+        return self.cursor(cnpj_cpf).proxima_consulta
+
+    def pendentes(self, cnpjs_cpfs):
+        """Filtra os CNPJs/CPFs que já podem ser consultados"""
+        agora = self.relogio()
+        return [
+            cnpj_cpf
+            for cnpj_cpf in cnpjs_cpfs
+            if self.proxima_consulta(cnpj_cpf) <= agora
+        ]
+
+    def sincronizar(self, cnpj_cpf, forcar=False):
+        """Consulta os documentos novos do CNPJ/CPF.
+
+        :param cnpj_cpf: CNPJ ou CPF a ser consultado
+        :param forcar: consulta mesmo antes do horário agendado
+        :return: gerador de DocumentoDistribuicao
+        """
+        cursor = self.cursor(cnpj_cpf)
+        if not forcar and cursor.proxima_consulta > self.relogio():
+            return
+
+        while True:
+            proc = self.nfe.consultar_distribuicao(cnpj_cpf, ultimo_nsu=cursor.ult_nsu)
+            resposta = proc and proc.resposta
+            if not resposta:
+                _logger.warning("Consulta à distribuição de %s sem resposta", cnpj_cpf)
+                return
+
+            ult_nsu = resposta.ultNSU or cursor.ult_nsu
+            max_nsu = resposta.maxNSU or cursor.max_nsu
+            if resposta.cStat == DISTRIBUICAO_DOCUMENTOS_LOCALIZADOS:
+                yield from documentos_distribuicao(resposta, liberar=True)
+                # Sem avanço do NSU a próxima página seria a mesma
+                concluido = int(ult_nsu) >= int(max_nsu or 0)
+                concluido = concluido or int(ult_nsu) <= int(cursor.ult_nsu)
+            else:
+                if resposta.cStat not in (
+                    DISTRIBUICAO_NENHUM_DOCUMENTO,
+                    DISTRIBUICAO_CONSUMO_INDEVIDO,
+                ):
+                    _logger.warning(
+                        "Distribuição de %s rejeitada: %s - %s",
+                        cnpj_cpf,
+                        resposta.cStat,
+                        resposta.xMotivo,
+                    )
+                concluido = True
+
+            cursor = CursorDistribuicao(
+                ult_nsu,
+                max_nsu,
+                self.relogio() + self.intervalo if concluido else 0,
+            )
+            self.armazenamento.gravar(cnpj_cpf, cursor)
+            if concluido:
+                return
+
+    def sincronizar_pendentes(self, cnpjs_cpfs):
+        """Sincroniza os CNPJs/CPFs que já podem ser consultados.
+
+        :return: gerador de tuplas (cnpj_cpf, DocumentoDistribuicao)
+        """
+        for cnpj_cpf in self.pendentes(cnpjs_cpfs):
+            for documento in self.sincronizar(cnpj_cpf):
+                yield cnpj_cpf, documento
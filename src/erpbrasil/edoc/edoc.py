@@ -2,14 +2,28 @@
 # License MIT
 
 import abc
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 
 from lxml import etree
-from lxml.etree import _Element
-
-from erpbrasil.assinatura.assinatura import Assinatura
-
+from requests import Timeout
+
+from .assinatura import servico_assinatura
+from .assincrono import RetornoHTTP, sessao_assincrona
+from .instrumentacao import (
+    FASE_ANALISE,
+    FASE_ASSINATURA,
+    FASE_POST,
+    FASE_SERIALIZACAO,
+    FASE_TRANSMISSAO,
+    INSTRUMENTACAO,
+)
+from .pool import POOL_CLIENTES
 from .resposta import analisar_retorno_raw
+from .saude import MONITOR_SAUDE, SERVICO_PARALISADO
+from .status import CACHE_STATUS_SERVICO
 
 # Fix Python 2.x.
 try:
@@ -34,13 +48,52 @@ class DocumentoEletronico(ABC):
     _consulta_servico_ao_enviar = False
     _consulta_documento_antes_de_enviar = False
 
+    # Pool de clientes SOAP compartilhado, None para criar um novo cliente a
+    # cada requisição
+    _pool_clientes = POOL_CLIENTES
+
+    # Cache das consultas ao status do serviço utilizado pelo
+    # processar_documento, None para consultar o serviço a cada documento
+    _cache_status_servico = CACHE_STATUS_SERVICO
+
+    # Saúde (latência, falhas) dos webservices utilizados, None para não
+    # registrar
+    _monitor_saude = MONITOR_SAUDE
+
+    # Caixa de saída persistente (caixa_saida.ArmazenamentoSaida) onde são
+    # registrados os estados dos documentos emitidos, None para não registrar
+    _caixa_saida = None
+
+    # Limitador da taxa de requisições por CNPJ, UF e serviço
+    # (limite.LimitadorRequisicoes), None para não limitar
+    _limitador = None
+
+    # Instrumentação (spans) das fases das requisições
+    # (instrumentacao.Instrumentacao), por padrão sem registro
+    _instrumentacao = INSTRUMENTACAO
+
     def __init__(self, transmissao, envio_sincrono=False):
         self._transmissao = transmissao
         self.envio_sincrono = bool(envio_sincrono)
 
     def _generateds_to_string_etree(self, ds, pretty_print=False):
-        if type(ds) == _Element:
-            return etree.tostring(ds), ds
+        xml_string, xml_etree = self._generateds_to_etree(ds, pretty_print)
+        if xml_string is None:
+            xml_string = etree.tostring(xml_etree)
+        return xml_string, xml_etree
+
+    def _generateds_to_etree(self, ds, pretty_print=False):
+        """Como _generateds_to_string_etree, sem serializar os documentos já
+        montados como elementos lxml antes do envio: retorna a tupla
+        (None, elemento), e o XML do envio é gerado por _xml_envio."""
+        if isinstance(ds, etree._Element):
+            return None, ds
+        with self._instrumentacao.span(FASE_SERIALIZACAO) as span:
+            xml_string, xml_etree = self._serializa(ds, pretty_print)
+            span.definir(bytes=len(xml_string))
+        return xml_string, xml_etree
+
+    def _serializa(self, ds, pretty_print=False):
         if isinstance(ds, str):
             return ds, etree.fromstring(ds)
         # if isinstance(ds, unicode):
@@ -63,11 +116,236 @@ class DocumentoEletronico(ABC):
         output.close()
         return contents, etree.fromstring(contents)
 
+    def _cliente(self, url):
+        if self._pool_clientes is not None and self._pool_clientes.suporta(
+            self._transmissao
+        ):
+            return self._pool_clientes.cliente(self._transmissao, url)
+        return self._transmissao.cliente(url)
+
+    def _enviar(self, raiz, operacao, xml_etree):
+        """Envia a mensagem pela transmissão, retornando a resposta HTTP"""
+        return self._transmissao.enviar(operacao, xml_etree)
+
+    def _argumentos_envio(self, raiz, operacao, xml_etree):
+        """Argumentos (args, kwargs) da operação SOAP nas chamadas
+        assíncronas, os mesmos enviados pela transmissão no _enviar"""
+        return (xml_etree,), {}
+
+    def analisar_retorno_raw(self, operacao, raiz, xml, retorno, classe):
+        """Interpreta a resposta SOAP (resposta.analisar_retorno_raw)"""
+        return analisar_retorno_raw(operacao, raiz, xml, retorno, classe)
+
     def _post(self, raiz, url, operacao, classe):
+        with self._span_post(operacao, url) as span:
+            xml_string, xml_etree = self._generateds_to_etree(raiz)
+            chave_limite = self._aguarda_limite(operacao)
+            inicio = time.monotonic()
+            try:
+                with self._cliente(url):
+                    with self._instrumentacao.span(
+                        FASE_TRANSMISSAO, operacao=operacao, url=url
+                    ):
+                        retorno = self._enviar(raiz, operacao, xml_etree)
+                    xml_string = self._xml_envio(xml_string, xml_etree)
+                    proc = self._analisa_retorno(
+                        self.analisar_retorno_raw,
+                        operacao,
+                        raiz,
+                        xml_string,
+                        retorno,
+                        classe,
+                    )
+            except Exception as erro:
+                self._registra_falha(url, inicio, erro)
+                raise
+            self._registra_limite(chave_limite, proc)
+            return self._registra_span_post(
+                span, xml_string, self._registra_retorno(url, inicio, proc)
+            )
+
+    def _xml_envio(self, xml_string, xml_etree):
+        """XML do envio (RetornoSoap.envio_xml). Os documentos enviados como
+        elemento são serializados logo após a transmissão, antes que o
+        monta_processo mova os documentos do lote para o processo."""
+        if xml_string is None:
+            return etree.tostring(xml_etree)
+        return xml_string
+
+    def _span_post(self, operacao, url):
+        return self._instrumentacao.span(
+            FASE_POST, uf=str(getattr(self, "uf", "")), operacao=operacao, url=url
+        )
+
+    def _registra_span_post(self, span, xml_string, proc):
+        span.definir(
+            c_stat=proc and getattr(proc.resposta, "cStat", None),
+            bytes_envio=xml_string and len(xml_string),
+            bytes_retorno=proc and len(proc.retorno.content),
+        )
+        return proc
+
+    def _analisa_retorno(self, analisar, operacao, raiz, xml_string, retorno, classe):
+        """Interpreta a resposta SOAP com ``analisar`` (analisar_retorno_raw),
+        medida na FASE_ANALISE da instrumentação."""
+        with self._instrumentacao.span(
+            FASE_ANALISE, operacao=operacao, bytes=len(retorno.content)
+        ) as span:
+            proc = analisar(operacao, raiz, xml_string, retorno, classe)
+            span.definir(c_stat=proc and getattr(proc.resposta, "cStat", None))
+        return proc
+
+    def _chave_limite(self, operacao):
+        """Chave (CNPJ/CPF do certificado, UF, serviço) do limitador"""
+        try:
+            cnpj_cpf = self._cnpj_cpf_limite
+        except AttributeError:
+            certificado = getattr(self._transmissao, "certificado", None)
+            cnpj_cpf = self._cnpj_cpf_limite = certificado and certificado.cnpj_cpf
+        return cnpj_cpf, str(getattr(self, "uf", "")), operacao
+
+    def _aguarda_limite(self, operacao):
+        if self._limitador is None:
+            return None
+        chave = self._chave_limite(operacao)
+        self._limitador.adquirir(chave)
+        return chave
+
+    async def _aguarda_limite_async(self, operacao):
+        if self._limitador is None:
+            return None
+        chave = self._chave_limite(operacao)
+        await self._limitador.adquirir_async(chave)
+        return chave
+
+    def _registra_limite(self, chave, proc):
+        if chave is not None:
+            self._limitador.registrar_retorno(
+                chave, proc and getattr(proc.resposta, "cStat", None)
+            )
+
+    @asynccontextmanager
+    async def _cliente_zeep(self, url):
+        """Cliente zeep do webservice, utilizado para montar as mensagens das
+        chamadas assíncronas. Com o pool o WSDL é lido uma única vez, e o
+        cliente permanece reservado até o fim da chamada.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._pool_clientes
+        # A leitura do WSDL (somente na primeira chamada) é bloqueante
+        if pool is not None and pool.suporta(self._transmissao):
+            reserva = await loop.run_in_executor(
+                None, pool.reservar, self._transmissao, url
+            )
+            try:
+                yield reserva.cliente
+            finally:
+                pool.liberar(reserva)
+        else:
+            yield await loop.run_in_executor(None, self._cliente_avulso, url)
+
+    def _cliente_avulso(self, url):
+        with self._transmissao.cliente(url) as cliente:
+            return cliente
+
+    async def _post_async(self, raiz, url, operacao, classe):
+        with self._span_post(operacao, url) as span:
+            xml_string, xml_etree = self._generateds_to_etree(raiz)
+            chave_limite = await self._aguarda_limite_async(operacao)
+            inicio = time.monotonic()
+            try:
+                async with self._cliente_zeep(url) as cliente:
+                    with self._instrumentacao.span(
+                        FASE_TRANSMISSAO, operacao=operacao, url=url
+                    ):
+                        args, kwargs = self._argumentos_envio(raiz, operacao, xml_etree)
+                        retorno = await sessao_assincrona(
+                            self._transmissao.certificado
+                        ).enviar(cliente, operacao, args, kwargs)
+                xml_string = self._xml_envio(xml_string, xml_etree)
+                proc = self._analisa_retorno(
+                    self.analisar_retorno_raw,
+                    operacao,
+                    raiz,
+                    xml_string,
+                    retorno,
+                    classe,
+                )
+            except Exception as erro:
+                self._registra_falha(url, inicio, erro)
+                raise
+            self._registra_limite(chave_limite, proc)
+            return self._registra_span_post(
+                span, xml_string, self._registra_retorno(url, inicio, proc)
+            )
+
+    def _registra_falha(self, url, inicio, erro):
+        self._invalida_status_servico()
+        if self._monitor_saude is not None:
+            self._monitor_saude.registrar_falha(
+                url,
+                time.monotonic() - inicio,
+                timeout=isinstance(erro, (Timeout, asyncio.TimeoutError)),
+            )
+
+    def _registra_retorno(self, url, inicio, proc):
+        if self._monitor_saude is not None:
+            latencia = time.monotonic() - inicio
+            c_stat = proc and getattr(proc.resposta, "cStat", None)
+            if c_stat in SERVICO_PARALISADO:
+                self._monitor_saude.registrar_falha(url, latencia, paralisado=True)
+            else:
+                self._monitor_saude.registrar_sucesso(url, latencia)
+        if proc:
+            proc.contingencia = self._contingencia_url(url)
+        return proc
+
+    def _contingencia_url(self, url):
+        """Nome da contingência (SVC-AN, SVC-RS...) atendida pela URL, ou
+        False quando a URL é do autorizador normal
+        """
+        return False
+
+    def _chave_status_servico(self):
+        """Chave das consultas ao status do serviço no cache, None para não
+        utilizar o cache
+        """
+        return None
+
+    def _invalida_status_servico(self):
+        chave = self._chave_status_servico()
+        if self._cache_status_servico is not None and chave is not None:
+            self._cache_status_servico.invalidar(chave)
+
+    def status_servico_cache(self):
+        """Status do serviço, consultado no máximo uma vez a cada ttl do
+        cache (_cache_status_servico) para a mesma UF, modelo, ambiente e
+        URL do serviço
+        """
+        chave = self._chave_status_servico()
+        if self._cache_status_servico is None or chave is None:
+            return self.status_servico()
+        return self._cache_status_servico.obter(
+            chave, self.status_servico, self._carrega_status_servico
+        )
+
+    async def status_servico_cache_async(self):
+        chave = self._chave_status_servico()
+        if self._cache_status_servico is None or chave is None:
+            return await self.status_servico_async()
+        proc_servico = self._cache_status_servico.consulta(chave)
+        if proc_servico is None:
+            proc_servico = await self.status_servico_async()
+            self._cache_status_servico.gravar(chave, proc_servico)
+        return proc_servico
+
+    def _carrega_status_servico(self, conteudo):
+        """Reconstrói o status do serviço gravado por outro processo"""
+        raiz, url, operacao, classe = self._prepara_status_servico()
         xml_string, xml_etree = self._generateds_to_string_etree(raiz)
-        with self._transmissao.cliente(url):
-            retorno = self._transmissao.enviar(operacao, xml_etree)
-            return analisar_retorno_raw(operacao, raiz, xml_string, retorno, classe)
+        return self.analisar_retorno_raw(
+            operacao, raiz, xml_string, RetornoHTTP(url, 200, {}, conteudo), classe
+        )
 
     def processar_documento(self, edoc, envio_sincrono=False):
         """Processar documento executa o envio do documento fiscal de forma
@@ -96,7 +374,7 @@ class DocumentoEletronico(ABC):
 
         """
         if self._consulta_servico_ao_enviar:
-            proc_servico = self.status_servico()
+            proc_servico = self.status_servico_cache()
             yield proc_servico
             #
             # Se o serviço não estiver em operação
@@ -148,6 +426,19 @@ class DocumentoEletronico(ABC):
         ):
             return
 
+        proc_recibo = self._consulta_recibo_processado(proc_envio)
+        if not proc_recibo.resposta:
+            return
+        self.monta_processo(edoc, proc_envio, proc_recibo)
+        yield proc_recibo
+
+    def _consulta_recibo_processado(self, proc_envio):
+        """Consulta o recibo do envio assíncrono até o fim do processamento
+        do lote ou até atingir 'maximo_tentativas_consulta_recibo'.
+
+        :param proc_envio: retorno do envio com o recibo do lote
+        :return: retorno da última consulta ao recibo
+        """
         #
         # Aguarda o tempo do processamento antes da consulta
         #
@@ -158,7 +449,7 @@ class DocumentoEletronico(ABC):
         proc_recibo = self.consulta_recibo(proc_envio=proc_envio)
 
         if not proc_recibo.resposta:
-            return
+            return proc_recibo
 
         #
         # Tenta receber o resultado do processamento do lote, caso ainda
@@ -175,9 +466,68 @@ class DocumentoEletronico(ABC):
             # Consulta o recibo do lote, para ver o que aconteceu
             #
             proc_recibo = self.consulta_recibo(proc_envio=proc_envio)
+        return proc_recibo
+
+    async def processar_documento_async(self, edoc):
+        """Versão assíncrona do processar_documento, executa o mesmo workflow
+        utilizando os métodos *_async do documento. As esperas pelo
+        processamento do lote não bloqueiam o event loop.
+
+                async for processo in nfe.processar_documento_async(edoc):
+                    # seu código aqui
+
+        :param edoc:
+        :return: async generator com os retornos de cada etapa
+        """
+        if self._consulta_servico_ao_enviar:
+            proc_servico = await self.status_servico_cache_async()
+            yield proc_servico
+            if not self._verifica_servico_em_operacao(proc_servico):
+                return
+
+        if self._consulta_documento_antes_de_enviar:
+            documento, chave = self.get_documento_id(edoc)
+            if not chave:
+                return
+            proc_consulta = await self.consulta_documento_async(chave)
+            yield proc_consulta
+            if self._verifica_documento_ja_enviado(proc_consulta):
+                return
+
+        proc_envio = await self.envia_documento_async(edoc)
+        if self.envio_sincrono:
+            self.monta_processo(edoc, proc_envio)
+        yield proc_envio
+
+        if (
+            not proc_envio.resposta
+            or not self._verifica_resposta_envio_sucesso(proc_envio)
+            or self.envio_sincrono
+        ):
+            return
+
+        proc_recibo = await self._consulta_recibo_processado_async(proc_envio)
+        if not proc_recibo.resposta:
+            return
         self.monta_processo(edoc, proc_envio, proc_recibo)
         yield proc_recibo
 
+    async def _consulta_recibo_processado_async(self, proc_envio):
+        await asyncio.sleep(self._tempo_espera(proc_envio))
+        proc_recibo = await self.consulta_recibo_async(proc_envio=proc_envio)
+        if not proc_recibo.resposta:
+            return proc_recibo
+
+        tentativa = 0
+        while (
+            self._edoc_situacao_em_processamento(proc_recibo)
+            and tentativa < self._maximo_tentativas_consulta_recibo
+        ):
+            await asyncio.sleep(self._tempo_espera(proc_envio))
+            tentativa += 1
+            proc_recibo = await self.consulta_recibo_async(proc_envio=proc_envio)
+        return proc_recibo
+
     @abc.abstractmethod
     def status_servico(self):
         pass
@@ -214,11 +564,40 @@ class DocumentoEletronico(ABC):
         return datetime.strftime(datetime.now(), "%Y-%m-%d")
 
     def assina_raiz(self, raiz, id, getchildren=False):
-        xml_string, xml_etree = self._generateds_to_string_etree(raiz)
-        xml_assinado = Assinatura(self._transmissao.certificado).assina_xml2(
-            xml_etree, id, getchildren
+        return etree.tostring(self.assina_elemento(raiz, id, getchildren), encoding=str)
+
+    def assina_elemento(self, raiz, id, getchildren=False):
+        """Assina o documento e retorna o elemento lxml assinado, sem
+        serializá-lo: o elemento pode ser incluído diretamente no lote.
+        Elementos recebidos são assinados no próprio elemento."""
+        with self._instrumentacao.span(FASE_ASSINATURA, id=id):
+            xml_string, xml_etree = self._generateds_to_etree(raiz)
+            return servico_assinatura(self._transmissao.certificado).assina_elemento(
+                xml_etree, id, getchildren
+            )
+
+    def assina_raizes(self, raizes, getchildren=False):
+        """Assina vários documentos, distribuindo as assinaturas entre os
+        processos do serviço de assinatura do certificado.
+
+        :param raizes: lista de tuplas (raiz, id)
+        :return: lista com os XML assinados, na ordem recebida
+        """
+        return servico_assinatura(self._transmissao.certificado).assina_lote(
+            [
+                (self._generateds_to_string_etree(raiz)[1], id, getchildren)
+                for raiz, id in raizes
+            ]
         )
-        return xml_assinado.replace("\n", "").replace("\r", "")
+
+    def _tempo_espera(self, proc_envio):
+        """Tempo, em segundos, a aguardar antes de consultar o recibo."""
+        return 0
+
+    def _aguarda_tempo_medio(self, proc_envio):
+        tempo = self._tempo_espera(proc_envio)
+        if tempo > 0:
+            time.sleep(tempo)
 
     def _verifica_servico_em_operacao(self, proc_servico):
         return True
@@ -0,0 +1,211 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from erpbrasil.edoc.nfe import NFE_LOTE_MAXIMO_EVENTOS
+
+_logger = logging.getLogger(__name__)
+
+
+class EventoPendente:
+    """Evento (infEvento) aguardando o envio pela FilaEventos.
+
+    Após o envio do lote ``proc_envio`` contém o retorno do envEvento e
+    ``ret_evento`` o retEvento do evento (None quando o lote foi rejeitado),
+    ou ``erro`` a exceção ocorrida no envio.
+    """
+
+    def __init__(self, documento, inf_evento, callback=None):
+        self.documento = documento
+        self.inf_evento = inf_evento
+        self.callback = callback
+        self.proc_envio = None
+        self.ret_evento = None
+        self.erro = None
+        self.concluido = threading.Event()
+
+    @property
+    def chave(self):
+        return (
+            self.inf_evento.chNFe,
+            self.inf_evento.tpEvento,
+            int(self.inf_evento.nSeqEvento),
+        )
+
+    @property
+    def c_stat(self):
+        """cStat do evento, ou do lote quando não houve retorno do evento"""
+        if self.ret_evento is not None:
+            return self.ret_evento.infEvento.cStat
+        if self.proc_envio is not None and self.proc_envio.resposta:
+            return self.proc_envio.resposta.cStat
+
+    def resultado(self, timeout=None):
+        """Aguarda o envio do lote e retorna o retEvento do evento."""
+        if not self.concluido.wait(timeout):
+            raise TimeoutError("Evento ainda não enviado")
+        if self.erro is not None:
+            raise self.erro
+        return self.ret_evento
+
+
+class _Grupo:
+    def __init__(self, vencimento):
+        self.vencimento = vencimento
+        self.eventos = []
+        self.chaves = set()
+
+
+class FilaEventos:
+    """Agrupa os eventos (cancelamento, carta de correção...) em lotes
+    envEvento de até ``tamanho`` eventos.
+
+    Os eventos são separados pelo documento (NFe da UF, ambiente e
+    certificado) e pelo órgão (cOrgao). O lote é enviado ao atingir o
+    ``tamanho``, ou ``intervalo`` segundos após a inclusão do seu primeiro
+    evento, por um pool com ``threads`` threads; os eventos de cada lote são
+    assinados em paralelo pelo serviço de assinatura (assina_raizes). Um
+    evento repetido (mesma chave, tipo e sequência) envia o lote anterior,
+    pois a SEFAZ rejeita o lote com eventos duplicados.
+
+    O retEvento de cada evento é entregue ao ``callback`` informado em
+    ``adicionar`` (executado na thread do envio) ou pelo
+    EventoPendente.resultado::
+
+        with FilaEventos() as fila:
+            pendentes = [
+                fila.adicionar(nfe, nfe.cancela_documento(chave, protocolo, motivo))
+                for chave, protocolo in documentos
+            ]
+        for pendente in pendentes:
+            # seu código aqui (pendente.c_stat, pendente.ret_evento)
+    """
+
+    def __init__(
+        self,
+        tamanho=NFE_LOTE_MAXIMO_EVENTOS,
+        intervalo=5.0,
+        threads=4,
+        relogio=time.monotonic,
+    ):
+        if not 1 <= tamanho <= NFE_LOTE_MAXIMO_EVENTOS:
+            raise ValueError(
+                "O lote deve conter entre 1 e %d eventos" % NFE_LOTE_MAXIMO_EVENTOS
+            )
+        self.tamanho = tamanho
+        self.intervalo = intervalo
+        self.relogio = relogio
+        self._grupos = {}
+        self._condicao = threading.Condition()
+        self._executor = ThreadPoolExecutor(threads)
+        self._lotes = itertools.count(int(time.time() * 1000))
+        self._fechado = False
+        self._thread = None
+
+    def __len__(self):
+        with self._condicao:
+            return sum(len(grupo.eventos) for grupo in self._grupos.values())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+    def adicionar(self, documento, inf_evento, callback=None):
+        """Inclui o evento no lote do documento e órgão.
+
+        :param documento: NFe utilizada no envio
+        :param inf_evento: infEvento (cancela_documento, carta_correcao...)
+        :param callback: função chamada com o EventoPendente após o envio
+        :return: EventoPendente
+        """
+        pendente = EventoPendente(documento, inf_evento, callback)
+        chave_grupo = (documento, str(inf_evento.cOrgao))
+        with self._condicao:
+            if self._fechado:
+                raise RuntimeError("Fila de eventos encerrada")
+            grupo = self._grupos.get(chave_grupo)
+            if grupo is not None and pendente.chave in grupo.chaves:
+                self._enviar(chave_grupo)
+                grupo = None
+            if grupo is None:
+                grupo = self._grupos[chave_grupo] = _Grupo(
+                    self.relogio() + self.intervalo
+                )
+                self._condicao.notify()
+            grupo.eventos.append(pendente)
+            grupo.chaves.add(pendente.chave)
+            if len(grupo.eventos) >= self.tamanho:
+                self._enviar(chave_grupo)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._executar, name="FilaEventos", daemon=True
+                )
+                self._thread.start()
+        return pendente
+
+    def enviar(self):
+        """Envia imediatamente os lotes pendentes."""
+        with self._condicao:
+            for chave_grupo in list(self._grupos):
+                self._enviar(chave_grupo)
+
+    def _enviar(self, chave_grupo):
+        grupo = self._grupos.pop(chave_grupo)
+        self._executor.submit(
+            self._enviar_lote, chave_grupo[0], grupo.eventos, str(next(self._lotes))
+        )
+
+    def _executar(self):
+        with self._condicao:
+            while not self._fechado:
+                agora = self.relogio()
+                vencidos = [
+                    chave_grupo
+                    for chave_grupo, grupo in self._grupos.items()
+                    if grupo.vencimento <= agora
+                ]
+                for chave_grupo in vencidos:
+                    self._enviar(chave_grupo)
+                if self._grupos:
+                    self._condicao.wait(
+                        min(grupo.vencimento for grupo in self._grupos.values()) - agora
+                    )
+                else:
+                    self._condicao.wait()
+
+    def _enviar_lote(self, documento, eventos, numero_lote):
+        lista_eventos = [pendente.inf_evento for pendente in eventos]
+        try:
+            proc_envio = documento.enviar_lote_evento(lista_eventos, numero_lote)
+            retornos = documento.retornos_evento(proc_envio, lista_eventos)
+        except Exception as erro:
+            _logger.warning("Falha no envio do lote de eventos: %s", erro)
+            proc_envio, retornos = None, [None] * len(eventos)
+            for pendente in eventos:
+                pendente.erro = erro
+        for pendente, ret_evento in zip(eventos, retornos):
+            pendente.proc_envio = proc_envio
+            pendente.ret_evento = ret_evento
+            pendente.concluido.set()
+            if pendente.callback is not None:
+                try:
+                    pendente.callback(pendente)
+                except Exception:
+                    _logger.exception("Erro no callback do evento")
+
+    def fechar(self):
+        """Envia os lotes pendentes, aguarda o término dos envios e encerra a
+        fila."""
+        with self._condicao:
+            self._fechado = True
+            for chave_grupo in list(self._grupos):
+                self._enviar(chave_grupo)
+            self._condicao.notify_all()
+        self._executor.shutdown()
@@ -0,0 +1,240 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import bisect
+import threading
+import time
+from contextlib import suppress
+
+trace = None
+with suppress(ImportError):
+    from opentelemetry import trace
+
+# Fases instrumentadas de uma requisição
+FASE_POST = "post"  # requisição completa (_post / _post_async)
+FASE_SERIALIZACAO = "serializacao"  # binding generateDS para XML
+FASE_ASSINATURA = "assinatura"  # assina_raiz
+FASE_TRANSMISSAO = "transmissao"  # TLS, envio e processamento na SEFAZ
+FASE_ANALISE = "analise"  # interpretação da resposta SOAP
+
+# Limites superiores, em segundos, das faixas do histograma
+LIMITES_HISTOGRAMA = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    float("inf"),
+)
+
+
+class _SpanNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, erro, rastreamento):
+        return False
+
+    def definir(self, **atributos):
+        pass
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class Instrumentacao:
+    """Instrumentação das fases das requisições aos webservices.
+
+    Cada fase é medida por um span, gerenciador de contexto com os atributos
+    da fase (uf, operacao, url, c_stat, bytes...); atributos conhecidos
+    apenas no fim da fase são incluídos com ``span.definir(**atributos)``.
+
+    Esta implementação não registra nada: o span é um único objeto vazio,
+    sem custo além da chamada. Para coletar os tempos utilize o
+    ColetorHistograma ou a InstrumentacaoOpenTelemetry, atribuídos a
+    ``DocumentoEletronico._instrumentacao``.
+    """
+
+    def span(self, fase, **atributos):
+        return _SPAN_NULO
+
+
+INSTRUMENTACAO = Instrumentacao()
+
+
+class SpanTempo:
+    """Span que mede a duração da fase e a entrega a ``registrar`` da
+    instrumentação, com o nome da exceção em ``erro``, quando houver."""
+
+    __slots__ = ("_instrumentacao", "fase", "atributos", "_inicio")
+
+    def __init__(self, instrumentacao, fase, atributos):
+        self._instrumentacao = instrumentacao
+        self.fase = fase
+        self.atributos = atributos
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, erro, rastreamento):
+        duracao = time.perf_counter() - self._inicio
+        if tipo is not None:
+            self.atributos["erro"] = tipo.__name__
+        self._instrumentacao.registrar(self.fase, duracao, self.atributos)
+        return False
+
+    def definir(self, **atributos):
+        self.atributos.update(atributos)
+
+
+class Histograma:
+    """Distribuição das durações de uma fase em faixas fixas
+    (LIMITES_HISTOGRAMA)."""
+
+    def __init__(self, limites=LIMITES_HISTOGRAMA):
+        self.limites = limites
+        self.contagens = [0] * len(limites)
+        self.contagem = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, duracao):
+        self.contagens[bisect.bisect_left(self.limites, duracao)] += 1
+        self.contagem += 1
+        self.soma += duracao
+        self.maximo = max(self.maximo, duracao)
+
+    @property
+    def media(self):
+        if self.contagem:
+            return self.soma / self.contagem
+
+    def percentil(self, percentual):
+        """Limite superior da faixa que contém o percentual (0 a 100) das
+        durações, ou o máximo registrado na última faixa."""
+        if not self.contagem:
+            return None
+        alvo = self.contagem * percentual / 100
+        acumulado = 0
+        for limite, contagem in zip(self.limites, self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo and contagem:
+                return min(limite, self.maximo)
+        return self.maximo
+
+
+class ColetorHistograma(Instrumentacao):
+    """Acumula em memória um Histograma das durações por fase e pelos
+    atributos de ``agrupar``, e a quantidade de cada cStat por operação.
+
+    :param agrupar: atributos que separam os histogramas de uma fase
+    """
+
+    def __init__(self, agrupar=("operacao",), limites=LIMITES_HISTOGRAMA):
+        self.agrupar = agrupar
+        self.limites = limites
+        self.histogramas = {}
+        self.c_stats = {}
+        self._lock = threading.Lock()
+
+    def span(self, fase, **atributos):
+        return SpanTempo(self, fase, atributos)
+
+    def registrar(self, fase, duracao, atributos):
+        chave = (fase,) + tuple(atributos.get(nome) for nome in self.agrupar)
+        with self._lock:
+            histograma = self.histogramas.get(chave)
+            if histograma is None:
+                histograma = self.histogramas[chave] = Histograma(self.limites)
+            histograma.registrar(duracao)
+            if fase == FASE_POST and "c_stat" in atributos:
+                chave = (atributos.get("operacao"), atributos["c_stat"])
+                self.c_stats[chave] = self.c_stats.get(chave, 0) + 1
+
+    def histograma(self, fase, *grupo):
+        """Histograma da fase e dos valores dos atributos de ``agrupar``"""
+        return self.histogramas.get((fase,) + grupo)
+
+    def resumo(self):
+        """Lista de tuplas (fase, grupo..., contagem, média, p50, p95, p99)"""
+        with self._lock:
+            return [
+                chave
+                + (
+                    histograma.contagem,
+                    histograma.media,
+                    histograma.percentil(50),
+                    histograma.percentil(95),
+                    histograma.percentil(99),
+                )
+                for chave, histograma in sorted(
+                    self.histogramas.items(), key=lambda item: str(item[0])
+                )
+            ]
+
+
+class _SpanOpenTelemetry:
+    __slots__ = ("_contexto", "_span")
+
+    def __init__(self, contexto):
+        self._contexto = contexto
+
+    def __enter__(self):
+        self._span = self._contexto.__enter__()
+        return self
+
+    def __exit__(self, tipo, erro, rastreamento):
+        return self._contexto.__exit__(tipo, erro, rastreamento)
+
+    def definir(self, **atributos):
+        self._span.set_attributes(_atributos_open_telemetry(atributos))
+
+
+def _atributos_open_telemetry(atributos):
+    return {
+        "erpbrasil.edoc." + nome: valor
+        for nome, valor in atributos.items()
+        if valor is not None
+    }
+
+
+class InstrumentacaoOpenTelemetry(Instrumentacao):
+    """Cria um span do OpenTelemetry (``erpbrasil.edoc.<fase>``) para cada
+    fase, filho do span corrente, com os atributos prefixados por
+    ``erpbrasil.edoc.``. Exceções são registradas no span pelo próprio
+    OpenTelemetry.
+
+    :param tracer: opentelemetry.trace.Tracer, por padrão o do provedor
+        global (requer o pacote opentelemetry-api)
+    """
+
+    def __init__(self, tracer=None):
+        if tracer is None:
+            if trace is None:
+                raise ImportError(
+                    "opentelemetry-api é necessário para a "
+                    "InstrumentacaoOpenTelemetry: pip install opentelemetry-api"
+                )
+            tracer = trace.get_tracer("erpbrasil.edoc")
+        self.tracer = tracer
+
+    def span(self, fase, **atributos):
+        return _SpanOpenTelemetry(
+            self.tracer.start_as_current_span(
+                "erpbrasil.edoc." + fase,
+                attributes=_atributos_open_telemetry(atributos),
+            )
+        )
@@ -0,0 +1,287 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import abc
+import asyncio
+import collections
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# cStat 656: consumo indevido, o CNPJ fica bloqueado pela SEFAZ por 1 hora
+CONSUMO_INDEVIDO = "656"
+PENALIDADE_CONSUMO_INDEVIDO = 3600
+
+# Comportamento das chamadas acima do limite
+MODO_BLOQUEAR = "bloquear"  # aguarda até haver um token disponível
+MODO_FILA = "fila"  # reserva o próximo token, na ordem das chamadas
+MODO_REJEITAR = "rejeitar"  # levanta LimiteExcedido
+
+RegraLimite = collections.namedtuple("RegraLimite", ["capacidade", "taxa"])
+RegraLimite.__doc__ = """Balde de tokens: até ``capacidade`` requisições
+seguidas, repostas à ``taxa`` de requisições por segundo."""
+
+REGRA_LIMITE_PADRAO = RegraLimite(capacidade=10, taxa=1.0)
+
+
+class LimiteExcedido(Exception):
+    """Requisição acima do limite (modo rejeitar), ou cuja espera excede o
+    tempo máximo, por exemplo durante o bloqueio por consumo indevido.
+
+    :param chave: (CNPJ, UF, serviço)
+    :param espera: segundos até a requisição ser permitida
+    """
+
+    def __init__(self, chave, espera):
+        super().__init__(
+            f"Limite de requisições excedido para {chave}, aguarde {espera:.1f}s"
+        )
+        self.chave = chave
+        self.espera = espera
+
+
+class ArmazenamentoLimite(metaclass=abc.ABCMeta):
+    """Estado dos baldes de tokens, e do bloqueio e fator de redução da taxa
+    de cada chave após o consumo indevido.
+
+    O ArmazenamentoLimiteMemoria atende um único processo; para compartilhar
+    os limites entre processos e servidores utilize o
+    ArmazenamentoLimiteRedis, ou implemente os métodos ``consumir``, ``ler``
+    e ``gravar`` de forma atômica em outro armazenamento.
+    """
+
+    @abc.abstractmethod
+    def consumir(
+        self, chave, capacidade, taxa, agora, reservar=False, espera_maxima=None
+    ):
+        """Retira um token do balde da chave.
+
+        :param reservar: sem token disponível, reserva o próximo (o balde
+            fica negativo), garantindo a ordem de chegada
+        :param espera_maxima: a reserva só é feita quando a espera até o
+            token não excede estes segundos
+        :return: 0 quando o token foi retirado, ou os segundos até o token
+            disponível (ou reservado)
+        """
+
+    @abc.abstractmethod
+    def ler(self, chave):
+        """Retorna a tupla (bloqueado_ate, fator) da chave"""
+
+    @abc.abstractmethod
+    def gravar(self, chave, bloqueado_ate, fator):
+        """Grava o bloqueio e o fator de redução da taxa da chave"""
+
+
+def _consumir(tokens, atualizado, capacidade, taxa, agora, reservar, espera_maxima):
+    tokens = min(capacidade, tokens + max(agora - atualizado, 0) * taxa)
+    if tokens >= 1:
+        return tokens - 1, 0
+    espera = (1 - tokens) / taxa
+    if reservar and (espera_maxima is None or espera <= espera_maxima):
+        tokens -= 1
+    return tokens, espera
+
+
+class ArmazenamentoLimiteMemoria(ArmazenamentoLimite):
+    """Limites mantidos em memória, compartilhados pelas threads do
+    processo."""
+
+    def __init__(self):
+        self._baldes = {}
+        self._estados = {}
+        self._lock = threading.Lock()
+
+    def consumir(
+        self, chave, capacidade, taxa, agora, reservar=False, espera_maxima=None
+    ):
+        with self._lock:
+            tokens, atualizado = self._baldes.get(chave, (capacidade, agora))
+            tokens, espera = _consumir(
+                tokens, atualizado, capacidade, taxa, agora, reservar, espera_maxima
+            )
+            self._baldes[chave] = (tokens, agora)
+            return espera
+
+    def ler(self, chave):
+        return self._estados.get(chave, (0, 1.0))
+
+    def gravar(self, chave, bloqueado_ate, fator):
+        with self._lock:
+            self._estados[chave] = (bloqueado_ate, fator)
+
+
+_SCRIPT_CONSUMIR = """
+local capacidade = tonumber(ARGV[1])
+local taxa = tonumber(ARGV[2])
+local agora = tonumber(ARGV[3])
+local espera_maxima = tonumber(ARGV[6])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or ARGV[1])
+local atualizado = tonumber(redis.call('HGET', KEYS[1], 'atualizado') or ARGV[3])
+tokens = math.min(capacidade, tokens + math.max(agora - atualizado, 0) * taxa)
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    espera = (1 - tokens) / taxa
+    if ARGV[4] == '1' and (espera_maxima == nil or espera <= espera_maxima) then
+        tokens = tokens - 1
+    end
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'atualizado', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return tostring(espera)
+"""
+
+
+class ArmazenamentoLimiteRedis(ArmazenamentoLimite):
+    """Limites compartilhados em um servidor Redis (ou compatível). O token
+    é retirado por um script Lua, de forma atômica entre os processos.
+
+    :param cliente: cliente redis-py (redis.Redis) ou compatível, com os
+        métodos ``eval``, ``hmget`` e ``hset``
+    :param prefixo: prefixo das chaves no Redis
+    :param expiracao: segundos sem uso até a remoção do balde
+    """
+
+    def __init__(self, cliente, prefixo="erpbrasil.edoc:limite:", expiracao=86400):
+        self.cliente = cliente
+        self.prefixo = prefixo
+        self.expiracao = expiracao
+
+    def _chave(self, chave):
+        return self.prefixo + ":".join(str(parte) for parte in chave)
+
+    def consumir(
+        self, chave, capacidade, taxa, agora, reservar=False, espera_maxima=None
+    ):
+        return float(
+            self.cliente.eval(
+                _SCRIPT_CONSUMIR,
+                1,
+                self._chave(chave),
+                capacidade,
+                taxa,
+                repr(agora),
+                int(reservar),
+                self.expiracao,
+                "" if espera_maxima is None else repr(espera_maxima),
+            )
+        )
+
+    def ler(self, chave):
+        bloqueado_ate, fator = self.cliente.hmget(
+            self._chave(chave), "bloqueado_ate", "fator"
+        )
+        return float(bloqueado_ate or 0), float(fator or 1.0)
+
+    def gravar(self, chave, bloqueado_ate, fator):
+        self.cliente.hset(
+            self._chave(chave),
+            mapping={"bloqueado_ate": repr(bloqueado_ate), "fator": repr(fator)},
+        )
+
+
+class LimitadorRequisicoes:
+    """Limita a taxa de requisições aos webservices por (CNPJ, UF, serviço),
+    evitando o bloqueio por consumo indevido (cStat 656).
+
+    Cada chave tem um balde de tokens (RegraLimite) do serviço. Acima do
+    limite a chamada aguarda (MODO_BLOQUEAR), aguarda a sua vez na ordem de
+    chegada (MODO_FILA) ou é rejeitada (MODO_REJEITAR) com LimiteExcedido;
+    esperas maiores que ``espera_maxima`` também são rejeitadas.
+
+    Após um cStat 656 a chave fica bloqueada por ``penalidade`` segundos, e
+    a taxa do balde é reduzida à metade (até ``fator_minimo``). Cada
+    requisição bem sucedida recupera ``recuperacao`` do fator, até a taxa
+    original.
+
+    :param regras: dicionário {serviço (operação SOAP): RegraLimite}
+    :param regra_padrao: RegraLimite dos serviços sem regra
+    :param armazenamento: ArmazenamentoLimite, por padrão em memória
+    :param modo: MODO_BLOQUEAR, MODO_FILA ou MODO_REJEITAR
+    :param espera_maxima: segundos de espera máxima antes da rejeição
+    :param relogio: função que retorna o horário atual (time.time,
+        compartilhado entre servidores)
+    """
+
+    def __init__(
+        self,
+        regras=None,
+        regra_padrao=REGRA_LIMITE_PADRAO,
+        armazenamento=None,
+        modo=MODO_BLOQUEAR,
+        espera_maxima=60,
+        penalidade=PENALIDADE_CONSUMO_INDEVIDO,
+        fator_minimo=0.125,
+        recuperacao=0.05,
+        relogio=time.time,
+        dormir=time.sleep,
+    ):
+        self.regras = regras or {}
+        self.regra_padrao = regra_padrao
+        self.armazenamento = armazenamento or ArmazenamentoLimiteMemoria()
+        self.modo = modo
+        self.espera_maxima = espera_maxima
+        self.penalidade = penalidade
+        self.fator_minimo = fator_minimo
+        self.recuperacao = recuperacao
+        self.relogio = relogio
+        self.dormir = dormir
+
+    def _esperas(self, chave):
+        """Gera as esperas necessárias até a chamada ser permitida"""
+        regra = self.regras.get(chave[-1], self.regra_padrao)
+        esperado = 0
+        while True:
+            agora = self.relogio()
+            bloqueado_ate, fator = self.armazenamento.ler(chave)
+            if bloqueado_ate > agora:
+                espera = bloqueado_ate - agora
+            else:
+                espera = self.armazenamento.consumir(
+                    chave,
+                    regra.capacidade,
+                    regra.taxa * fator,
+                    agora,
+                    reservar=self.modo == MODO_FILA,
+                    espera_maxima=self.espera_maxima - esperado,
+                )
+                if not espera:
+                    return
+                if self.modo == MODO_FILA and esperado + espera <= self.espera_maxima:
+                    yield espera
+                    return
+            if self.modo == MODO_REJEITAR or esperado + espera > self.espera_maxima:
+                raise LimiteExcedido(chave, espera)
+            esperado += espera
+            yield espera
+
+    def adquirir(self, chave):
+        """Aguarda até a requisição da chave (CNPJ, UF, serviço) ser
+        permitida."""
+        for espera in self._esperas(chave):
+            self.dormir(espera)
+
+    async def adquirir_async(self, chave):
+        for espera in self._esperas(chave):
+            await asyncio.sleep(espera)
+
+    def registrar_retorno(self, chave, c_stat):
+        """Registra o cStat do retorno da requisição da chave"""
+        bloqueado_ate, fator = self.armazenamento.ler(chave)
+        if c_stat == CONSUMO_INDEVIDO:
+            fator = max(fator / 2, self.fator_minimo)
+            _logger.warning(
+                "Consumo indevido em %s: bloqueado por %ss, taxa reduzida a %.0f%%",
+                chave,
+                self.penalidade,
+                fator * 100,
+            )
+            self.armazenamento.gravar(chave, self.relogio() + self.penalidade, fator)
+        elif fator < 1:
+            self.armazenamento.gravar(
+                chave, bloqueado_ate, min(fator + self.recuperacao, 1.0)
+            )
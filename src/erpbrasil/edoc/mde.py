@@ -1,12 +1,16 @@
 # Copyright (C) 2020 - KMEE
 
-
-import re
+import collections
+import logging
 
 from lxml import etree
 
-from erpbrasil.edoc.nfe import NFe, localizar_url
-from erpbrasil.edoc.resposta import RetornoSoap
+from erpbrasil.edoc.nfe import NFE_LOTE_MAXIMO_EVENTOS, NFe, localizar_url
+from erpbrasil.edoc.resposta import (
+    RetornoSoap,
+    construir_resposta,
+    localizar_corpo_soap,
+)
 from erpbrasil.transmissao import TransmissaoSOAP
 
 try:
@@ -20,8 +24,44 @@ try:
 except ImportError:
     pass
 
+_logger = logging.getLogger(__name__)
+
 WS_NFE_RECEPCAO_EVENTO = "RecepcaoEvento"
 
+CONFIRMACAO_DA_OPERACAO = "210200"
+CIENCIA_DA_OPERACAO = "210210"
+DESCONHECIMENTO_DA_OPERACAO = "210220"
+OPERACAO_NAO_REALIZADA = "210240"
+
+DESCRICAO_MANIFESTACAO = {
+    CONFIRMACAO_DA_OPERACAO: "Confirmacao da Operacao",
+    CIENCIA_DA_OPERACAO: "Ciencia da Operacao",
+    DESCONHECIMENTO_DA_OPERACAO: "Desconhecimento da Operacao",
+    OPERACAO_NAO_REALIZADA: "Operacao nao Realizada",
+}
+
+NAMESPACE_WSDL = "http://www.portalfiscal.inf.br/nfe/wsdl/"
+
+VERSAO_CABECALHO = "1.00"
+
+# Mensagens enviadas com o cabeçalho nfeCabecMsg, pela operação (None para
+# qualquer operação) e nome do elemento raiz: parte do corpo SOAP (None para
+# enviar a mensagem como argumento da operação) e namespace do cabeçalho
+MENSAGENS_CABECALHO = {
+    (None, "distDFeInt"): ("nfeDadosMsg", NAMESPACE_WSDL),
+    ("nfeRecepcaoEvento", "consStatServ"): (None, NAMESPACE_WSDL + "RecepcaoEvento"),
+}
+
+# cSitNFe do resNFe: a ciência da NF-e cancelada é rejeitada pela SEFAZ
+SITUACAO_NFE_CANCELADA = "3"
+
+# Resultado da manifestação de uma NF-e: ``c_stat`` é o cStat do retEvento,
+# ou do lote quando não houve retorno do evento (lote rejeitado), e ``erro``
+# a exceção ocorrida no envio do lote
+ResultadoManifestacao = collections.namedtuple(
+    "ResultadoManifestacao", ["chave", "tp_evento", "c_stat", "ret_evento", "erro"]
+)
+
 SIGLA_ESTADO = {
     "12": "AC",
     "27": "AL",
@@ -73,31 +113,19 @@ class MDe(NFe):
         raiz.original_tagname_ = "envEvento"
         xml_envio_string, xml_envio_etree = self._generateds_to_string_etree(raiz)
 
+        eventos_assinar = []
         for raiz_evento in lista_eventos:
             evento = TEventoManifestacao(
                 versao="1.00",
                 infEvento=raiz_evento,
             )
             evento.original_tagname_ = "evento"
+            eventos_assinar.append((evento, evento.infEvento.Id))
 
-            # Recupera o evento do XML assinado
-            xml_assinado = (
-                self.assina_raiz(evento, evento.infEvento.Id).replace("\n", "").encode()
-            )
-
+        # Inclui os eventos, assinados em paralelo, no envio
+        for xml_assinado in self.assina_raizes(eventos_assinar):
             xml_envio_etree.append(etree.fromstring(xml_assinado))
 
-            # FIXME: Essa forma de geração foi removida no ultimo refactor
-
-            # Converte o xml_assinado para um objeto pelo
-            # parser do esquema leiauteConfRecebto
-
-            # xml_object = retEnvConfRecebto.parseString(xml_assinado)
-
-            # Adiciona o xml_object na lista de eventos. Desse modo a lista
-            # de eventos terá um evento assinado corretamente
-            # eventos.append(xml_object)
-
         return self._post(
             xml_envio_etree,
             localizar_url(
@@ -215,91 +243,167 @@ class MDe(NFe):
             xJust="".zfill(15),
         )
 
+    def manifestar_lote(self, manifestacoes, cnpj_cpf, tamanho=NFE_LOTE_MAXIMO_EVENTOS):
+        """
+        Envia a manifestação de várias NF-e em lotes envEvento de até
+        ``tamanho`` eventos, com os eventos de cada lote assinados em
+        paralelo (assina_raizes). A falha no envio de um lote é registrada
+        nos resultados dos seus eventos e não interrompe os lotes seguintes.
+        :param manifestacoes: tuplas (chave, tpEvento) ou, para a Operação
+                             não Realizada, (chave, tpEvento, xJust); uma
+                             manifestação por chave
+        :param cnpj_cpf:   CPF ou CNPJ
+        :return: dicionário chave: ResultadoManifestacao, na ordem recebida
+        """
+        if not 1 <= tamanho <= NFE_LOTE_MAXIMO_EVENTOS:
+            raise ValueError(
+                "O lote deve conter entre 1 e %d eventos" % NFE_LOTE_MAXIMO_EVENTOS
+            )
+        eventos = {}
+        for manifestacao in manifestacoes:
+            chave, tp_evento, x_just = (tuple(manifestacao) + (None,))[:3]
+            tp_evento = str(tp_evento)
+            if chave in eventos:
+                raise ValueError(f"Manifestação repetida da NF-e {chave}")
+            if tp_evento == OPERACAO_NAO_REALIZADA and x_just is None:
+                x_just = "".zfill(15)
+            eventos[chave] = self.nfe_recepcao_monta_evento(
+                chave,
+                cnpj_cpf,
+                tp_evento,
+                DESCRICAO_MANIFESTACAO[tp_evento],
+                xJust=x_just,
+            )
+
+        eventos = list(eventos.values())
+        resultados = {}
+        for inicio in range(0, len(eventos), tamanho):
+            lote = eventos[inicio : inicio + tamanho]
+            erro = c_stat_lote = None
+            try:
+                proc_envio = self.nfe_recepcao_envia_lote_evento(lote)
+                retornos = self.retornos_evento(proc_envio, lote)
+                c_stat_lote = proc_envio.resposta and proc_envio.resposta.cStat
+            except Exception as erro_envio:
+                _logger.warning(
+                    "Falha no envio do lote de manifestações: %s", erro_envio
+                )
+                erro, retornos = erro_envio, [None] * len(lote)
+            for evento, ret_evento in zip(lote, retornos):
+                c_stat = (
+                    c_stat_lote if ret_evento is None else ret_evento.infEvento.cStat
+                )
+                resultados[evento.chNFe] = ResultadoManifestacao(
+                    evento.chNFe, evento.tpEvento, c_stat, ret_evento, erro
+                )
+        return resultados
+
+    def ciencia_da_operacao_lote(self, chaves, cnpj_cpf):
+        return self.manifestar_lote(
+            ((chave, CIENCIA_DA_OPERACAO) for chave in chaves), cnpj_cpf
+        )
+
+    def ciencia_da_operacao_distribuicao(self, documentos, cnpj_cpf):
+        """
+        Envia a Ciência da Operação das NF-e recebidas na distribuição de
+        DF-e, por exemplo os documentos de SincronizadorDistribuicao.sincronizar,
+        permitindo o download das NF-e completas (procNFe) nas próximas
+        consultas. Somente os resumos (resNFe) das NF-e não canceladas são
+        manifestados.
+        :param documentos: DocumentoDistribuicao recebidos
+        :return: dicionário chave: ResultadoManifestacao (manifestar_lote)
+        """
+        chaves = {}
+        for documento in documentos:
+            if documento.tipo != "resNFe":
+                continue
+            res_nfe = documento.etree()
+            situacao = res_nfe.findtext(f"{{{self._namespace}}}cSitNFe")
+            if situacao != SITUACAO_NFE_CANCELADA:
+                chaves[res_nfe.findtext(f"{{{self._namespace}}}chNFe")] = None
+        return self.ciencia_da_operacao_lote(chaves, cnpj_cpf)
+
     def analisar_retorno_raw(self, operacao, raiz, xml, retorno, classe):
         """
         Semelhante ao metodo generico, mas usando o primeiro filho
         do XML da resposta.
         """
         retorno.raise_for_status()
-        match = re.search(
-            "<soap:Body>(.*?)</soap:Body>", retorno.text.replace("\n", "")
-        )
-        if match:
-            xml_resposta = match.group(1)
-            xml = etree.fromstring(xml_resposta)[0]
+        corpo = localizar_corpo_soap(retorno.content)
+        if corpo is not None and len(corpo) and len(corpo[0]):
+            xml = corpo[0][0]
             if "nfeDistDFeInteresseResult" in xml.tag:
                 xml = xml[0]  # unwrapp retDistDFeInt
-            resultado = etree.tostring(xml)
-            classe.Validate_simpletypes_ = False
-            resposta = classe.parseString(resultado, silence=True)
+            resposta = construir_resposta(classe, xml)
             return RetornoSoap(operacao, raiz, xml, retorno, resposta)
 
-    def _post(self, raiz, url, operacao, classe):
-        from .nfe import SIGLA_ESTADO
-
-        xml_string, xml_etree = self._generateds_to_string_etree(raiz)
-        with self._transmissao.cliente(url):
-            # Recupera a sigla do estado
-            uf_list = [
-                uf
-                for nUF, uf in SIGLA_ESTADO.items()
-                if nUF == str(getattr(raiz, "cUFAutor", ""))
-            ]
-            kwargs = {"uf": uf_list[0]} if uf_list else {}
-            retorno = self._transmissao.enviar(operacao, xml_etree, **kwargs)
-            return self.analisar_retorno_raw(
-                operacao, raiz, xml_string, retorno, classe
-            )
+    def _kwargs_transmissao(self, raiz):
+        # Recupera a sigla do estado
+        uf = SIGLA_ESTADO.get(str(getattr(raiz, "cUFAutor", "")))
+        return {"uf": uf} if uf else {}
+
+    def _enviar(self, raiz, operacao, xml_etree):
+        return self._transmissao.enviar(
+            operacao, xml_etree, **self._kwargs_transmissao(raiz)
+        )
+
+    def _argumentos_envio(self, raiz, operacao, xml_etree):
+        kwargs = self._kwargs_transmissao(raiz)
+        if not kwargs:
+            return super()._argumentos_envio(raiz, operacao, xml_etree)
+        return self._transmissao._argumentos(xml_etree, operacao, **kwargs)
 
 
 class TransmissaoMDE(TransmissaoSOAP):
-    def interpretar_mensagem(self, mensagem, **kwargs):
-        # TODO: Finalizar refatoração
-        if isinstance(mensagem, str):
-            return etree.fromstring(
-                mensagem, parser=etree.XMLParser(remove_blank_text=True)
+    # nfeCabecMsg de cada (xmlns, uf, versão), reutilizados em todos os
+    # envios: o zeep copia os cabeçalhos ao montar cada envelope
+    _cabecalhos = {}
+
+    def cabecalho(self, xmlns, uf, versao=VERSAO_CABECALHO):
+        chave = (xmlns, uf, versao)
+        cabecalho = self._cabecalhos.get(chave)
+        if cabecalho is None:
+            cabecalho = self._cabecalhos[chave] = etree.fromstring(
+                f'<nfeCabecMsg xmlns="{xmlns}">'
+                f"<cUF>{uf}</cUF>"
+                f"<versaoDados>{versao}</versaoDados>"
+                "</nfeCabecMsg>"
             )
+        return cabecalho
 
-        operacao = kwargs.get("operacao", "")
-        uf = kwargs.get("uf", "")
-
-        if operacao and uf:
-            _soapheaders = []
-            xmlns = "http://www.portalfiscal.inf.br/nfe/wsdl/"
-
-            if "distDFeInt" in mensagem.tag:
-                mensagem = {"nfeDadosMsg": mensagem}
-            elif "TEnvEvento" in mensagem.tag:
-                xmlns += "NFeRecepcaoEvento4"
-                mensagem = {"nfeCabecMsg": mensagem}
-            elif operacao == "nfeRecepcaoEvento" and "consStatServ" in mensagem.tag:
-                xmlns += "RecepcaoEvento"
-                mensagem = {"mensagem": mensagem}
-
-            if isinstance(mensagem, dict):
-                header_str = (
-                    '<nfeCabecMsg xmlns="{}">'
-                    "<cUF>{}</cUF>"
-                    "<versaoDados>{}</versaoDados>"
-                    "</nfeCabecMsg>".format(xmlns, uf, mensagem.get("versao", "1.00"))
-                )
+    def interpretar_mensagem(self, mensagem, **kwargs):
+        """Retorna o elemento raiz da mensagem (XML em str ou elemento).
+
+        O nfeCabecMsg e a parte da operação são montados em _argumentos.
+        """
+        return super().interpretar_mensagem(mensagem)
 
-                _soapheaders.append(etree.fromstring(header_str))
-                mensagem["_soapheaders"] = _soapheaders
+    def _argumentos(self, mensagem, operacao=None, uf=None):
+        """Monta os argumentos da operação SOAP.
 
-        return mensagem
+        :param mensagem: XML (str) ou elemento raiz da mensagem
+        :param operacao: operação do webservice
+        :param uf: sigla da UF, incluindo o nfeCabecMsg nas mensagens de
+            MENSAGENS_CABECALHO
+        :return: tupla (args, kwargs) da chamada da operação
+        """
+        if isinstance(mensagem, str):
+            return (self.interpretar_mensagem(mensagem),), {}
+
+        if uf:
+            nome = mensagem.tag.rpartition("}")[2]
+            envio = MENSAGENS_CABECALHO.get(
+                (operacao, nome)
+            ) or MENSAGENS_CABECALHO.get((None, nome))
+            if envio is not None:
+                parte, xmlns = envio
+                cabecalhos = [self.cabecalho(xmlns, uf)]
+                if parte is None:
+                    return (mensagem,), {"_soapheaders": cabecalhos}
+                return (), {parte: mensagem, "_soapheaders": cabecalhos}
+        return (mensagem,), {}
 
     def enviar(self, operacao, mensagem, **kwargs):
-        kwargs["operacao"] = operacao
-        mensagem = self.interpretar_mensagem(mensagem, **kwargs)
+        args, kwargs = self._argumentos(mensagem, operacao, **kwargs)
         with self._cliente.settings(raw_response=self.raw_response):
-            if isinstance(mensagem, dict):
-                # TODO: Remover necessidade desse IF
-                if operacao == "nfeRecepcaoEvento" and "consStatServ" in mensagem.tag:
-                    return self._cliente.service[operacao](
-                        mensagem, _soapheaders=mensagem.get("_soapheaders")
-                    )
-
-                # TODO: Juntar dois retornos em um
-                return self._cliente.service[operacao](**mensagem)
-            return self._cliente.service[operacao](mensagem)
+            return self._cliente.service[operacao](*args, **kwargs)
@@ -3,7 +3,6 @@
 
 import binascii
 import datetime
-import time
 
 from lxml import etree
 
@@ -120,11 +119,19 @@ class MDFe(DocumentoEletronico):
             == self._edoc_situacao_arquivo_recebido_com_sucesso
         )
 
+    def _chave_status_servico(self):
+        return (
+            self.uf,
+            self.mod,
+            self.ambiente,
+            localizar_url(WS_MDFE_SITUACAO, int(self.ambiente)),
+        )
+
     def _verifica_servico_em_operacao(self, proc_servico):
         return proc_servico.resposta.cStat == self._edoc_situacao_servico_em_operacao
 
-    def _aguarda_tempo_medio(self, proc_envio):
-        time.sleep(float(proc_envio.resposta.infRec.tMed) * 1.3)
+    def _tempo_espera(self, proc_envio):
+        return float(proc_envio.resposta.infRec.tMed) * 1.3
 
     def _edoc_situacao_em_processamento(self, proc_recibo):
         return proc_recibo.resposta.cStat == "105"
@@ -145,7 +152,13 @@ class MDFe(DocumentoEletronico):
         return f"{self.monta_qrcode(chave)}&sign={digest_value_hex}"
 
     def status_servico(self):
-        return self._post(
+        return self._post(*self._prepara_status_servico())
+
+    async def status_servico_async(self):
+        return await self._post_async(*self._prepara_status_servico())
+
+    def _prepara_status_servico(self):
+        return (
             ConsStatServMdfe(tpAmb=self.ambiente, versao=self.versao),
             localizar_url(WS_MDFE_SITUACAO, int(self.ambiente)),
             "mdfeStatusServicoMDF",
@@ -153,12 +166,18 @@ class MDFe(DocumentoEletronico):
         )
 
     def consulta_documento(self, chave):
+        return self._post(*self._prepara_consulta_documento(chave))
+
+    async def consulta_documento_async(self, chave):
+        return await self._post_async(*self._prepara_consulta_documento(chave))
+
+    def _prepara_consulta_documento(self, chave):
         raiz = ConsSitMdfe(
             versao=self.versao,
             tpAmb=self.ambiente,
             chMDFe=chave,
         )
-        return self._post(
+        return (
             raiz,
             localizar_url(WS_MDFE_CONSULTA, int(self.ambiente)),
             "mdfeConsultaMDF",
@@ -188,13 +207,19 @@ class MDFe(DocumentoEletronico):
         :param edoc:
         :return:
         """
+        return self._post(*self._prepara_envia_documento(edoc))
+
+    async def envia_documento_async(self, edoc):
+        return await self._post_async(*self._prepara_envia_documento(edoc))
+
+    def _prepara_envia_documento(self, edoc):
         raiz = EnviMdfe(
             versao=self.versao,
             idLote=datetime.datetime.now().strftime("%Y%m%d%H%M%S"),
             MDFe=edoc,
         )
-        xml_assinado = self.assina_raiz(raiz, edoc.infMDFe.Id)
-        return self._post(
+        xml_assinado = self.assina_elemento(raiz, edoc.infMDFe.Id)
+        return (
             xml_assinado,
             localizar_url(WS_MDFE_RECEPCAO, int(self.ambiente)),
             "mdfeRecepcaoLote",
@@ -202,6 +227,16 @@ class MDFe(DocumentoEletronico):
         )
 
     def consulta_recibo(self, numero=False, proc_envio=False):
+        mensagem = self._prepara_consulta_recibo(numero, proc_envio)
+        if mensagem:
+            return self._post(*mensagem)
+
+    async def consulta_recibo_async(self, numero=False, proc_envio=False):
+        mensagem = self._prepara_consulta_recibo(numero, proc_envio)
+        if mensagem:
+            return await self._post_async(*mensagem)
+
+    def _prepara_consulta_recibo(self, numero=False, proc_envio=False):
         if proc_envio:
             numero = proc_envio.resposta.infRec.nRec
 
@@ -213,7 +248,7 @@ class MDFe(DocumentoEletronico):
             tpAmb=self.ambiente,
             nRec=numero,
         )
-        return self._post(
+        return (
             raiz,
             localizar_url(WS_MDFE_RET_RECEPCAO, int(self.ambiente)),
             "mdfeRetRecepcao",
@@ -247,7 +282,7 @@ class MDFe(DocumentoEletronico):
             ),
         )
         raiz = EventoMdfe(versao="3.00", infEvento=inf_evento)
-        xml_assinado = etree.fromstring(self.assina_raiz(raiz, raiz.infEvento.Id))
+        xml_assinado = self.assina_elemento(raiz, raiz.infEvento.Id)
 
         return self._post(
             xml_assinado,
@@ -0,0 +1,92 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import re
+import string
+from xml.sax.saxutils import escape
+
+NAMESPACE_NFE = "http://www.portalfiscal.inf.br/nfe"
+
+_TP_AMB = re.compile(r"[12]")
+_C_UF = re.compile(r"\d{2}")
+_VERSAO = re.compile(r"\d\.\d{2}")
+_CHAVE = re.compile(r"\d{44}")
+_RECIBO = re.compile(r"\d{15}")
+_UF = re.compile(r"[A-Z]{2}")
+_CNPJ = re.compile(r"\d{14}")
+_CPF = re.compile(r"\d{11}")
+_IE = re.compile(r"ISENTO|\d{2,14}")
+
+
+class ModeloMensagem:
+    """Monta mensagens de formato fixo (consultas) diretamente a partir de um
+    modelo pré-compilado, sem a exportação do binding generateDS.
+
+    Os campos do modelo (``{campo}``) são validados pelo padrão do esquema
+    e escapados. Os campos ``opcionais`` geram o elemento ``<campo>`` apenas
+    quando informados.
+
+    :param modelo: XML da mensagem, com os campos entre chaves
+    :param padroes: dicionário {campo: expressão regular compilada}
+    :param opcionais: campos cujo elemento é omitido quando None
+    """
+
+    def __init__(self, modelo, padroes, opcionais=()):
+        self.padroes = padroes
+        self.opcionais = frozenset(opcionais)
+        self._partes = [
+            (texto, campo) for texto, campo, _, _ in string.Formatter().parse(modelo)
+        ]
+
+    def montar(self, **valores):
+        """Retorna o XML da mensagem (str), ou None quando algum valor não
+        atende ao padrão do esquema; neste caso a mensagem deve ser montada
+        pelo binding, que a envia como informada."""
+        partes = []
+        for texto, campo in self._partes:
+            partes.append(texto)
+            if campo is None:
+                continue
+            valor = valores.get(campo)
+            if valor is None:
+                if campo in self.opcionais:
+                    continue
+                return None
+            valor = str(valor)
+            if not self.padroes[campo].fullmatch(valor):
+                return None
+            if campo in self.opcionais:
+                partes.append(f"<{campo}>{escape(valor)}</{campo}>")
+            else:
+                partes.append(escape(valor))
+        return "".join(partes)
+
+
+CONS_STAT_SERV = ModeloMensagem(
+    f'<consStatServ xmlns="{NAMESPACE_NFE}" versao="{{versao}}">'
+    "<tpAmb>{tpAmb}</tpAmb><cUF>{cUF}</cUF><xServ>STATUS</xServ>"
+    "</consStatServ>",
+    {"versao": _VERSAO, "tpAmb": _TP_AMB, "cUF": _C_UF},
+)
+
+CONS_SIT_NFE = ModeloMensagem(
+    f'<consSitNFe xmlns="{NAMESPACE_NFE}" versao="{{versao}}">'
+    "<tpAmb>{tpAmb}</tpAmb><xServ>CONSULTAR</xServ><chNFe>{chNFe}</chNFe>"
+    "</consSitNFe>",
+    {"versao": _VERSAO, "tpAmb": _TP_AMB, "chNFe": _CHAVE},
+)
+
+CONS_RECI_NFE = ModeloMensagem(
+    f'<consReciNFe xmlns="{NAMESPACE_NFE}" versao="{{versao}}">'
+    "<tpAmb>{tpAmb}</tpAmb><nRec>{nRec}</nRec>"
+    "</consReciNFe>",
+    {"versao": _VERSAO, "tpAmb": _TP_AMB, "nRec": _RECIBO},
+)
+
+CONS_CAD = ModeloMensagem(
+    f'<ConsCad xmlns="{NAMESPACE_NFE}" versao="2.00">'
+    "<infCons><xServ>CONS-CAD</xServ><UF>{UF}</UF>{IE}{CNPJ}{CPF}</infCons>"
+    "</ConsCad>",
+    {"UF": _UF, "IE": _IE, "CNPJ": _CNPJ, "CPF": _CPF},
+    opcionais=("IE", "CNPJ", "CPF"),
+)
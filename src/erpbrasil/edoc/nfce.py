@@ -3,12 +3,11 @@
 import binascii
 import datetime
 import hashlib
-import xml.etree.ElementTree as ET
 from contextlib import suppress
 
 from lxml import etree
 
-from erpbrasil.edoc.nfe import SIGLA_ESTADO, WS_NFE_AUTORIZACAO, NFe, localizar_url
+from erpbrasil.edoc.nfe import SIGLA_ESTADO, WS_NFE_AUTORIZACAO, NFe
 
 with suppress(ImportError):
     from nfelib.v4_00 import retEnviNFe
@@ -288,14 +287,10 @@ class NFCe(NFe):
     def consulta_qrcode_url(self):
         return ESTADO_CONSULTA_NFCE[SIGLA_ESTADO[str(self.uf)]][self.ambiente]
 
-    def _generate_qrcode_contingency(self, edoc, xml_assinado):
-        xml = ET.fromstring(xml_assinado)
+    def _generate_qrcode_contingency(self, edoc, digest_value):
         chave_nfce = edoc.infNFe.Id.replace("NFe", "")
         data_emissao = edoc.infNFe.ide.dhEmi[8:10]
-        total_nfe = xml.find(
-            ".//nfe:total/nfe:ICMSTot/nfe:vNF", namespaces=NAMESPACES
-        ).text
-        digest_value = xml.find(".//ds:DigestValue", namespaces=NAMESPACES).text
+        total_nfe = edoc.infNFe.total.ICMSTot.vNF
         digest_value_hex = binascii.hexlify(digest_value.encode()).decode()
         pre_qrcode_witouth_csc = (
             f"{chave_nfce}|{self.qrcode_versao}|{self.ambiente}|{data_emissao}"
@@ -309,27 +304,55 @@ class NFCe(NFe):
         return self._build_qrcode(pre_qrcode_witouth_csc, qr_hash)
 
     def _update_qrcode_nfce_contingency(self, edoc, xml_assinado):
-        text = self._generate_qrcode_contingency(edoc, xml_assinado)
+        digest_value = xml_assinado.findtext(
+            "ds:Signature/ds:SignedInfo/ds:Reference/ds:DigestValue",
+            namespaces=NAMESPACES,
+        )
+        text = self._generate_qrcode_contingency(edoc, digest_value)
         edoc.infNFeSupl.qrCode = text
+        # O infNFeSupl não faz parte da assinatura (infNFe): o qrCode ausente
+        # no XML exportado é incluído antes do urlChave
+        supl = xml_assinado.find("nfe:infNFeSupl", namespaces=NAMESPACES)
+        qrcode = supl.find("nfe:qrCode", namespaces=NAMESPACES)
+        if qrcode is None:
+            qrcode = etree.SubElement(supl, f"{{{NAMESPACES['nfe']}}}qrCode")
+            url_chave = supl.find("nfe:urlChave", namespaces=NAMESPACES)
+            if url_chave is not None:
+                url_chave.addprevious(qrcode)
+        qrcode.text = text
 
-    def envia_documento(self, edoc):
-        xml_assinado = self.assina_raiz(edoc, edoc.infNFe.Id)
+    def _prepara_envia_documento(self, edoc):
+        xml_assinado = self.assina_documento(edoc)
+        self._registra_saida_assinados([xml_assinado])
+        return self._prepara_envia_assinado(xml_assinado)
 
-        # If the emission is diff from 1, the NFCe was issued in contingency.
-        #
-        # Therefore, it is necessary that there is a change in the generation
-        #   of QR COde. And, as one of the necessary values is the digestValue,
-        #   calculated during the signature, it is necessary that the edoc
-        #   values be updated and signed again so as not to cause a divergence
-        #   in the signature with Sefaz.
+    def envia_assinado(self, xml_assinado):
+        """Envia uma NFC-e já assinada (assina_documento), por exemplo emitida
+        offline em contingência, sem assiná-la novamente."""
+        return self._post_envio(self._prepara_envia_assinado(xml_assinado))
+
+    def assina_documento(self, edoc):
+        """Assina a NFC-e, com o QR Code de contingência quando emitida fora
+        da emissão normal (tpEmis diferente de 1).
+
+        :return: elemento lxml da NFC-e assinada
+        """
+        xml_assinado = self.assina_elemento(edoc, edoc.infNFe.Id)
 
-        root = ET.fromstring(xml_assinado)
-        tp_emis = root.find(".//nfe:tpEmis", namespaces=NAMESPACES).text
+        # If the emission is diff from 1, the NFCe was issued in contingency,
+        #   and the QR Code includes the digestValue of the signature.
+        #
+        # The signature reference is the infNFe: the infNFeSupl, outside of
+        #   it, is not part of the digest. So the QR Code is included in the
+        #   signed document, without signing it again.
 
-        if tp_emis != "1":
+        if str(edoc.infNFe.ide.tpEmis) != "1":
             self._update_qrcode_nfce_contingency(edoc, xml_assinado)
-            xml_assinado = self.assina_raiz(edoc, edoc.infNFe.Id)
+        return xml_assinado
 
+    def _prepara_envia_assinado(self, xml_assinado):
+        if not isinstance(xml_assinado, etree._Element):
+            xml_assinado = etree.fromstring(xml_assinado)
         raiz = retEnviNFe.TEnviNFe(
             versao=self.versao,
             idLote=datetime.datetime.now().strftime("%Y%m%d%H%M%S"),
@@ -337,21 +360,22 @@ class NFCe(NFe):
         )
         raiz.original_tagname_ = "enviNFe"
         xml_envio_string, xml_envio_etree = self._generateds_to_string_etree(raiz)
-        xml_envio_etree.append(etree.fromstring(xml_assinado))
+        xml_envio_etree.append(xml_assinado)
 
-        return self._post(
+        return (
             xml_envio_etree,
-            localizar_url(
-                WS_NFE_AUTORIZACAO, str(self.uf), self.mod, int(self.ambiente)
-            ),
+            self._rota(WS_NFE_AUTORIZACAO),
             "nfeAutorizacaoLote",
             retEnviNFe,
         )
 
-    def _aguarda_tempo_medio(self, proc_envio):
-        pass
+    def _tempo_espera(self, proc_envio):
+        return 0
 
     def consulta_recibo(self, proc_envio):
         # Since NFCe is synchronous it is not necessary to consult the receipt,
         # therefore, the result is the same.
         return proc_envio
+
+    async def consulta_recibo_async(self, proc_envio):
+        return proc_envio
@@ -2,13 +2,33 @@
 
 
 import collections
+import copy
 import datetime
-import time
+import itertools
+import re
+import types
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from contextlib import suppress
 
 from lxml import etree
 
+from erpbrasil.edoc.agendador import AgendadorRecibos
+from erpbrasil.edoc.caixa_saida import (
+    ESTADO_ASSINADO,
+    ESTADO_AUTORIZADO,
+    ESTADO_ENVIADO,
+    ESTADO_RECIBO,
+    ESTADO_REJEITADO,
+    SITUACOES_AUTORIZADO,
+)
 from erpbrasil.edoc.edoc import DocumentoEletronico
+from erpbrasil.edoc.mensagem import (
+    CONS_CAD,
+    CONS_RECI_NFE,
+    CONS_SIT_NFE,
+    CONS_STAT_SERV,
+)
+from erpbrasil.edoc.resposta import localizar_corpo_soap
 
 with suppress(ImportError):
     # nfelib imports
@@ -64,6 +84,26 @@ AMBIENTE_HOMOLOGACAO = 2
 NFE_MODELO = "55"
 NFCE_MODELO = "65"
 
+# Limites do lote enviNFe (MOC 7.0, regras de validação do webservice de
+# autorização): até 50 NF-e e mensagem de até 500 KB. A margem é reservada
+# para a tag enviNFe e o envelope SOAP.
+NFE_LOTE_MAXIMO_DOCUMENTOS = 50
+NFE_LOTE_TAMANHO_MAXIMO = 500 * 1024 - 2 * 1024
+
+# Quantidade máxima de eventos no envEvento
+NFE_LOTE_MAXIMO_EVENTOS = 20
+
+# cStat da consulta (consSitNFe): NF-e não consta na base de dados da SEFAZ
+NFE_NAO_CONSTA = "217"
+
+# cStat da consulta ao recibo (consReciNFe): lote não localizado
+NFE_LOTE_NAO_LOCALIZADO = "106"
+
+_ID_NFE = re.compile(r'Id="NFe(\d{44})"')
+
+# Consultas simultâneas do consulta_documentos
+CONCORRENCIA_CONSULTA = 8
+
 SIGLA_ESTADO = {
     "12": "AC",
     "27": "AL",
@@ -187,11 +227,11 @@ SVC_AN = {
 SVC_RS = {
     AMBIENTE_PRODUCAO: {
         "servidor": "nfe.svrs.rs.gov.br",
-        WS_NFE_RECEPCAO_EVENTO: "ws/NfeConsulta/NfeConsulta4.asmx?wsdl",
-        WS_NFE_AUTORIZACAO: "ws/NfeStatusServico/NfeStatusServico4.asmx?wsdl",
-        WS_NFE_RET_AUTORIZACAO: "ws/recepcaoevento/recepcaoevento4.asmx?wsdl",
-        WS_NFE_CONSULTA: "ws/NfeAutorizacao/NFeAutorizacao4.asmx?wsdl",
-        WS_NFE_SITUACAO: "ws/NfeRetAutorizacao/NFeRetAutorizacao4.asmx?wsdl",
+        WS_NFE_CONSULTA: "ws/NfeConsulta/NfeConsulta4.asmx?wsdl",
+        WS_NFE_SITUACAO: "ws/NfeStatusServico/NfeStatusServico4.asmx?wsdl",
+        WS_NFE_RECEPCAO_EVENTO: "ws/recepcaoevento/recepcaoevento4.asmx?wsdl",
+        WS_NFE_AUTORIZACAO: "ws/NfeAutorizacao/NFeAutorizacao4.asmx?wsdl",
+        WS_NFE_RET_AUTORIZACAO: "ws/NfeRetAutorizacao/NFeRetAutorizacao4.asmx?wsdl",  # noqa
     },
     AMBIENTE_HOMOLOGACAO: {
         "servidor": "nfe-homologacao.svrs.rs.gov.br",
@@ -708,9 +748,51 @@ ESTADO_WS_CONTINGENCIA = {
 }
 
 
-def localizar_url(servico, estado, mod="55", ambiente=2, contingencia=False):
-    sigla = SIGLA_ESTADO[estado]
+CONTINGENCIA_SVC_AN = "SVC-AN"
+CONTINGENCIA_SVC_RS = "SVC-RS"
+
+TIPO_EMISSAO_NORMAL = "1"
+TIPO_EMISSAO_CONTINGENCIA = {
+    CONTINGENCIA_SVC_AN: "6",
+    CONTINGENCIA_SVC_RS: "7",
+}
+
+# Serviços atendidos pela SVC na contingência automática
+SERVICOS_CONTINGENCIA = (
+    WS_NFE_AUTORIZACAO,
+    WS_NFE_RET_AUTORIZACAO,
+    WS_NFE_CONSULTA,
+    WS_NFE_SITUACAO,
+)
+
+
+# Serviços que cada autorizador deve atender, verificados na compilação
+# das rotas (LACUNAS_ROTAS)
+SERVICOS_MODELO = {
+    NFE_MODELO: (
+        WS_NFE_INUTILIZACAO,
+        WS_NFE_CONSULTA,
+        WS_NFE_SITUACAO,
+        WS_NFE_RECEPCAO_EVENTO,
+        WS_NFE_AUTORIZACAO,
+        WS_NFE_RET_AUTORIZACAO,
+        WS_NFE_CADASTRO,
+        WS_DFE_DISTRIBUICAO,
+        WS_DOWNLOAD_NFE,
+    ),
+    NFCE_MODELO: (
+        WS_NFE_INUTILIZACAO,
+        WS_NFE_CONSULTA,
+        WS_NFE_SITUACAO,
+        WS_NFE_RECEPCAO_EVENTO,
+        WS_NFE_AUTORIZACAO,
+        WS_NFE_RET_AUTORIZACAO,
+    ),
+}
+SERVICOS_AN = (WS_NFE_RECEPCAO_EVENTO, WS_DFE_DISTRIBUICAO, WS_DOWNLOAD_NFE)
+
 
+def _montar_url(servico, sigla, mod, ambiente, contingencia):
     ws = ESTADO_WS_CONTINGENCIA[sigla] if contingencia else ESTADO_WS[sigla]
 
     if servico in (WS_DFE_DISTRIBUICAO, WS_DOWNLOAD_NFE):
@@ -733,6 +815,69 @@ def localizar_url(servico, estado, mod="55", ambiente=2, contingencia=False):
     return f"https://{dominio}/{complemento}"
 
 
+def compilar_rotas():
+    """Monta o índice (cUF, modelo, ambiente, contingência, serviço) -> URL
+    de todos os webservices SOAP das tabelas de autorizadores, para cada
+    modelo que as tabelas distinguem (55 e 65).
+
+    :return: tupla (rotas, lacunas), sendo lacunas as chaves dos serviços
+        de SERVICOS_MODELO/SERVICOS_CONTINGENCIA/SERVICOS_AN ausentes nas
+        tabelas do autorizador
+    """
+    tabelas = list(ESTADO_WS.values()) + list(ESTADO_WS_CONTINGENCIA.values())
+    modelos = sorted({mod for ws in tabelas for mod in ws if isinstance(mod, str)})
+    servicos = sorted(set(itertools.chain.from_iterable(SERVICOS_MODELO.values())))
+    rotas = {}
+    lacunas = []
+    for estado, sigla in SIGLA_ESTADO.items():
+        for contingencia in (False, True):
+            if contingencia and sigla not in ESTADO_WS_CONTINGENCIA:
+                continue
+            for mod in modelos:
+                if contingencia:
+                    esperados = SERVICOS_CONTINGENCIA if mod == NFE_MODELO else ()
+                elif sigla == "AN":
+                    esperados = SERVICOS_AN if mod == NFE_MODELO else ()
+                else:
+                    esperados = SERVICOS_MODELO.get(mod, ())
+                for ambiente in (AMBIENTE_PRODUCAO, AMBIENTE_HOMOLOGACAO):
+                    for servico in servicos:
+                        chave = (estado, mod, ambiente, contingencia, servico)
+                        try:
+                            rotas[chave] = _montar_url(
+                                servico, sigla, mod, ambiente, contingencia
+                            )
+                        except KeyError:
+                            if servico in esperados:
+                                lacunas.append(chave)
+    return types.MappingProxyType(rotas), tuple(lacunas)
+
+
+ROTAS, LACUNAS_ROTAS = compilar_rotas()
+
+
+def localizar_url(servico, estado, mod="55", ambiente=2, contingencia=False):
+    """URL do webservice, consultada nas rotas compiladas (ROTAS).
+
+    Os modelos que as tabelas não distinguem não constam nas rotas: a URL é
+    montada a cada chamada, pelas tabelas dos autorizadores sem divisão por
+    modelo.
+    """
+    chave = (estado, mod, int(ambiente), bool(contingencia), servico)
+    url = ROTAS.get(chave)
+    if url is not None:
+        return url
+    try:
+        return _montar_url(
+            servico, SIGLA_ESTADO[estado], mod, int(ambiente), contingencia
+        )
+    except KeyError:
+        raise KeyError(
+            f"Webservice {servico} inexistente para a UF {estado}, modelo {mod},"
+            f" ambiente {ambiente}{' em contingência' if contingencia else ''}"
+        ) from None
+
+
 Metodo = collections.namedtuple("Metodo", ["webservice", "metodo"])
 
 METODO_WS = {
@@ -747,6 +892,15 @@ METODO_WS = {
 }
 
 
+# Resultado do consulta_documentos: ``emitido`` classifica a NF-e pelo
+# _verifica_documento_ja_enviado, e ``erro`` é a exceção ocorrida na consulta
+SituacaoDocumento = collections.namedtuple(
+    "SituacaoDocumento",
+    ["chave", "c_stat", "prot_nfe", "eventos", "emitido", "proc", "erro"],
+)
+SituacaoDocumento.__new__.__defaults__ = (None,)
+
+
 class NFe(DocumentoEletronico):
     _namespace = "http://www.portalfiscal.inf.br/nfe"
     _edoc_situacao_arquivo_recebido_com_sucesso = "103"
@@ -759,6 +913,12 @@ class NFe(DocumentoEletronico):
 
     _maximo_tentativas_consulta_recibo = 5
 
+    # Monta as consultas de formato fixo (status, situação, recibo e
+    # cadastro) pelos modelos do módulo mensagem, False para utilizar sempre
+    # o binding generateDS. Com o modelo, a raiz do envio (envio_raiz do
+    # retorno) é o texto XML da mensagem, e não o objeto generateDS
+    _mensagens_modelo = True
+
     def __init__(
         self,
         transmissao,
@@ -768,6 +928,7 @@ class NFe(DocumentoEletronico):
         mod="55",
         envio_sincrono=False,
         contingencia=False,
+        contingencia_automatica=False,
     ):
         super().__init__(transmissao, envio_sincrono)
         self.versao = str(versao)
@@ -775,6 +936,101 @@ class NFe(DocumentoEletronico):
         self.uf = int(uf)
         self.mod = str(mod)
         self.contingencia = contingencia
+        self.contingencia_automatica = contingencia_automatica
+        self._urls_contingencia = None
+        # URLs já resolvidas, por (serviço, contingência)
+        self._rotas = {}
+
+    def _rota(self, servico, contingencia=False):
+        chave = (servico, bool(contingencia))
+        url = self._rotas.get(chave)
+        if url is None:
+            url = self._rotas[chave] = localizar_url(
+                servico, str(self.uf), self.mod, int(self.ambiente), contingencia
+            )
+        return url
+
+    def _url(self, servico, contingencia=None):
+        """URL do webservice. Com ``contingencia_automatica`` os serviços
+        atendidos pela SVC utilizam a contingência enquanto o circuito do
+        autorizador normal estiver aberto (ver saude.MonitorSaude).
+
+        :param contingencia: força o autorizador normal (False) ou a SVC
+            (True), por exemplo de acordo com o tpEmis do documento
+        """
+        if contingencia is None:
+            contingencia = self.contingencia
+            if not contingencia and self._failover(servico):
+                contingencia = not self._monitor_saude.disponivel(self._rota(servico))
+        return self._rota(servico, contingencia)
+
+    def _failover(self, servico):
+        return (
+            self.contingencia_automatica
+            and self._monitor_saude is not None
+            and self.mod == NFE_MODELO
+            and servico in SERVICOS_CONTINGENCIA
+        )
+
+    def _nome_contingencia(self):
+        if ESTADO_WS_CONTINGENCIA[SIGLA_ESTADO[str(self.uf)]] is SVC_AN:
+            return CONTINGENCIA_SVC_AN
+        return CONTINGENCIA_SVC_RS
+
+    def _contingencia_url(self, url):
+        if not self.contingencia and not self.contingencia_automatica:
+            return False
+        if self._urls_contingencia is None:
+            urls = {}
+            for servico in SERVICOS_CONTINGENCIA:
+                normal, contingencia = (
+                    self._rota(servico, svc) for svc in (False, True)
+                )
+                if normal != contingencia:
+                    urls[contingencia] = self._nome_contingencia()
+            self._urls_contingencia = urls
+        return self._urls_contingencia.get(url, False)
+
+    def _contingencia_envio(self, xml_envio_etree):
+        # Com a contingência automática o autorizador é definido pelo tpEmis
+        # da NF-e, já assinada
+        if self.contingencia_automatica:
+            tp_emis = xml_envio_etree.findtext(
+                f".//{{{self._namespace}}}ide/{{{self._namespace}}}tpEmis"
+            )
+            return tp_emis in TIPO_EMISSAO_CONTINGENCIA.values()
+
+    def _contingencia_recibo(self, proc_envio):
+        # O recibo é consultado no mesmo autorizador do envio
+        if self.contingencia_automatica and proc_envio:
+            return bool(getattr(proc_envio, "contingencia", False))
+
+    def tipo_emissao(self):
+        """tpEmis a ser utilizado nas NF-e emitidas agora: 1 (normal), ou
+        6/7 (SVC-AN/SVC-RS) quando a autorização estiver em contingência,
+        manual ou automática.
+        """
+        if self.mod == NFE_MODELO and (
+            self.contingencia
+            or self._failover(WS_NFE_AUTORIZACAO)
+            and not self._monitor_saude.disponivel(self._rota(WS_NFE_AUTORIZACAO))
+        ):
+            return TIPO_EMISSAO_CONTINGENCIA[self._nome_contingencia()]
+        return TIPO_EMISSAO_NORMAL
+
+    def _chave_status_servico(self):
+        # A URL que o status do serviço utiliza agora (ver _url), sem liberar
+        # a requisição de teste do circuito do autorizador normal
+        contingencia = bool(self.contingencia) or (
+            self._failover(WS_NFE_SITUACAO)
+            and self._monitor_saude.aberto(self._rota(WS_NFE_SITUACAO))
+        )
+        return (
+            self.uf,
+            self.mod,
+            self.ambiente,
+            self._rota(WS_NFE_SITUACAO, contingencia),
+        )
 
     def _edoc_situacao_ja_enviado(self, proc_consulta):
         if proc_consulta.resposta.cStat in ("100", "110", "150", "301", "302"):
@@ -785,50 +1041,142 @@ class NFe(DocumentoEletronico):
         return edoc.infNFe.Id[:3], edoc.infNFe.Id[3:]
 
     def status_servico(self):
-        raiz = retConsStatServ.TConsStatServ(
-            versao=self.versao,
-            tpAmb=self.ambiente,
-            cUF=self.uf,
-            xServ="STATUS",
+        return self._post(*self._prepara_status_servico())
+
+    async def status_servico_async(self):
+        return await self._post_async(*self._prepara_status_servico())
+
+    def _prepara_status_servico(self):
+        raiz = self._mensagens_modelo and CONS_STAT_SERV.montar(
+            versao=self.versao, tpAmb=self.ambiente, cUF=self.uf
         )
-        raiz.original_tagname_ = "consStatServ"
-        return self._post(
+        if not raiz:
+            raiz = retConsStatServ.TConsStatServ(
+                versao=self.versao,
+                tpAmb=self.ambiente,
+                cUF=self.uf,
+                xServ="STATUS",
+            )
+            raiz.original_tagname_ = "consStatServ"
+        return (
             raiz,
             # 'https://hom.sefazvirtual.fazenda.gov.br/NFeStatusServico4/NFeStatusServico4.asmx?wsdl',
-            localizar_url(
-                WS_NFE_SITUACAO,
-                str(self.uf),
-                self.mod,
-                int(self.ambiente),
-                self.contingencia,
-            ),
+            self._url(WS_NFE_SITUACAO),
             "nfeStatusServicoNF",
             retConsStatServ,
         )
 
     def consulta_documento(self, chave):
+        return self._post(*self._prepara_consulta_documento(chave))
+
+    async def consulta_documento_async(self, chave):
+        return await self._post_async(*self._prepara_consulta_documento(chave))
+
+    def _prepara_consulta_documento(self, chave):
         # NfeConsultaProtocolo
-        raiz = retConsSitNFe.TConsSitNFe(
-            versao=self.versao,
-            tpAmb=self.ambiente,
-            xServ="CONSULTAR",
-            chNFe=chave,
+        raiz = self._mensagens_modelo and CONS_SIT_NFE.montar(
+            versao=self.versao, tpAmb=self.ambiente, chNFe=chave
         )
-        raiz.original_tagname_ = "consSitNFe"
-        return self._post(
+        if not raiz:
+            raiz = retConsSitNFe.TConsSitNFe(
+                versao=self.versao,
+                tpAmb=self.ambiente,
+                xServ="CONSULTAR",
+                chNFe=chave,
+            )
+            raiz.original_tagname_ = "consSitNFe"
+        return (
             raiz,
             # 'https://hom.sefazvirtual.fazenda.gov.br/NFeConsultaProtocolo4/NFeConsultaProtocolo4.asmx?wsdl',
-            localizar_url(
-                WS_NFE_CONSULTA,
-                str(self.uf),
-                self.mod,
-                int(self.ambiente),
-                self.contingencia,
-            ),
+            self._url(WS_NFE_CONSULTA),
             "nfeConsultaNF",
             retConsSitNFe,
         )
 
+    def consulta_documentos(
+        self, chaves, concorrencia=CONCORRENCIA_CONSULTA, limitador=None
+    ):
+        """Consulta a situação (consSitNFe) de várias NF-e/NFC-e
+        simultaneamente.
+
+        As chaves são agrupadas pela UF (cUF) e modelo da própria chave e cada
+        grupo é consultado no seu autorizador. As consultas dos grupos são
+        intercaladas e executadas por até ``concorrencia`` threads, sem
+        acumular mais do que o dobro disso em espera.
+
+        Uma falha na consulta de uma chave não interrompe as demais, a
+        exceção é retornada em ``erro``.
+
+        :param chaves: chaves de acesso
+        :param concorrencia: quantidade de consultas simultâneas
+        :param limitador: LimitadorRequisicoes das consultas, no lugar do
+            limitador da NFe (_limitador); a taxa é limitada por UF
+        :return: gerador de SituacaoDocumento, na ordem em que as consultas
+            terminam
+        """
+        grupos = collections.OrderedDict()
+        for chave in chaves:
+            grupos.setdefault((chave[:2], chave[20:22]), []).append(chave)
+        if not grupos:
+            return
+
+        # Um documento por grupo, associado às chaves conforme são submetidas
+        consultas = [
+            zip(
+                itertools.repeat(self._documento_consulta(uf, mod, limitador)),
+                chaves_grupo,
+            )
+            for (uf, mod), chaves_grupo in grupos.items()
+        ]
+
+        with ThreadPoolExecutor(concorrencia) as executor:
+            pendentes = set()
+            for consulta in itertools.chain.from_iterable(
+                itertools.zip_longest(*consultas)
+            ):
+                if consulta is None:
+                    continue
+                if len(pendentes) >= 2 * concorrencia:
+                    concluidas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for futuro in concluidas:
+                        yield futuro.result()
+                pendentes.add(executor.submit(self._consulta_situacao, *consulta))
+            while pendentes:
+                concluidas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in concluidas:
+                    yield futuro.result()
+
+    def _documento_consulta(self, uf, mod, limitador=None):
+        """Documento utilizado nas consultas das chaves da UF e modelo"""
+        limitador = limitador or self._limitador
+        if (int(uf), mod) == (self.uf, self.mod) and limitador is self._limitador:
+            return self
+        documento = copy.copy(self)
+        documento.uf = int(uf)
+        documento.mod = mod
+        documento._rotas = {}
+        documento._urls_contingencia = None
+        documento._limitador = limitador
+        return documento
+
+    @staticmethod
+    def _consulta_situacao(documento, chave):
+        try:
+            proc = documento.consulta_documento(chave)
+        except Exception as erro:
+            return SituacaoDocumento(chave, None, None, [], None, None, erro)
+        resposta = proc.resposta
+        if not resposta:
+            return SituacaoDocumento(chave, None, None, [], None, proc)
+        return SituacaoDocumento(
+            chave,
+            resposta.cStat,
+            resposta.protNFe,
+            resposta.procEventoNFe,
+            documento._verifica_documento_ja_enviado(proc),
+            proc,
+        )
+
     def envia_documento(self, edoc):
         """
 
@@ -839,79 +1187,354 @@ class NFe(DocumentoEletronico):
         :param edoc:
         :return:
         """
-        xml_assinado = self.assina_raiz(edoc, edoc.infNFe.Id)
+        return self._post_envio(self._prepara_envia_documento(edoc))
+
+    async def envia_documento_async(self, edoc):
+        return await self._post_envio_async(self._prepara_envia_documento(edoc))
+
+    def _prepara_envia_documento(self, edoc):
+        xml_assinado = self.assina_elemento(edoc, edoc.infNFe.Id)
+        self._registra_saida_assinados([xml_assinado])
+        return self._prepara_envia_lote([xml_assinado], self.envio_sincrono)
+
+    def _post_envio(self, mensagem):
+        chaves = self._registra_saida_envio(mensagem[0])
+        proc_envio = self._post(*mensagem)
+        self._registra_saida_retorno_envio(chaves, proc_envio)
+        return proc_envio
+
+    async def _post_envio_async(self, mensagem):
+        chaves = self._registra_saida_envio(mensagem[0])
+        proc_envio = await self._post_async(*mensagem)
+        self._registra_saida_retorno_envio(chaves, proc_envio)
+        return proc_envio
+
+    def _registra_saida_assinados(self, xmls_assinados):
+        if self._caixa_saida is None:
+            return
+        for xml_assinado in xmls_assinados:
+            if isinstance(xml_assinado, etree._Element):
+                xml_assinado = etree.tostring(xml_assinado, encoding=str)
+            chave = _ID_NFE.search(xml_assinado).group(1)
+            self._caixa_saida.registrar(chave, ESTADO_ASSINADO, xml=xml_assinado)
+
+    def _registra_saida_envio(self, xml_envio_etree):
+        # Registrado antes da transmissão: sem o retorno, a situação do
+        # documento é consultada pela chave ao retomar
+        if self._caixa_saida is None:
+            return []
+        chaves = [
+            inf_nfe.get("Id")[3:]
+            for inf_nfe in xml_envio_etree.iter(f"{{{self._namespace}}}infNFe")
+        ]
+        for chave in chaves:
+            self._caixa_saida.registrar(chave, ESTADO_ENVIADO)
+        return chaves
 
+    def _registra_saida_retorno_envio(self, chaves, proc_envio):
+        if not chaves or not proc_envio.resposta:
+            return
+        c_stat = proc_envio.resposta.cStat
+        if c_stat == self._edoc_situacao_arquivo_processado_com_sucesso:
+            self._registra_saida_protocolos(proc_envio)
+            return
+        recebido = c_stat == self._edoc_situacao_arquivo_recebido_com_sucesso
+        for chave in chaves:
+            self._caixa_saida.registrar(
+                chave,
+                ESTADO_RECIBO if recebido else ESTADO_REJEITADO,
+                xml=proc_envio.retorno.content.decode("utf-8"),
+                recibo=recebido and proc_envio.resposta.infRec.nRec or None,
+                contingencia=bool(getattr(proc_envio, "contingencia", False)),
+                c_stat=c_stat,
+            )
+
+    def _registra_saida_protocolos(self, proc):
+        """Registra a autorização ou rejeição de cada protNFe do retorno"""
+        if self._caixa_saida is None or not proc or not proc.resposta:
+            return
+        corpo = localizar_corpo_soap(proc.retorno.content)
+        if corpo is None:
+            return
+        for protocolo in corpo.iter(f"{{{self._namespace}}}protNFe"):
+            inf_prot = protocolo.find(f"{{{self._namespace}}}infProt")
+            c_stat = inf_prot.findtext(f"{{{self._namespace}}}cStat")
+            self._caixa_saida.registrar(
+                inf_prot.findtext(f"{{{self._namespace}}}chNFe"),
+                ESTADO_AUTORIZADO
+                if c_stat in SITUACOES_AUTORIZADO
+                else ESTADO_REJEITADO,
+                xml=etree.tostring(protocolo, encoding="unicode"),
+                c_stat=c_stat,
+            )
+
+    def retomar_saida(self):
+        """Retoma os documentos pendentes da caixa de saída após uma
+        interrupção, sem reenviá-los:
+
+        1. Os recibos já recebidos são consultados, um consReciNFe por lote.
+            Os documentos dos lotes não localizados (cStat 106) voltam ao
+            estado assinado;
+        2. Os documentos enviados sem retorno são consultados pela chave. Os
+            que não constam na SEFAZ (cStat 217) voltam ao estado assinado.
+
+        Os documentos apenas assinados não foram transmitidos, o XML assinado
+        fica disponível na caixa de saída para o reenvio.
+
+        :return: Esta função retorna um yield, portanto ela retorna um iterator
+        """
+        if self._caixa_saida is None:
+            raise ValueError("A caixa de saída não foi configurada")
+
+        recibos = {}
+        enviados = []
+        for documento in self._caixa_saida.pendentes():
+            if documento.estado == ESTADO_RECIBO:
+                recibos.setdefault(
+                    (documento.recibo, documento.contingencia), []
+                ).append(documento)
+            elif documento.estado == ESTADO_ENVIADO:
+                enviados.append(documento)
+
+        for (recibo, contingencia), documentos in recibos.items():
+            proc_recibo = self.consulta_recibo(numero=recibo, contingencia=contingencia)
+            if (
+                proc_recibo.resposta
+                and proc_recibo.resposta.cStat == NFE_LOTE_NAO_LOCALIZADO
+            ):
+                for documento in documentos:
+                    self._retorna_saida_assinado(documento, NFE_LOTE_NAO_LOCALIZADO)
+            yield proc_recibo
+
+        for documento in enviados:
+            proc_consulta = self.consulta_documento(documento.chave)
+            if proc_consulta.resposta:
+                if proc_consulta.resposta.cStat == NFE_NAO_CONSTA:
+                    self._retorna_saida_assinado(documento, NFE_NAO_CONSTA)
+                else:
+                    self._registra_saida_protocolos(proc_consulta)
+            yield proc_consulta
+
+    def _retorna_saida_assinado(self, documento, c_stat):
+        """Volta o documento ao estado assinado, para o reenvio com o mesmo
+        XML assinado"""
+        self._caixa_saida.registrar(
+            documento.chave, ESTADO_ASSINADO, xml=documento.xml, c_stat=c_stat
+        )
+
+    def envia_lote(self, edocs, numero_lote=False):
+        """Assina as NF-e em paralelo e as envia em um único lote enviNFe.
+
+        O lote com mais de uma NF-e é sempre processado de forma assíncrona,
+        o resultado deve ser consultado pelo recibo (consulta_recibo).
+
+        :param edocs: lista com até NFE_LOTE_MAXIMO_DOCUMENTOS NF-e
+        :param numero_lote: idLote, por padrão gerado a partir da data e hora
+        :return: RetornoSoap do envio
+        """
+        if not edocs or len(edocs) > NFE_LOTE_MAXIMO_DOCUMENTOS:
+            raise ValueError(
+                "O lote deve conter entre 1 e %d NF-e" % NFE_LOTE_MAXIMO_DOCUMENTOS
+            )
+        xmls_assinados = self.assina_lote(edocs)
+        return self._post_envio(
+            self._prepara_envia_lote(xmls_assinados, self.envio_sincrono, numero_lote)
+        )
+
+    def assina_lote(self, edocs):
+        """Assina as NF-e em paralelo, mantendo a ordem recebida.
+
+        :return: lista com os XML assinados
+        """
+        xmls_assinados = self.assina_raizes([(edoc, edoc.infNFe.Id) for edoc in edocs])
+        self._registra_saida_assinados(xmls_assinados)
+        return xmls_assinados
+
+    def _monta_lotes(self, xmls_assinados):
+        """Agrupa os XML assinados em lotes respeitando a quantidade e o
+        tamanho máximos do enviNFe.
+
+        :return: lista de lotes, cada um com a lista de índices dos XML
+        """
+        lotes = []
+        lote, tamanho_lote = [], 0
+        for indice, xml in enumerate(xmls_assinados):
+            tamanho = len(xml.encode("utf-8"))
+            if tamanho > NFE_LOTE_TAMANHO_MAXIMO:
+                raise ValueError(
+                    "A NF-e %d excede o tamanho máximo do lote (%d bytes)"
+                    % (indice, NFE_LOTE_TAMANHO_MAXIMO)
+                )
+            if lote and (
+                len(lote) == NFE_LOTE_MAXIMO_DOCUMENTOS
+                or tamanho_lote + tamanho > NFE_LOTE_TAMANHO_MAXIMO
+            ):
+                lotes.append(lote)
+                lote, tamanho_lote = [], 0
+            lote.append(indice)
+            tamanho_lote += tamanho
+        if lote:
+            lotes.append(lote)
+        return lotes
+
+    def _prepara_envia_lote(self, xmls_assinados, sincrono=False, numero_lote=False):
+        # xmls_assinados: XML (str) ou elementos lxml assinados (assina_elemento)
+        # O processamento síncrono só é permitido para lotes com uma NF-e
+        # (rejeição 452)
+        sincrono = sincrono and len(xmls_assinados) == 1
         raiz = retEnviNFe.TEnviNFe(
             versao=self.versao,
-            idLote=datetime.datetime.now().strftime("%Y%m%d%H%M%S"),
-            indSinc="1" if self.envio_sincrono else "0",
+            idLote=numero_lote or datetime.datetime.now().strftime("%Y%m%d%H%M%S"),
+            indSinc="1" if sincrono else "0",
         )
         raiz.original_tagname_ = "enviNFe"
         xml_envio_string, xml_envio_etree = self._generateds_to_string_etree(raiz)
-        xml_envio_etree.append(etree.fromstring(xml_assinado))
-        return self._post(
+        for xml_assinado in xmls_assinados:
+            if not isinstance(xml_assinado, etree._Element):
+                xml_assinado = etree.fromstring(xml_assinado)
+            xml_envio_etree.append(xml_assinado)
+        return (
             xml_envio_etree,
             # 'https://hom.sefazvirtual.fazenda.gov.br/NFeAutorizacao4/NFeAutorizacao4.asmx?wsdl',
-            localizar_url(
-                WS_NFE_AUTORIZACAO,
-                str(self.uf),
-                self.mod,
-                int(self.ambiente),
-                self.contingencia,
-            ),
+            self._url(WS_NFE_AUTORIZACAO, self._contingencia_envio(xml_envio_etree)),
             "nfeAutorizacaoLote",
             retEnviNFe,
         )
 
+    def processar_lote(self, edocs):
+        """Processa as NF-e agrupadas em lotes enviNFe, seguindo o mesmo
+        workflow do processar_documento:
+
+        1. Consulta o serviço;
+        2. Descarta os documentos já emitidos anteriormente;
+        3. Assina os documentos em paralelo e os agrupa em lotes de até
+            NFE_LOTE_MAXIMO_DOCUMENTOS NF-e (e NFE_LOTE_TAMANHO_MAXIMO bytes);
+        4. Envia todos os lotes;
+        5. Consulta os recibos dos lotes simultaneamente (AgendadorRecibos),
+            montando o processo (nfeProc) de cada NF-e a partir do seu
+            protocolo. Os retornos são entregues na ordem em que os lotes
+            terminam de ser processados.
+
+        Os processos de cada NF-e ficam disponíveis em ``processos`` e
+        ``processos_xml`` (dicionários indexados pela chave) do retorno da
+        consulta ao recibo, ou do envio quando processado de forma síncrona.
+
+        :param edocs: lista de NF-e
+        :return: Esta função retorna um yield, portanto ela retorna um iterator
+        """
+        if self._consulta_servico_ao_enviar:
+            proc_servico = self.status_servico_cache()
+            yield proc_servico
+            if not self._verifica_servico_em_operacao(proc_servico):
+                return
+
+        if self._consulta_documento_antes_de_enviar:
+            pendentes = []
+            for edoc in edocs:
+                proc_consulta = self.consulta_documento(self.get_documento_id(edoc)[1])
+                yield proc_consulta
+                if not self._verifica_documento_ja_enviado(proc_consulta):
+                    pendentes.append(edoc)
+            edocs = pendentes
+
+        if not edocs:
+            return
+
+        xmls_assinados = self.assina_lote(edocs)
+        envios = []
+        for lote in self._monta_lotes(xmls_assinados):
+            proc_envio = self._post_envio(
+                self._prepara_envia_lote(
+                    [xmls_assinados[indice] for indice in lote], self.envio_sincrono
+                )
+            )
+            if self.envio_sincrono and len(lote) == 1:
+                self.monta_processo(edocs[lote[0]], proc_envio)
+            elif proc_envio.resposta and self._verifica_resposta_envio_sucesso(
+                proc_envio
+            ):
+                envios.append(proc_envio)
+            yield proc_envio
+
+        if not envios:
+            return
+        with AgendadorRecibos(min(len(envios), 4)) as agendador:
+            for proc_envio in envios:
+                agendador.agendar(self, proc_envio)
+            for recibo in agendador.concluidos():
+                if recibo.erro is not None:
+                    raise recibo.erro
+                if recibo.proc_recibo.resposta:
+                    yield recibo.proc_recibo
+
     def envia_inutilizacao(self, evento):
         tinut = retInutNFe.TInutNFe(versao=self.versao, infInut=evento, Signature=None)
         tinut.original_tagname_ = "inutNFe"
 
-        xml_assinado = self.assina_raiz(tinut, tinut.infInut.Id)
-
-        xml_envio_etree = etree.fromstring(xml_assinado)
+        xml_envio_etree = self.assina_elemento(tinut, tinut.infInut.Id)
 
         return self._post(
             xml_envio_etree,
-            localizar_url(
-                WS_NFE_INUTILIZACAO,
-                str(self.uf),
-                self.mod,
-                int(self.ambiente),
-                self.contingencia,
-            ),
+            self._url(WS_NFE_INUTILIZACAO),
             "nfeInutilizacaoNF",
             retInutNFe,
         )
 
-    def consulta_recibo(self, numero=False, proc_envio=False):
+    def consulta_recibo(self, numero=False, proc_envio=False, contingencia=None):
+        mensagem = self._prepara_consulta_recibo(numero, proc_envio, contingencia)
+        if mensagem:
+            proc_recibo = self._post(*mensagem)
+            self._registra_saida_protocolos(proc_recibo)
+            return proc_recibo
+
+    async def consulta_recibo_async(
+        self, numero=False, proc_envio=False, contingencia=None
+    ):
+        mensagem = self._prepara_consulta_recibo(numero, proc_envio, contingencia)
+        if mensagem:
+            proc_recibo = await self._post_async(*mensagem)
+            self._registra_saida_protocolos(proc_recibo)
+            return proc_recibo
+
+    def _prepara_consulta_recibo(
+        self, numero=False, proc_envio=False, contingencia=None
+    ):
         if proc_envio:
             numero = proc_envio.resposta.infRec.nRec
 
         if not numero:
             return
 
-        raiz = retConsReciNFe.TConsReciNFe(
-            versao=self.versao,
-            tpAmb=self.ambiente,
-            nRec=numero,
+        if contingencia is None:
+            contingencia = self._contingencia_recibo(proc_envio)
+
+        raiz = self._mensagens_modelo and CONS_RECI_NFE.montar(
+            versao=self.versao, tpAmb=self.ambiente, nRec=numero
         )
-        raiz.original_tagname_ = "consReciNFe"
-        return self._post(
+        if not raiz:
+            raiz = retConsReciNFe.TConsReciNFe(
+                versao=self.versao,
+                tpAmb=self.ambiente,
+                nRec=numero,
+            )
+            raiz.original_tagname_ = "consReciNFe"
+        return (
             raiz,
-            localizar_url(
-                WS_NFE_RET_AUTORIZACAO,
-                str(self.uf),
-                self.mod,
-                int(self.ambiente),
-                self.contingencia,
-            ),
+            self._url(WS_NFE_RET_AUTORIZACAO, contingencia),
             # 'ws/nferetautorizacao4.asmx'
             "nfeRetAutorizacaoLote",
             retConsReciNFe,
         )
 
     def enviar_lote_evento(self, lista_eventos, numero_lote=False):
+        return self._post(*self._prepara_enviar_lote_evento(lista_eventos, numero_lote))
+
+    async def enviar_lote_evento_async(self, lista_eventos, numero_lote=False):
+        return await self._post_async(
+            *self._prepara_enviar_lote_evento(lista_eventos, numero_lote)
+        )
+
+    def _prepara_enviar_lote_evento(self, lista_eventos, numero_lote=False):
         if not numero_lote:
             numero_lote = self._gera_numero_lote()
 
@@ -919,28 +1542,44 @@ class NFe(DocumentoEletronico):
         raiz.original_tagname_ = "envEvento"
         xml_envio_string, xml_envio_etree = self._generateds_to_string_etree(raiz)
 
+        eventos = []
         for raiz_evento in lista_eventos:
             evento = retEnvEventoCancNFe.TEvento(
                 versao="1.00",
                 infEvento=raiz_evento,
             )
             evento.original_tagname_ = "evento"
-            xml_assinado = self.assina_raiz(evento, evento.infEvento.Id)
+            eventos.append((evento, evento.infEvento.Id))
+        for xml_assinado in self.assina_raizes(eventos):
             xml_envio_etree.append(etree.fromstring(xml_assinado))
 
-        return self._post(
+        return (
             xml_envio_etree,
-            localizar_url(
-                WS_NFE_RECEPCAO_EVENTO,
-                str(self.uf),
-                self.mod,
-                int(self.ambiente),
-                self.contingencia,
-            ),
+            self._url(WS_NFE_RECEPCAO_EVENTO),
             "nfeRecepcaoEvento",
             retEnvEvento,
         )
 
+    @staticmethod
+    def retornos_evento(proc_envio, lista_eventos):
+        """Associa cada retEvento do retEnvEvento ao evento enviado, pela
+        chave, tipo e sequência do evento.
+
+        :param proc_envio: retorno do enviar_lote_evento
+        :param lista_eventos: infEvento enviados no lote
+        :return: lista com o retEvento de cada evento, na ordem recebida, ou
+            None para os eventos sem retorno (lote rejeitado)
+        """
+        retornos = {}
+        for ret_evento in getattr(proc_envio.resposta, "retEvento", None) or []:
+            inf = ret_evento.infEvento
+            if inf.chNFe and inf.tpEvento and inf.nSeqEvento:
+                retornos[(inf.chNFe, inf.tpEvento, int(inf.nSeqEvento))] = ret_evento
+        return [
+            retornos.get((evento.chNFe, evento.tpEvento, int(evento.nSeqEvento)))
+            for evento in lista_eventos
+        ]
+
     def cancela_documento(
         self, chave, protocolo_autorizacao, justificativa, data_hora_evento=False
     ):
@@ -1036,8 +1675,8 @@ class NFe(DocumentoEletronico):
             self._edoc_situacao_arquivo_processado_com_sucesso,
         ]
 
-    def _aguarda_tempo_medio(self, proc_envio):
-        time.sleep(float(proc_envio.resposta.infRec.tMed))
+    def _tempo_espera(self, proc_envio):
+        return float(proc_envio.resposta.infRec.tMed)
 
     def _edoc_situacao_em_processamento(self, proc_recibo):
         if proc_recibo.resposta.cStat == "105":
@@ -1057,7 +1696,24 @@ class NFe(DocumentoEletronico):
         :return: Retorna uma estrutura contendo as estruturas de envio
         e retorno preenchidas
         """
+        mensagem = self._prepara_consultar_distribuicao(
+            cnpj_cpf, ultimo_nsu, nsu_especifico, chave
+        )
+        if mensagem:
+            return self._post(*mensagem)
+
+    async def consultar_distribuicao_async(
+        self, cnpj_cpf, ultimo_nsu=False, nsu_especifico=False, chave=False
+    ):
+        mensagem = self._prepara_consultar_distribuicao(
+            cnpj_cpf, ultimo_nsu, nsu_especifico, chave
+        )
+        if mensagem:
+            return await self._post_async(*mensagem)
 
+    def _prepara_consultar_distribuicao(
+        self, cnpj_cpf, ultimo_nsu=False, nsu_especifico=False, chave=False
+    ):
         if not ultimo_nsu and not nsu_especifico and not chave:
             return
 
@@ -1084,31 +1740,40 @@ class NFe(DocumentoEletronico):
             consChNFe=consChNFe,
         )
 
-        return self._post(
+        return (
             raiz,
-            localizar_url(
-                WS_DFE_DISTRIBUICAO,
-                str(self.uf),
-                self.mod,
-                int(self.ambiente),
-                self.contingencia,
-            ),
+            self._url(WS_DFE_DISTRIBUICAO),
             "nfeDistDFeInteresse",
             retDistDFeInt,
         )
 
     def monta_processo(self, edoc, proc_envio, proc_recibo=None):
-        nfe = proc_envio.envio_raiz.find("{" + self._namespace + "}NFe")
+        nfes = proc_envio.envio_raiz.findall("{" + self._namespace + "}NFe")
         if proc_recibo:
             protocolos = proc_recibo.resposta.protNFe
         else:
             # A falta do recibo indica envio no modo síncrono
             # o protocolo é recuperado diretamente da resposta do envio.
             protocolos = proc_envio.resposta.protNFe
-        if len(nfe) and protocolos:
+        if nfes and protocolos:
             if not isinstance(protocolos, list):
                 protocolos = [protocolos]
+            # Em um lote com várias NF-e cada protocolo é associado à sua NF-e
+            # pela chave de acesso
+            nfes_chave = {
+                nfe.find("{" + self._namespace + "}infNFe").get("Id")[3:]: nfe
+                for nfe in nfes
+            }
+            proc = proc_recibo if proc_recibo else proc_envio
+            proc.processos = {}
+            proc.processos_xml = {}
             for protocolo in protocolos:
+                chave = protocolo.infProt.chNFe
+                nfe = nfes_chave.get(chave)
+                if nfe is None:
+                    if len(nfes) > 1:
+                        continue
+                    nfe = nfes[0]
                 nfe_proc = retEnviNFe.TNfeProc(
                     versao=self.versao,
                     protNFe=protocolo,
@@ -1118,10 +1783,11 @@ class NFe(DocumentoEletronico):
                 prot_nfe = nfe_proc.find("{" + self._namespace + "}protNFe")
                 prot_nfe.addprevious(nfe)
 
-                proc = proc_recibo if proc_recibo else proc_envio
                 proc.processo = nfe_proc
                 proc.processo_xml = self._generateds_to_string_etree(nfe_proc)[0]
                 proc.protocolo = protocolo
+                proc.processos[chave] = proc.processo
+                proc.processos_xml[chave] = proc.processo_xml
             return True
 
     def monta_nfe_proc(self, nfe, prot_nfe):
@@ -1142,29 +1808,27 @@ class NFe(DocumentoEletronico):
         if not cnpj and not cpf and not ie:
             return
 
-        infCons = retConsCad.infConsType(
-            xServ="CONS-CAD",
-            UF=uf,
-            IE=ie,
-            CNPJ=cnpj,
-            CPF=cpf,
+        raiz = self._mensagens_modelo and CONS_CAD.montar(
+            UF=uf, IE=ie, CNPJ=cnpj, CPF=cpf
         )
+        if not raiz:
+            infCons = retConsCad.infConsType(
+                xServ="CONS-CAD",
+                UF=uf,
+                IE=ie,
+                CNPJ=cnpj,
+                CPF=cpf,
+            )
 
-        raiz = retConsCad.TConsCad(
-            versao="2.00",
-            infCons=infCons,
-        )
-        raiz.original_tagname_ = "ConsCad"
+            raiz = retConsCad.TConsCad(
+                versao="2.00",
+                infCons=infCons,
+            )
+            raiz.original_tagname_ = "ConsCad"
 
         return self._post(
             raiz,
-            localizar_url(
-                WS_NFE_CADASTRO,
-                str(self.uf),
-                self.mod,
-                int(self.ambiente),
-                self.contingencia,
-            ),
+            self._url(WS_NFE_CADASTRO),
             "consultaCadastro",
             retConsCad,
         )
@@ -2,8 +2,8 @@
 
 
 import collections
-import time
 
+from erpbrasil.edoc.assincrono import sessao_assincrona
 from erpbrasil.edoc.edoc import DocumentoEletronico
 from erpbrasil.edoc.resposta import analisar_retorno
 
@@ -39,6 +39,30 @@ class NFSe(DocumentoEletronico):
         super().__init__(transmissao)
 
     def _post(self, body, servico):
+        body_string, argumentos = self._argumentos(body)
+        with self._cliente(urljoin(self._url, servico.endpoint)) as cliente:
+            resposta = cliente.service[servico.operacao](*argumentos)
+
+        return analisar_retorno(
+            servico.operacao, body, body_string, resposta, servico.classe_retorno
+        )
+
+    async def _post_async(self, body, servico):
+        body_string, argumentos = self._argumentos(body)
+        async with self._cliente_zeep(urljoin(self._url, servico.endpoint)) as cliente:
+            retorno = await sessao_assincrona(self._transmissao.certificado).enviar(
+                cliente, servico.operacao, argumentos
+            )
+            binding = cliente.service._binding
+            resposta = binding.process_reply(
+                cliente, binding.get(servico.operacao), retorno
+            )
+
+        return analisar_retorno(
+            servico.operacao, body, body_string, resposta, servico.classe_retorno
+        )
+
+    def _argumentos(self, body):
         header_string = None
         if self._header:
             header_string, header_etree = self._generateds_to_string_etree(self._header)
@@ -52,27 +76,11 @@ class NFSe(DocumentoEletronico):
             header_string = header.attrib.get("Versao")
 
         if header_string:
-            with self._transmissao.cliente(
-                urljoin(self._url, servico.endpoint)
-            ) as cliente:
-                resposta = cliente.service[servico.operacao](
-                    header_string,
-                    body_string,
-                )
-        else:
-            with self._transmissao.cliente(
-                urljoin(self._url, servico.endpoint)
-            ) as cliente:
-                resposta = cliente.service[servico.operacao](
-                    body_string,
-                )
-
-        return analisar_retorno(
-            servico.operacao, body, body_string, resposta, servico.classe_retorno
-        )
+            return body_string, (header_string, body_string)
+        return body_string, (body_string,)
 
-    def _aguarda_tempo_medio(self, proc_envio):
-        time.sleep(self._tempo_medio)
+    def _tempo_espera(self, proc_envio):
+        return self._tempo_medio
 
     def envia_documento(self, edoc):
         return self._post(
@@ -80,12 +88,24 @@ class NFSe(DocumentoEletronico):
             servico=self._servicos[self.envia_documento.__name__],
         )
 
+    async def envia_documento_async(self, edoc):
+        return await self._post_async(
+            body=self._prepara_envia_documento(edoc),
+            servico=self._servicos[self.envia_documento.__name__],
+        )
+
     def consulta_recibo(self, proc_envio):
         return self._post(
             body=self._prepara_consulta_recibo(proc_envio),
             servico=self._servicos[self.consulta_recibo.__name__],
         )
 
+    async def consulta_recibo_async(self, proc_envio):
+        return await self._post_async(
+            body=self._prepara_consulta_recibo(proc_envio),
+            servico=self._servicos[self.consulta_recibo.__name__],
+        )
+
     def consultar_lote_rps(self, protocolo):
         return self._post(
             body=self._prepara_consultar_lote_rps(protocolo),
@@ -0,0 +1,263 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import atexit
+import collections
+import os
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+
+from cryptography.hazmat.primitives import hashes
+from requests import Session
+from requests.adapters import HTTPAdapter
+from zeep import Client
+from zeep.transports import Transport
+
+from erpbrasil.assinatura.certificado import ArquivoCertificado
+from erpbrasil.transmissao import TransmissaoSOAP
+
+from .wsdl import DIRETORIO_CACHE_WSDL, CacheWSDL
+
+
+def impressao_digital(certificado):
+    """Impressão digital (SHA-256) do certificado: identifica o mesmo
+    certificado carregado em objetos Certificado diferentes."""
+    return certificado.cert.fingerprint(hashes.SHA256())
+
+
+def contexto_ssl(certificado, verify=False):
+    """SSLContext com o certificado e a chave privada carregados.
+
+    Os arquivos temporários exigidos pelo ``load_cert_chain`` são apagados
+    logo após a leitura.
+    """
+    contexto = ssl.create_default_context(
+        cafile=verify if isinstance(verify, str) else None
+    )
+    if not verify:
+        contexto.check_hostname = False
+        contexto.verify_mode = ssl.CERT_NONE
+    # O ArquivoCertificado grava o certificado no primeiro arquivo e a chave
+    # no segundo
+    with ArquivoCertificado(certificado, "w") as (cert, chave):
+        contexto.load_cert_chain(certfile=cert, keyfile=chave)
+    return contexto
+
+
+class _AdaptadorCertificado(HTTPAdapter):
+    """HTTPAdapter que abre as conexões com o SSLContext do certificado."""
+
+    def __init__(self, contexto, **kwargs):
+        self.contexto = contexto
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["ssl_context"] = self.contexto
+        return super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **kwargs):
+        kwargs["ssl_context"] = self.contexto
+        return super().proxy_manager_for(proxy, **kwargs)
+
+
+class _SessaoCertificado:
+    """Sessão HTTP compartilhada por todos os clientes de um certificado.
+
+    A chave privada é mantida apenas no SSLContext do adaptador HTTPS da
+    sessão, sem arquivos temporários no disco.
+    """
+
+    def __init__(self, chave, certificado, verify=False):
+        self.chave = chave
+        self.session = Session()
+        self.session.mount(
+            "https://", _AdaptadorCertificado(contexto_ssl(certificado, verify))
+        )
+        self.session.verify = verify
+        self.clientes = 0
+
+    def fechar(self):
+        self.session.close()
+
+
+class _ClientePool:
+    def __init__(self, cliente, sessao):
+        self.cliente = cliente
+        self.sessao = sessao
+        self.em_uso = 0
+        self.ultimo_uso = time.monotonic()
+        self.descartado = False
+
+
+class _ClienteThread(threading.local):
+    """Cliente atual da transmissão, próprio de cada thread.
+
+    O TransmissaoSOAP.enviar utiliza o atributo ``_cliente`` da transmissão;
+    com esta indireção threads que compartilham a mesma transmissão podem
+    utilizar clientes (URLs) diferentes ao mesmo tempo.
+    """
+
+    cliente = False
+
+    def __bool__(self):
+        return bool(self.cliente)
+
+    def __getattr__(self, nome):
+        return getattr(self.cliente, nome)
+
+
+class PoolClientes:
+    """Pool de clientes SOAP (zeep) prontos para uso.
+
+    Cada cliente é identificado pelo certificado (impressão digital) e pela
+    URL do webservice, que já resolve a combinação UF, modelo, ambiente e
+    serviço. Os clientes de um
+    mesmo certificado compartilham a sessão HTTP, reaproveitando as conexões
+    TLS abertas com o servidor. Clientes ociosos por mais de ``tempo_ocioso``
+    segundos são descartados, assim como os mais antigos quando o pool excede
+    ``tamanho_maximo``.
+
+    O ``cache`` (zeep.cache) é utilizado na leitura dos WSDL; quando não
+    informado é utilizado o cache da transmissão.
+    """
+
+    def __init__(self, tamanho_maximo=32, tempo_ocioso=300, cache=None):
+        self.tamanho_maximo = tamanho_maximo
+        self.tempo_ocioso = tempo_ocioso
+        self.cache = cache
+        self._clientes = collections.OrderedDict()
+        self._sessoes = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._clientes)
+
+    @staticmethod
+    def suporta(transmissao):
+        """O pool substitui o TransmissaoSOAP.cliente; transmissões que
+        personalizam a criação do cliente continuam usando o próprio método.
+        """
+        return (
+            isinstance(transmissao, TransmissaoSOAP)
+            and type(transmissao).cliente is TransmissaoSOAP.cliente
+        )
+
+    @contextmanager
+    def cliente(self, transmissao, url):
+        item = self._obter(transmissao, url)
+        cliente_thread = transmissao.__dict__.get("_cliente")
+        if not isinstance(cliente_thread, _ClienteThread):
+            with self._lock:
+                cliente_thread = transmissao.__dict__.get("_cliente")
+                if not isinstance(cliente_thread, _ClienteThread):
+                    cliente_thread = _ClienteThread()
+                    transmissao._cliente = cliente_thread
+        anterior = cliente_thread.cliente
+        cliente_thread.cliente = item.cliente
+        try:
+            yield item.cliente
+        finally:
+            cliente_thread.cliente = anterior
+            self._liberar(item)
+
+    def reservar(self, transmissao, url):
+        """Reserva o cliente da URL sem associá-lo à transmissão, para uso
+        fora do contexto ``cliente`` (chamadas assíncronas). O cliente e a
+        sua sessão não são descartados até a chamada de ``liberar``.
+
+        :return: reserva, com o cliente em ``reserva.cliente``
+        """
+        return self._obter(transmissao, url)
+
+    def liberar(self, reserva):
+        self._liberar(reserva)
+
+    def _obter(self, transmissao, url):
+        certificado = impressao_digital(transmissao.certificado)
+        chave = (certificado, url)
+        with self._lock:
+            self._descartar_ociosos()
+            item = self._clientes.get(chave)
+            if item is not None:
+                self._clientes.move_to_end(chave)
+                item.em_uso += 1
+                return item
+            sessao = self._sessao(certificado, transmissao.certificado)
+            sessao.clientes += 1
+
+        # A leitura do WSDL é feita fora do lock para não bloquear as demais
+        # threads que utilizam clientes já prontos.
+        try:
+            transmissao.desativar_avisos()
+            cache = self.cache
+            if cache is None:
+                cache = getattr(transmissao, "_cache", None)
+            cliente = Client(
+                url, transport=Transport(session=sessao.session, cache=cache)
+            )
+        except Exception:
+            with self._lock:
+                self._fechar_sessao(sessao)
+            raise
+
+        with self._lock:
+            existente = self._clientes.get(chave)
+            if existente is not None:
+                # Outra thread criou o mesmo cliente enquanto o WSDL era lido
+                self._fechar_sessao(sessao)
+                existente.em_uso += 1
+                return existente
+            item = _ClientePool(cliente, sessao)
+            item.em_uso += 1
+            self._clientes[chave] = item
+            while len(self._clientes) > self.tamanho_maximo:
+                self._descartar(*self._clientes.popitem(last=False))
+            return item
+
+    def _liberar(self, item):
+        with self._lock:
+            item.em_uso -= 1
+            item.ultimo_uso = time.monotonic()
+            if item.descartado and not item.em_uso:
+                self._fechar_sessao(item.sessao)
+
+    def _sessao(self, chave, certificado):
+        sessao = self._sessoes.get(chave)
+        if sessao is None:
+            sessao = self._sessoes[chave] = _SessaoCertificado(chave, certificado)
+        return sessao
+
+    def _descartar_ociosos(self):
+        limite = time.monotonic() - self.tempo_ocioso
+        for chave, item in list(self._clientes.items()):
+            if not item.em_uso and item.ultimo_uso < limite:
+                self._descartar(chave, self._clientes.pop(chave))
+
+    def _descartar(self, chave, item):
+        item.descartado = True
+        if not item.em_uso:
+            self._fechar_sessao(item.sessao)
+
+    def _fechar_sessao(self, sessao):
+        sessao.clientes -= 1
+        if sessao.clientes <= 0:
+            sessao.fechar()
+            if self._sessoes.get(sessao.chave) is sessao:
+                del self._sessoes[sessao.chave]
+
+    def limpar(self):
+        """Descarta todos os clientes e fecha as sessões HTTP."""
+        with self._lock:
+            while self._clientes:
+                self._descartar(*self._clientes.popitem(last=False))
+
+
+# O cache offline dos WSDL é utilizado quando preparado previamente com o
+# comando ``erpbrasil.edoc atualizar-wsdl``
+POOL_CLIENTES = PoolClientes(
+    cache=CacheWSDL() if os.path.isdir(DIRETORIO_CACHE_WSDL) else None
+)
+
+atexit.register(POOL_CLIENTES.limpar)
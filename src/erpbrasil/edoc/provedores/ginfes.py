@@ -4,6 +4,8 @@
 import xml.etree.ElementTree as ET
 from datetime import datetime
 
+from lxml import etree
+
 from erpbrasil.base import misc
 from erpbrasil.edoc.nfse import NFSe, ServicoNFSe
 
@@ -26,6 +28,8 @@ except ImportError:
 
 endpoint = "ServiceGinfesImpl?wsdl"
 
+SIGNATURE = "{http://www.w3.org/2000/09/xmldsig#}Signature"
+
 if ginfes:
     servicos = {
         "envia_documento": ServicoNFSe(
@@ -80,7 +84,7 @@ class Ginfes(NFSe):
         #
         # Assinamos todas as RPS e o Lote
         #
-        xml_assinado = edoc
+        xml_string, xml_etree = self._generateds_to_string_etree(edoc)
         # for rps in edoc.LoteRps.ListaRps.Rps:
         #     xml_assinado = self.assin a_raiz(
         #       xml_assinado, rps.InfRps.Id, getchildren=True
@@ -88,12 +92,21 @@ class Ginfes(NFSe):
         # Assinamos o lote
         # xml_assinado = self.assina_raiz(xml_assinado, edoc.LoteRps.Id)
 
-        for rps in edoc.LoteRps.ListaRps.Rps:
-            xml_assinado = self.assina_raiz(xml_assinado, rps.InfRps.Id)
+        # Cada RPS é assinada separadamente (em paralelo) e a assinatura é
+        # incluída na RPS correspondente do lote
+        lista_rps = xml_etree.findall(".//{*}ListaRps/{*}Rps")
+        xmls_assinados = self.assina_raizes(
+            [
+                (etree.tostring(rps, encoding=str), rps.find("{*}InfRps").get("Id"))
+                for rps in lista_rps
+            ]
+        )
+        for rps, xml_assinado in zip(lista_rps, xmls_assinados):
+            rps.append(etree.fromstring(xml_assinado).find(SIGNATURE))
         # Assinamos o lote
         # xml_assinado = self.assina_raiz(xml_assinado, edoc.LoteRps.Id)
 
-        return xml_assinado
+        return etree.tostring(xml_etree, encoding=str)
 
     def _prepara_consulta_recibo(self, proc_envio):
         raiz = servico_consultar_situacao_lote_rps_envio.ConsultarSituacaoLoteRpsEnvio(
@@ -0,0 +1,138 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import binascii
+import csv
+import hashlib
+import itertools
+from contextlib import suppress
+
+from erpbrasil.edoc.mdfe import QR_CODE_URL
+from erpbrasil.edoc.nfce import ESTADO_QRCODE
+from erpbrasil.edoc.nfe import SIGLA_ESTADO
+
+pyarrow = None
+with suppress(ImportError):
+    import pyarrow
+    import pyarrow.parquet
+
+# Linhas gravadas por vez nos arquivos CSV e Parquet
+TAMANHO_LOTE_GRAVACAO = 65536
+
+
+def _hex(digest_value):
+    return binascii.hexlify(digest_value.encode()).decode()
+
+
+class QRCodeNFCe:
+    """Gera os QR Codes (versão 2) de várias NFC-e de uma UF e ambiente, na
+    reimpressão dos DANFE ou após a troca do CSC.
+
+    A URL da UF, os parâmetros fixos e o CSC são montados uma única vez;
+    cada QR Code custa apenas a concatenação e o hash SHA-1. Os QR Codes
+    são iguais aos de NFCe.monta_qrcode e _generate_qrcode_contingency.
+    """
+
+    def __init__(self, uf, ambiente, csc_token, csc_code, qrcode_versao="2"):
+        self.url = ESTADO_QRCODE[SIGLA_ESTADO[str(uf)]][str(ambiente)]
+        self.csc_token = str(csc_token)
+        self.csc_code = str(csc_code)
+        self._parametros = f"|{qrcode_versao}|{ambiente}|"
+
+    def qrcodes(self, chaves):
+        """Gera os QR Codes das NFC-e emitidas normalmente (tpEmis 1)."""
+        url, csc_code, sha1 = self.url, self.csc_code, hashlib.sha1
+        sufixo = self._parametros + self.csc_token
+        for chave in chaves:
+            pre_qrcode = chave + sufixo
+            qr_hash = sha1((pre_qrcode + csc_code).encode()).hexdigest().upper()
+            yield f"{url}{pre_qrcode}|{qr_hash}"
+
+    def qrcodes_contingencia(self, chaves, datas_emissao, totais, digest_values):
+        """Gera os QR Codes das NFC-e emitidas em contingência offline.
+
+        :param chaves: chaves de acesso
+        :param datas_emissao: dhEmi de cada NFC-e
+        :param totais: vNF de cada NFC-e
+        :param digest_values: DigestValue da assinatura de cada NFC-e
+        """
+        url, csc_code, sha1 = self.url, self.csc_code, hashlib.sha1
+        parametros, token = self._parametros, "|" + self.csc_token
+        for chave, data_emissao, total, digest_value in zip(
+            chaves, datas_emissao, totais, digest_values
+        ):
+            pre_qrcode = (
+                f"{chave}{parametros}{data_emissao[8:10]}|{total}"
+                f"|{_hex(digest_value)}{token}"
+            )
+            qr_hash = sha1((pre_qrcode + csc_code).encode()).hexdigest().upper()
+            yield f"{url}{pre_qrcode}|{qr_hash}"
+
+
+class QRCodeMDFe:
+    """Gera os QR Codes de vários MDF-e do ambiente, como MDFe.monta_qrcode
+    e monta_qrcode_contingencia."""
+
+    def __init__(self, ambiente):
+        self._sufixo = f"&tpAmb={ambiente}"
+
+    def qrcodes(self, chaves):
+        prefixo, sufixo = QR_CODE_URL + "?chMDFe=", self._sufixo
+        for chave in chaves:
+            yield prefixo + chave + sufixo
+
+    def qrcodes_contingencia(self, chaves, digest_values):
+        """:param digest_values: DigestValue da assinatura de cada MDF-e"""
+        for qrcode, digest_value in zip(self.qrcodes(chaves), digest_values):
+            yield f"{qrcode}&sign={_hex(digest_value)}"
+
+
+def gravar_csv(destino, chaves, qrcodes, cabecalho=("chave", "qrcode")):
+    """Grava as chaves e seus QR Codes em um arquivo CSV.
+
+    :param destino: caminho ou arquivo texto aberto
+    :param qrcodes: QR Codes das chaves, na mesma ordem (gerador de
+        QRCodeNFCe ou QRCodeMDFe)
+    :return: quantidade de QR Codes gravados
+    """
+    if isinstance(destino, str):
+        with open(destino, "w", newline="", encoding="utf-8") as arquivo:
+            return gravar_csv(arquivo, chaves, qrcodes, cabecalho)
+    escritor = csv.writer(destino)
+    if cabecalho:
+        escritor.writerow(cabecalho)
+    quantidade = 0
+    for linhas in _lotes(zip(chaves, qrcodes), TAMANHO_LOTE_GRAVACAO):
+        escritor.writerows(linhas)
+        quantidade += len(linhas)
+    return quantidade
+
+
+def gravar_parquet(destino, chaves, qrcodes, cabecalho=("chave", "qrcode")):
+    """Grava as chaves e seus QR Codes em um arquivo Parquet, em lotes de
+    TAMANHO_LOTE_GRAVACAO linhas (requer o pacote pyarrow).
+
+    :return: quantidade de QR Codes gravados
+    """
+    if pyarrow is None:
+        raise ImportError(
+            "pyarrow é necessário para gravar arquivos Parquet: "
+            "pip install erpbrasil.edoc[parquet]"
+        )
+    esquema = pyarrow.schema([(nome, pyarrow.string()) for nome in cabecalho])
+    quantidade = 0
+    with pyarrow.parquet.ParquetWriter(destino, esquema) as escritor:
+        for linhas in _lotes(zip(chaves, qrcodes), TAMANHO_LOTE_GRAVACAO):
+            colunas = [list(coluna) for coluna in zip(*linhas)]
+            escritor.write_table(pyarrow.Table.from_arrays(colunas, schema=esquema))
+            quantidade += len(linhas)
+    return quantidade
+
+
+def _lotes(linhas, tamanho):
+    linhas = iter(linhas)
+    while True:
+        lote = list(itertools.islice(linhas, tamanho))
+        if not lote:
+            return
+        yield lote
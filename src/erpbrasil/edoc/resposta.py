@@ -1,10 +1,19 @@
 # Copyright (C) 2018 - TODAY Luis Felipe Mileo - KMEE INFORMATICA LTDA
 # License MIT
 
-import re
-
 from lxml import etree
 
+SOAP_ENVELOPE_NAMESPACES = (
+    "http://schemas.xmlsoap.org/soap/envelope/",  # SOAP 1.1
+    "http://www.w3.org/2003/05/soap-envelope",  # SOAP 1.2
+)
+
+# Mesmo comportamento do parser utilizado pelo generateDS (ETCompatXMLParser):
+# comentários e instruções de processamento são descartados.
+_parser_resposta = etree.XMLParser(
+    remove_comments=True, remove_pis=True, huge_tree=True
+)
+
 
 class RetornoSoap:
     def __init__(self, webservice, raiz, xml, retorno, resposta):
@@ -15,26 +24,63 @@ class RetornoSoap:
         self.retorno = retorno
 
 
+def localizar_corpo_soap(conteudo):
+    """Localiza o elemento Body do envelope SOAP, independente do prefixo
+    utilizado (soap:, soap12:, env:, ...).
+
+    :param conteudo: bytes ou str com o envelope SOAP
+    :return: elemento Body ou None
+    """
+    if isinstance(conteudo, str):
+        conteudo = conteudo.encode("utf-8")
+    try:
+        envelope = etree.fromstring(conteudo, parser=_parser_resposta)
+    except etree.XMLSyntaxError:
+        return None
+    for namespace in SOAP_ENVELOPE_NAMESPACES:
+        corpo = envelope.find("{%s}Body" % namespace)
+        if corpo is not None:
+            return corpo
+    return None
+
+
+def localizar_resultado(corpo, nome):
+    """Retorna o primeiro elemento dentro do resultado do webservice (primeiro
+    filho do corpo, ex.: nfeResultMsg) cuja tag contém o nome informado, ou o
+    primeiro filho do resultado caso nenhum seja encontrado.
+    """
+    resultado = corpo[0]
+    for elemento in resultado.iterdescendants(etree.Element):
+        if nome in elemento.tag:
+            return elemento
+    return resultado[0] if len(resultado) else resultado
+
+
+def construir_resposta(classe, elemento):
+    """Constrói o objeto de retorno da classe (módulo generateDS) diretamente a
+    partir do elemento lxml, sem serializar e interpretar o XML novamente.
+    """
+    classe.Validate_simpletypes_ = False
+    get_root_tag = getattr(classe, "get_root_tag", None)
+    if get_root_tag is not None:
+        tag, classe_raiz = get_root_tag(elemento)
+        if classe_raiz is not None:
+            resposta = classe_raiz.factory()
+            if hasattr(classe, "GdsCollector_"):
+                resposta.build(elemento, gds_collector_=classe.GdsCollector_())
+            else:
+                resposta.build(elemento)
+            return resposta
+    return classe.parseString(etree.tostring(elemento), silence=True)
+
+
 def analisar_retorno_raw(operacao, raiz, xml, retorno, classe):
     retorno.raise_for_status()
-    match = re.search("<soap:Body>(.*?)</soap:Body>", retorno.text.replace("\n", ""))
-    if match:
-        xml_resposta = match.group(1)
-        xml_etree = etree.fromstring(xml_resposta)
-        resultado = xml_etree[0]
-
+    corpo = localizar_corpo_soap(retorno.content)
+    if corpo is not None and len(corpo):
         nome_classe = classe.__name__.split(".")[-1]
-        xml_classe_tags = list(
-            filter(
-                lambda children: nome_classe in children.tag, xml_etree.findall(".//")
-            )
-        )
-        if xml_classe_tags:
-            resultado = xml_classe_tags[0]
-
-        resultado = etree.tostring(resultado)
-        classe.Validate_simpletypes_ = False
-        resposta = classe.parseString(resultado, silence=True)
+        resultado = localizar_resultado(corpo, nome_classe)
+        resposta = construir_resposta(classe, resultado)
         return RetornoSoap(operacao, raiz, xml, retorno, resposta)
 
 
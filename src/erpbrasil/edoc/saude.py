@@ -0,0 +1,143 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import collections
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# cStat de serviço paralisado: momentaneamente (108) e sem previsão (109)
+SERVICO_PARALISADO = ("108", "109")
+
+CIRCUITO_FECHADO = "fechado"
+CIRCUITO_ABERTO = "aberto"
+CIRCUITO_MEIO_ABERTO = "meio_aberto"
+
+
+class SaudeEndpoint:
+    """Estatísticas e estado do circuito de um endpoint (URL do webservice).
+
+    :param amostras: quantidade de latências mantidas
+    """
+
+    def __init__(self, amostras=50):
+        self.latencias = collections.deque(maxlen=amostras)
+        self.sucessos = 0
+        self.falhas = 0
+        self.timeouts = 0
+        self.paralisacoes = 0
+        self.falhas_consecutivas = 0
+        self.testes_bem_sucedidos = 0
+        self.estado = CIRCUITO_FECHADO
+        self.aberto_em = None
+
+    @property
+    def latencia_media(self):
+        if self.latencias:
+            return sum(self.latencias) / len(self.latencias)
+
+
+class MonitorSaude:
+    """Acompanha a saúde dos webservices e abre o circuito (deixa de
+    utilizar o endpoint) após ``limite_falhas`` falhas consecutivas: exceções
+    na transmissão (timeout, conexão recusada, erro HTTP) ou respostas de
+    serviço paralisado (cStat 108/109).
+
+    Com o circuito aberto ``disponivel`` retorna False e o documento utiliza
+    a contingência (SVC). Depois de ``tempo_abertura`` segundos uma única
+    requisição de teste é liberada para o endpoint principal; o circuito
+    fecha após ``sucessos_teste`` testes bem sucedidos e reabre na primeira
+    falha.
+
+    :param limite_falhas: falhas consecutivas para abrir o circuito
+    :param tempo_abertura: segundos até a próxima requisição de teste
+    :param sucessos_teste: testes bem sucedidos para fechar o circuito
+    :param relogio: função que retorna o horário atual (time.monotonic)
+    """
+
+    def __init__(
+        self,
+        limite_falhas=3,
+        tempo_abertura=60,
+        sucessos_teste=1,
+        relogio=time.monotonic,
+    ):
+        self.limite_falhas = limite_falhas
+        self.tempo_abertura = tempo_abertura
+        self.sucessos_teste = sucessos_teste
+        self.relogio = relogio
+        self._endpoints = collections.defaultdict(SaudeEndpoint)
+        self._lock = threading.Lock()
+
+    def saude(self, url):
+        with self._lock:
+            return self._endpoints[url]
+
+    def aberto(self, url):
+        """Indica se o circuito do endpoint está aberto, sem liberar a
+        requisição de teste (ver ``disponivel``)"""
+        with self._lock:
+            saude = self._endpoints[url]
+            return (
+                saude.estado != CIRCUITO_FECHADO
+                and self.relogio() - saude.aberto_em < self.tempo_abertura
+            )
+
+    def disponivel(self, url):
+        """Indica se a requisição pode utilizar o endpoint; com o circuito
+        aberto libera uma requisição de teste a cada ``tempo_abertura``
+        """
+        with self._lock:
+            saude = self._endpoints[url]
+            if saude.estado == CIRCUITO_FECHADO:
+                return True
+            agora = self.relogio()
+            if agora - saude.aberto_em < self.tempo_abertura:
+                return False
+            # Libera uma requisição de teste; sem resultado, outra é liberada
+            # após o mesmo intervalo
+            saude.estado = CIRCUITO_MEIO_ABERTO
+            saude.aberto_em = agora
+            return True
+
+    def registrar_sucesso(self, url, latencia):
+        with self._lock:
+            saude = self._endpoints[url]
+            saude.latencias.append(latencia)
+            saude.sucessos += 1
+            saude.falhas_consecutivas = 0
+            if saude.estado != CIRCUITO_FECHADO:
+                saude.testes_bem_sucedidos += 1
+                if saude.testes_bem_sucedidos >= self.sucessos_teste:
+                    _logger.info("Circuito do webservice %s fechado", url)
+                    saude.estado = CIRCUITO_FECHADO
+                else:
+                    # Aguarda o próximo teste
+                    saude.aberto_em = self.relogio() - self.tempo_abertura
+
+    def registrar_falha(self, url, latencia=None, timeout=False, paralisado=False):
+        with self._lock:
+            saude = self._endpoints[url]
+            if latencia is not None:
+                saude.latencias.append(latencia)
+            saude.falhas += 1
+            saude.timeouts += bool(timeout)
+            saude.paralisacoes += bool(paralisado)
+            saude.falhas_consecutivas += 1
+            if saude.estado != CIRCUITO_FECHADO or (
+                saude.falhas_consecutivas >= self.limite_falhas
+            ):
+                if saude.estado == CIRCUITO_FECHADO:
+                    _logger.warning("Circuito do webservice %s aberto", url)
+                saude.estado = CIRCUITO_ABERTO
+                saude.aberto_em = self.relogio()
+                saude.testes_bem_sucedidos = 0
+
+    def limpar(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+MONITOR_SAUDE = MonitorSaude()
@@ -0,0 +1,188 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import suppress
+
+_logger = logging.getLogger(__name__)
+
+# Tempo de validade, em segundos, da consulta ao status do serviço
+TTL_STATUS_SERVICO = 180
+
+# cStat 107: serviço em operação. As demais respostas (serviço paralisado,
+# 108/109...) valem por TTL_STATUS_SERVICO_PARALISADO, para que o retorno
+# do serviço seja percebido logo
+SERVICO_EM_OPERACAO = "107"
+TTL_STATUS_SERVICO_PARALISADO = 15
+
+DIRETORIO_CACHE_STATUS = os.environ.get("ERPBRASIL_EDOC_CACHE_STATUS")
+
+
+class _Entrada:
+    def __init__(self, proc, expira):
+        self.proc = proc
+        self.expira = expira
+
+
+class CacheStatusServico:
+    """Cache das consultas ao status do serviço (retConsStatServ), indexado
+    por UF, modelo, ambiente e URL do serviço (normal ou contingência).
+
+    Enquanto a consulta estiver válida (``ttl`` segundos) o mesmo retorno é
+    utilizado por todas as instâncias de NFe/NFCe/MDFe da mesma chave,
+    evitando o 'consumo indevido' do serviço. Chamadas simultâneas de uma
+    chave sem consulta válida aguardam uma única requisição.
+
+    Com ``diretorio`` o conteúdo da resposta SOAP também é gravado em disco,
+    e compartilhado por outros processos que utilizem o mesmo diretório.
+
+    Uma falha de transmissão (invalidar) descarta a consulta da chave antes
+    do fim do ttl.
+
+    :param ttl: validade da consulta, em segundos
+    :param ttl_paralisado: validade das respostas diferentes de serviço em
+        operação (cStat 107), em segundos
+    :param diretorio: diretório compartilhado entre processos (opcional)
+    :param relogio: função que retorna o horário atual (time.time)
+    """
+
+    def __init__(
+        self,
+        ttl=TTL_STATUS_SERVICO,
+        diretorio=DIRETORIO_CACHE_STATUS,
+        relogio=time.time,
+        ttl_paralisado=TTL_STATUS_SERVICO_PARALISADO,
+    ):
+        self.ttl = ttl
+        self.ttl_paralisado = ttl_paralisado
+        self.diretorio = diretorio
+        self.relogio = relogio
+        self.contadores = collections.Counter()
+        self._entradas = {}
+        self._consultas = {}
+        self._lock = threading.Lock()
+
+    @property
+    def acertos(self):
+        return self.contadores["acertos"]
+
+    @property
+    def faltas(self):
+        return self.contadores["faltas"]
+
+    def _arquivo(self, chave):
+        nome = hashlib.sha256(repr(chave).encode("utf-8")).hexdigest()
+        return os.path.join(self.diretorio, nome + ".json")
+
+    def _valida(self, chave):
+        entrada = self._entradas.get(chave)
+        if entrada is not None and entrada.expira > self.relogio():
+            return entrada
+        self._entradas.pop(chave, None)
+
+    def consulta(self, chave):
+        """Retorna a consulta válida da chave, ou None"""
+        with self._lock:
+            entrada = self._valida(chave)
+            self.contadores["acertos" if entrada else "faltas"] += 1
+            return entrada and entrada.proc
+
+    def obter(self, chave, consultar, carregar=None):
+        """Retorna a consulta válida da chave, ou executa ``consultar``.
+
+        :param chave: tupla (UF, modelo, ambiente, URL do serviço)
+        :param consultar: função que consulta o status do serviço
+        :param carregar: função que reconstrói o retorno a partir do
+            conteúdo da resposta gravado por outro processo
+        """
+        with self._lock:
+            entrada = self._valida(chave)
+            if entrada is not None:
+                self.contadores["acertos"] += 1
+                return entrada.proc
+            consulta = self._consultas.get(chave)
+            responsavel = consulta is None
+            if responsavel:
+                consulta = self._consultas[chave] = threading.Event()
+
+        if not responsavel:
+            # Outra thread está consultando a mesma chave
+            consulta.wait()
+            with self._lock:
+                entrada = self._valida(chave)
+                if entrada is not None:
+                    self.contadores["acertos"] += 1
+                    return entrada.proc
+            return self.obter(chave, consultar, carregar)
+
+        try:
+            proc = self.diretorio and carregar and self._ler(chave, carregar)
+            with self._lock:
+                self.contadores["acertos" if proc else "faltas"] += 1
+            if not proc:
+                proc = consultar()
+                self.gravar(chave, proc)
+            return proc
+        finally:
+            with self._lock:
+                del self._consultas[chave]
+            consulta.set()
+
+    def gravar(self, chave, proc):
+        """Armazena o retorno do status do serviço da chave"""
+        if not proc or not proc.resposta:
+            return
+        ttl = self.ttl
+        if proc.resposta.cStat != SERVICO_EM_OPERACAO:
+            ttl = min(ttl, self.ttl_paralisado)
+        expira = self.relogio() + ttl
+        with self._lock:
+            self._entradas[chave] = _Entrada(proc, expira)
+        if self.diretorio and proc.retorno is not None:
+            try:
+                os.makedirs(self.diretorio, exist_ok=True)
+                temporario = self._arquivo(chave) + ".tmp"
+                with open(temporario, "w") as arquivo:
+                    json.dump(
+                        {"expira": expira, "conteudo": proc.retorno.content.decode()},
+                        arquivo,
+                    )
+                os.replace(temporario, self._arquivo(chave))
+            except OSError:
+                _logger.warning("Não foi possível gravar o status do serviço")
+
+    def _ler(self, chave, carregar):
+        try:
+            with open(self._arquivo(chave)) as arquivo:
+                dados = json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+        if dados["expira"] <= self.relogio():
+            return None
+        proc = carregar(dados["conteudo"].encode())
+        if proc and proc.resposta:
+            with self._lock:
+                self._entradas[chave] = _Entrada(proc, dados["expira"])
+            return proc
+
+    def invalidar(self, chave):
+        """Descarta a consulta da chave (por exemplo após falha de transmissão)"""
+        with self._lock:
+            if self._entradas.pop(chave, None) is not None:
+                self.contadores["invalidacoes"] += 1
+        if self.diretorio:
+            with suppress(OSError):
+                os.remove(self._arquivo(chave))
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+CACHE_STATUS_SERVICO = CacheStatusServico()
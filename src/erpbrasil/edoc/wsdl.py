@@ -0,0 +1,135 @@
+# Copyright (C) 2026 - Engenere (<https://engenere.one>)
+# License MIT
+
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from urllib.parse import urljoin
+
+from zeep import Client
+from zeep.cache import Base
+from zeep.transports import Transport
+
+_logger = logging.getLogger(__name__)
+
+DIRETORIO_CACHE_WSDL = os.environ.get(
+    "ERPBRASIL_EDOC_CACHE_WSDL",
+    os.path.join(os.path.expanduser("~"), ".cache", "erpbrasil.edoc", "wsdl"),
+)
+
+
+class CacheWSDL(Base):
+    """Cache persistente dos WSDL/XSD dos webservices, para o zeep.
+
+    Cada documento é gravado compactado (gzip) em um arquivo próprio e só é
+    lido do disco na primeira vez que o serviço correspondente for utilizado.
+    Diferente do SqliteCache, os documentos não expiram: um worker iniciado
+    com o cache preenchido (ver ``atualizar_cache_wsdl``) não precisa acessar
+    a rede para ler as descrições dos serviços.
+
+    :param diretorio: diretório dos arquivos do cache
+    :param atualizar: ignora o conteúdo existente, forçando o download e a
+        gravação de todos os documentos utilizados
+    """
+
+    def __init__(self, diretorio=None, atualizar=False):
+        self.diretorio = diretorio or DIRETORIO_CACHE_WSDL
+        self.atualizar = atualizar
+        self._documentos = {}
+        self._lock = threading.Lock()
+
+    def _arquivo(self, url):
+        nome = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.diretorio, nome + ".xml.gz")
+
+    def add(self, url, content):
+        with self._lock:
+            self._documentos[url] = content
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            temporario = self._arquivo(url) + ".tmp"
+            with gzip.open(temporario, "wb") as arquivo:
+                arquivo.write(content)
+            os.replace(temporario, self._arquivo(url))
+        except OSError:
+            _logger.warning("Não foi possível gravar o WSDL %s no cache", url)
+
+    def get(self, url):
+        if self.atualizar:
+            return self._documentos.get(url)
+        with self._lock:
+            if url in self._documentos:
+                return self._documentos[url]
+        try:
+            with gzip.open(self._arquivo(url), "rb") as arquivo:
+                content = arquivo.read()
+        except OSError:
+            return None
+        with self._lock:
+            self._documentos[url] = content
+        return content
+
+
+def urls_wsdl():
+    """Retorna as URLs dos WSDL de todos os webservices conhecidos:
+    NF-e/NFC-e (nfe.ROTAS), MDF-e (SVC_RS) e os
+    provedores de NFS-e.
+    """
+    from . import mdfe, nfe
+    from .provedores.cidades import cidades
+
+    urls = set(nfe.ROTAS.values())
+
+    for ambiente, servicos in mdfe.SVC_RS.items():
+        for servico in servicos:
+            if servico != "servidor":
+                urls.add(mdfe.localizar_url(servico, ambiente))
+
+    for cidade, provedor in cidades.items():
+        for ambiente in ("1", "2"):
+            try:
+                nfse = provedor(None, ambiente, cidade, "", "")
+            except (ImportError, NameError) as erro:
+                # Os serviços dos provedores só são definidos com as
+                # bibliotecas opcionais (nfselib) instaladas
+                _logger.warning(
+                    "Provedor de NFS-e %s (%s) ignorado: %s",
+                    provedor.__name__,
+                    cidade,
+                    erro,
+                )
+                break
+            for servico in nfse._servicos.values():
+                urls.add(urljoin(nfse._url, servico.endpoint))
+
+    return sorted(urls)
+
+
+def atualizar_cache_wsdl(certificado, diretorio=None, urls=None):
+    """Baixa novamente os WSDL (e os XSD importados) e grava no cache.
+
+    :param certificado: erpbrasil.assinatura.certificado utilizado no acesso
+        aos webservices
+    :param diretorio: diretório do cache, por padrão DIRETORIO_CACHE_WSDL
+    :param urls: URLs a atualizar, por padrão todas as de ``urls_wsdl()``
+    :return: tupla com as listas de URLs atualizadas e das que falharam
+    """
+    from .pool import _SessaoCertificado, impressao_digital
+
+    cache = CacheWSDL(diretorio, atualizar=True)
+    sessao = _SessaoCertificado(impressao_digital(certificado), certificado)
+    transport = Transport(session=sessao.session, cache=cache)
+    atualizadas, falhas = [], []
+    try:
+        for url in urls or urls_wsdl():
+            try:
+                Client(url, transport=transport)
+                atualizadas.append(url)
+            except Exception as erro:
+                _logger.warning("Falha ao atualizar o WSDL %s: %s", url, erro)
+                falhas.append(url)
+    finally:
+        sessao.fechar()
+    return atualizadas, falhas
@@ -0,0 +1,53 @@
+"""Benchmark do serviço de assinatura: assinaturas de NF-e por segundo com
+1, 4 e 8 processos, comparadas à assinatura sequencial do assina_raiz
+anterior (nova Assinatura a cada chamada).
+
+Uso::
+
+    python -m tests.benchmarks.bench_assinatura [quantidade]
+"""
+
+import os
+import sys
+import time
+
+from erpbrasil.assinatura.assinatura import Assinatura
+from erpbrasil.edoc.assinatura import ServicoAssinatura
+from lxml import etree
+
+from ..test_certificate_mixin import TestCertificateMixin
+from ..test_erpbrasil_edoc_assinatura import exporta
+from ..sefaz_stub import monta_nfe
+
+
+def main(quantidade=2000):
+    certificado = TestCertificateMixin()._load_certificate()
+    itens = []
+    for numero in range(1, quantidade + 1):
+        edoc = monta_nfe(numero)[1]
+        itens.append((exporta(edoc), edoc.infNFe.Id))
+    print(f"{os.cpu_count()} CPUs disponíveis")
+
+    inicio = time.perf_counter()
+    for xml, id in itens:
+        Assinatura(certificado).assina_xml2(etree.fromstring(xml), id)
+    tempo = time.perf_counter() - inicio
+    print(f"{'anterior':<13} {quantidade / tempo:8.1f} assinaturas/s")
+
+    for processos in (1, 4, 8):
+        servico = ServicoAssinatura(certificado, processos=processos)
+        # Inicia os processos antes da medição
+        servico.assina_lote(itens[: processos * 4])
+        inicio = time.perf_counter()
+        assinados = servico.assina_lote(itens)
+        tempo = time.perf_counter() - inicio
+        servico.fechar()
+        assert len(assinados) == quantidade
+        print(
+            f"{processos} processo(s) {quantidade / tempo:8.1f} assinaturas/s"
+            f" ({tempo:6.2f}s)"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
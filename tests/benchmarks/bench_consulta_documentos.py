@@ -0,0 +1,68 @@
+"""Benchmark da conciliação de protocolos: consulta da situação de 200 NF-e
+contra o servidor stub local com 50 ms de latência por requisição.
+
+- serial: consulta_documento de cada chave, em sequência;
+- consulta_documentos: consultas simultâneas com diferentes concorrências.
+
+Uso::
+
+    python -m tests.benchmarks.bench_consulta_documentos [quantidade] [latencia]
+"""
+
+import sys
+import time
+from unittest import mock
+
+from erpbrasil.edoc.nfe import NFe
+from erpbrasil.edoc.pool import PoolClientes
+from erpbrasil.transmissao import TransmissaoSOAP
+
+from ..sefaz_stub import SERVICOS_STUB, SefazSimulada, ServidorSefazStub, monta_nfe
+from ..test_certificate_mixin import TestCertificateMixin
+
+
+def serial(nfe, chaves):
+    return [nfe.consulta_documento(chave).resposta.cStat for chave in chaves]
+
+
+def concorrente(concorrencia):
+    def executar(nfe, chaves):
+        return [
+            situacao.c_stat
+            for situacao in nfe.consulta_documentos(chaves, concorrencia)
+        ]
+
+    return executar
+
+
+def main(quantidade=200, latencia=0.05):
+    certificado = TestCertificateMixin()._load_certificate()
+    chaves = [monta_nfe(numero)[0] for numero in range(1, quantidade + 1)]
+    pool = PoolClientes()
+    with ServidorSefazStub(
+        certificado, servicos=SefazSimulada().servicos(), latencia=latencia
+    ) as stub, mock.patch(
+        "erpbrasil.edoc.nfe.localizar_url",
+        side_effect=lambda servico, *args: stub.url(SERVICOS_STUB[servico]),
+    ):
+        nfe = NFe(TransmissaoSOAP(certificado), "35", ambiente="2")
+        nfe._pool_clientes = pool
+        # Aquece o pool (download do WSDL)
+        nfe.consulta_documento(chaves[0])
+        abordagens = [("serial", serial)] + [
+            (f"concorrencia={n}", concorrente(n)) for n in (1, 8, 16)
+        ]
+        for nome, executar in abordagens:
+            inicio = time.perf_counter()
+            c_stats = executar(nfe, chaves)
+            tempo = time.perf_counter() - inicio
+            assert len(c_stats) == quantidade
+            print(
+                f"{nome:<16} {quantidade} consultas em {tempo:6.2f}s"
+                f" ({quantidade / tempo:7.1f} consultas/s)"
+            )
+    pool.limpar()
+
+
+if __name__ == "__main__":
+    main(*(float(arg) if "." in arg else int(arg) for arg in sys.argv[1:]))
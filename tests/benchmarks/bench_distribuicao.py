@@ -0,0 +1,87 @@
+"""Benchmark do pico de memória (RSS) na leitura de 5000 documentos da
+distribuição de DF-e (100 páginas retDistDFeInt com 50 docZip cada).
+
+- anterior: decodifica todos os docZip em strings e depois interpreta cada
+  documento (lxml);
+- documentos_distribuicao: um docZip de cada vez, liberando o conteúdo
+  já lido e interpretando o XML somente do documento em uso.
+
+Cada abordagem é executada em um processo próprio, para que o ru_maxrss de
+uma não influencie a outra.
+
+Uso::
+
+    python -m tests.benchmarks.bench_distribuicao [quantidade]
+"""
+
+import base64
+import gzip
+import resource
+import subprocess
+import sys
+import time
+
+from erpbrasil.edoc.distribuicao import documentos_distribuicao
+from erpbrasil.edoc.resposta import analisar_retorno_raw
+from lxml import etree
+from nfelib.v4_00 import retDistDFeInt
+
+from .fixtures import RetornoFake, ret_dist_dfe_int
+
+POR_PAGINA = 50
+
+
+def paginas(quantidade):
+    for inicio in range(1, quantidade + 1, POR_PAGINA):
+        retorno = RetornoFake(ret_dist_dfe_int(POR_PAGINA, nsu_inicial=inicio))
+        yield analisar_retorno_raw(
+            "nfeDistDFeInteresse", None, None, retorno, retDistDFeInt
+        ).resposta
+
+
+def anterior(quantidade):
+    xmls = []
+    for resposta in paginas(quantidade):
+        for doc_zip in resposta.loteDistDFeInt.docZip:
+            xmls.append(
+                gzip.decompress(base64.b64decode(doc_zip.valueOf_)).decode("utf-8")
+            )
+    documentos = [etree.fromstring(xml.encode("utf-8")) for xml in xmls]
+    return sum(1 for documento in documentos if documento.findtext("{*}chNFe"))
+
+
+def streaming(quantidade):
+    total = 0
+    for resposta in paginas(quantidade):
+        for documento in documentos_distribuicao(resposta, liberar=True):
+            if documento.etree().findtext("{*}chNFe"):
+                total += 1
+    return total
+
+
+def executar(abordagem, quantidade):
+    inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    total = globals()[abordagem](quantidade)
+    tempo = time.perf_counter() - inicio
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    assert total == quantidade
+    print(
+        f"{abordagem:<10} pico RSS {pico / 1024:7.1f} MiB"
+        f" (+{(pico - inicial) / 1024:6.1f} MiB) {tempo:6.2f}s"
+    )
+
+
+def main(quantidade=5000):
+    for abordagem in ("anterior", "streaming"):
+        subprocess.run(
+            [sys.executable, "-m", __spec__.name, abordagem, str(quantidade)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ("anterior", "streaming"):
+        executar(sys.argv[1], int(sys.argv[2]))
+    else:
+        main(*map(int, sys.argv[1:]))
@@ -0,0 +1,313 @@
+"""Benchmark do fluxo de emissão contra o servidor stub local, com um perfil
+de carga configurável (documentos, concorrência, latência e tMed da SEFAZ
+simulada, itens por documento).
+
+Cenários:
+
+- nfe: NFe.processar_documento (nfeAutorizacaoLote + nfeRetAutorizacaoLote);
+- nfce: NFCe.envia_documento, autorização síncrona;
+- consulta: NFe.consulta_documento (nfeConsultaNF) das NF-e autorizadas;
+- evento: NFe.enviar_lote_evento com um cancelamento (nfeRecepcaoEvento);
+- mde: MDe.ciencia_da_operacao (nfeRecepcaoEventoNF);
+- distribuicao: NFe.consultar_distribuicao, páginas de 50 documentos
+  (nfeDistDFeInteresse).
+
+O MDFe.processar_documento depende dos bindings nfelib.mdfe, não
+disponíveis na versão do nfelib utilizada pelos testes, e não tem cenário.
+
+Para cada cenário são informados os documentos por segundo, os percentis
+50/95/99 do tempo de cada documento e de cada fase da instrumentação
+(serialização, assinatura, transmissão, análise da resposta) e o pico de
+memória (RSS). Cada cenário é executado em um processo próprio.
+
+O resultado é gravado em ``<diretorio>/<data>-<commit>.json``; com
+``--comparar`` cada valor é comparado ao de um resultado anterior.
+
+Uso::
+
+    python -m tests.benchmarks.bench_emissao [--documentos 200]
+        [--concorrencia 4] [--latencia 0.02] [--t-med 0] [--itens 20]
+        [--cenarios nfe,nfce,...] [--diretorio .benchmarks/emissao]
+        [--comparar resultado.json]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from erpbrasil.edoc.instrumentacao import Instrumentacao, SpanTempo
+from erpbrasil.edoc.mde import MDe, TransmissaoMDE
+from erpbrasil.edoc.nfce import NFCe
+from erpbrasil.edoc.nfe import NFe
+from erpbrasil.edoc.pool import PoolClientes
+from erpbrasil.transmissao import TransmissaoSOAP
+
+from ..sefaz_stub import (
+    SERVICOS_STUB,
+    DistribuicaoSimulada,
+    SefazSimulada,
+    ServidorSefazStub,
+    monta_nfe,
+)
+from ..test_certificate_mixin import TestCertificateMixin
+
+CENARIOS = ("nfe", "nfce", "consulta", "evento", "mde", "distribuicao")
+
+POR_PAGINA = 50
+
+
+class ColetorAmostras(Instrumentacao):
+    """Mantém todas as durações de cada fase e operação, para o cálculo dos
+    percentis exatos."""
+
+    def __init__(self):
+        self.amostras = {}
+
+    def span(self, fase, **atributos):
+        return SpanTempo(self, fase, atributos)
+
+    def registrar(self, fase, duracao, atributos):
+        chave = f"{fase}:{atributos.get('operacao') or '-'}"
+        self.amostras.setdefault(chave, []).append(duracao)
+
+
+def percentis(amostras):
+    """Tempo médio e percentis 50, 95 e 99, em milissegundos"""
+    if len(amostras) < 2:
+        amostras = list(amostras) * 2
+    quantis = statistics.quantiles(amostras, n=100, method="inclusive")
+    return {
+        "quantidade": len(amostras),
+        "media": statistics.fmean(amostras) * 1000,
+        "p50": quantis[49] * 1000,
+        "p95": quantis[94] * 1000,
+        "p99": quantis[98] * 1000,
+    }
+
+
+def executar(cenario, perfil):
+    """Executa o cenário no processo atual e retorna o resultado"""
+    certificado = TestCertificateMixin()._load_certificate()
+    sefaz = SefazSimulada(t_med=perfil["t_med"])
+    distribuicao = DistribuicaoSimulada(perfil["documentos"], por_pagina=POR_PAGINA)
+    servicos = dict(distribuicao.servicos(), **sefaz.servicos())
+    pool = PoolClientes()
+    coletor = ColetorAmostras()
+    quantidade = perfil["documentos"]
+
+    with ServidorSefazStub(
+        certificado, servicos=servicos, latencia=perfil["latencia"]
+    ) as stub, mock.patch(
+        "erpbrasil.edoc.nfe.localizar_url",
+        side_effect=lambda servico, *args: stub.url(SERVICOS_STUB[servico]),
+    ), mock.patch(
+        "erpbrasil.edoc.mde.localizar_url",
+        side_effect=lambda servico, *args: stub.url(SERVICOS_STUB[servico]),
+    ):
+        if cenario == "mde":
+            documento = MDe(TransmissaoMDE(certificado), "35", ambiente="2")
+        elif cenario == "nfce":
+            documento = NFCe(TransmissaoSOAP(certificado), "35", ambiente="2")
+        else:
+            versao = "1.01" if cenario == "distribuicao" else "4.00"
+            documento = NFe(
+                TransmissaoSOAP(certificado), "35", versao=versao, ambiente="2"
+            )
+        documento._pool_clientes = pool
+        documento._instrumentacao = coletor
+
+        if cenario == "nfe":
+            trabalhos = [
+                monta_nfe(n, "55", perfil["itens"])[1] for n in range(1, quantidade + 1)
+            ]
+
+            def operacao(edoc):
+                processos = list(documento.processar_documento(edoc))
+                assert processos[-1].resposta.cStat == "104"
+
+        elif cenario == "nfce":
+            trabalhos = [
+                monta_nfe(n, "65", perfil["itens"])[1] for n in range(1, quantidade + 1)
+            ]
+
+            def operacao(edoc):
+                assert documento.envia_documento(edoc).resposta.cStat == "104"
+
+        elif cenario == "consulta":
+            trabalhos = [monta_nfe(n, "55", 1)[0] for n in range(1, quantidade + 1)]
+            sefaz._protocolos(trabalhos)
+
+            def operacao(chave):
+                assert documento.consulta_documento(chave).resposta.cStat == "100"
+
+        elif cenario == "evento":
+            trabalhos = [monta_nfe(n, "55", 1)[0] for n in range(1, quantidade + 1)]
+
+            def operacao(chave):
+                evento = documento.cancela_documento(
+                    chave, "135000000000001", "Cancelamento de teste"
+                )
+                proc = documento.enviar_lote_evento([evento])
+                assert proc.resposta.retEvento[0].infEvento.cStat == "135"
+
+        elif cenario == "mde":
+            trabalhos = [monta_nfe(n, "55", 1)[0] for n in range(1, quantidade + 1)]
+
+            def operacao(chave):
+                proc = documento.ciencia_da_operacao(chave, "00000000000191")
+                assert proc.resposta.cStat == "128"
+
+        elif cenario == "distribuicao":
+            trabalhos = ["%015d" % nsu for nsu in range(0, quantidade, POR_PAGINA)]
+
+            def operacao(ult_nsu):
+                proc = documento.consultar_distribuicao("00000000000191", ult_nsu)
+                assert proc.resposta.cStat == "138"
+                return len(proc.resposta.loteDistDFeInt.docZip)
+
+        # Aquece o pool (download dos WSDL) e o cache do status do serviço
+        operacao(trabalhos[0])
+        coletor.amostras.clear()
+
+        tempos = []
+
+        def medir(trabalho):
+            inicio = time.perf_counter()
+            # Quantidade de documentos do trabalho (páginas da distribuição)
+            documentos = operacao(trabalho) or 1
+            tempos.append(time.perf_counter() - inicio)
+            return documentos
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(perfil["concorrencia"]) as executor:
+            documentos = sum(executor.map(medir, trabalhos))
+        duracao = time.perf_counter() - inicio
+    pool.limpar()
+
+    return {
+        "documentos": documentos,
+        "duracao": duracao,
+        "documentos_segundo": documentos / duracao,
+        "documento": percentis(tempos),
+        "fases": {
+            chave: percentis(amostras)
+            for chave, amostras in sorted(coletor.amostras.items())
+        },
+        "memoria_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def variacao(atual, anterior):
+    if not anterior:
+        return ""
+    return f" ({(atual - anterior) / anterior:+6.1%})"
+
+
+def imprimir(resultados, anteriores=None):
+    anteriores = anteriores or {}
+    for cenario, resultado in resultados.items():
+        anterior = anteriores.get(cenario, {})
+        documento = resultado["documento"]
+        print(
+            f"{cenario:<13} {resultado['documentos_segundo']:8.1f} docs/s"
+            + variacao(
+                resultado["documentos_segundo"], anterior.get("documentos_segundo")
+            )
+            + f"  p50 {documento['p50']:7.1f} ms  p95 {documento['p95']:7.1f} ms"
+            f"  p99 {documento['p99']:7.1f} ms"
+            + variacao(documento["p99"], anterior.get("documento", {}).get("p99"))
+            + f"  memória {resultado['memoria_mb']:6.1f} MB"
+            + variacao(resultado["memoria_mb"], anterior.get("memoria_mb"))
+        )
+        for fase, tempos in resultado["fases"].items():
+            anterior_fase = anterior.get("fases", {}).get(fase, {})
+            print(
+                f"    {fase:<40} p50 {tempos['p50']:7.2f} ms"
+                f"  p95 {tempos['p95']:7.2f} ms  p99 {tempos['p99']:7.2f} ms"
+                + variacao(tempos["p50"], anterior_fase.get("p50"))
+            )
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documentos", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--latencia", type=float, default=0.02)
+    parser.add_argument("--t-med", type=int, default=0)
+    parser.add_argument("--itens", type=int, default=20)
+    parser.add_argument("--cenarios", default=",".join(CENARIOS))
+    parser.add_argument("--diretorio", default=os.path.join(".benchmarks", "emissao"))
+    parser.add_argument("--comparar")
+    # Uso interno: executa um único cenário e imprime o resultado em JSON
+    parser.add_argument("--executar", help=argparse.SUPPRESS)
+    argumentos = parser.parse_args(argumentos)
+    perfil = {
+        "documentos": argumentos.documentos,
+        "concorrencia": argumentos.concorrencia,
+        "latencia": argumentos.latencia,
+        "t_med": argumentos.t_med,
+        "itens": argumentos.itens,
+    }
+
+    if argumentos.executar:
+        print(json.dumps(executar(argumentos.executar, perfil)))
+        return
+
+    resultados = {}
+    for cenario in argumentos.cenarios.split(","):
+        saida = subprocess.run(
+            [sys.executable, "-m", __spec__.name, "--executar", cenario]
+            + [f"--{nome.replace('_', '-')}={valor}" for nome, valor in perfil.items()],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        resultados[cenario] = json.loads(saida.splitlines()[-1])
+
+    anteriores = None
+    if argumentos.comparar:
+        with open(argumentos.comparar) as arquivo:
+            anteriores = json.load(arquivo)["resultados"]
+    imprimir(resultados, anteriores)
+
+    commit = commit_atual()
+    os.makedirs(argumentos.diretorio, exist_ok=True)
+    data = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    caminho = os.path.join(argumentos.diretorio, f"{data}-{commit or 'local'}.json")
+    with open(caminho, "w") as arquivo:
+        json.dump(
+            {
+                "commit": commit,
+                "data": data,
+                "python": sys.version.split()[0],
+                "perfil": perfil,
+                "resultados": resultados,
+            },
+            arquivo,
+            indent=2,
+        )
+    print(f"Resultado gravado em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
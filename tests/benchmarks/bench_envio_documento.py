@@ -0,0 +1,105 @@
+"""Benchmark da preparação local do envio de uma NF-e: assinatura, montagem
+do enviNFe e serialização na transmissão (simulada, sem rede), medindo por
+NF-e o tempo, o pico de memória alocada (tracemalloc) e a quantidade de
+serializações (etree.tostring, exceto a canonicalização da assinatura) e
+leituras (etree.fromstring) do XML.
+
+Uso::
+
+    python -m tests.benchmarks.bench_envio_documento [quantidade] [itens]
+"""
+
+import contextlib
+import sys
+import time
+import tracemalloc
+from unittest import mock
+
+from erpbrasil.edoc.nfe import NFe
+from lxml import etree
+
+from ..sefaz_stub import monta_nfe
+from ..test_certificate_mixin import TestCertificateMixin
+from .fixtures import NFE_NS, RetornoFake, envelope_soap
+
+RET_ENVI_NFE = envelope_soap(
+    f'<retEnviNFe versao="4.00" xmlns="{NFE_NS}">'
+    "<tpAmb>2</tpAmb><verAplic>STUB</verAplic><cStat>103</cStat>"
+    "<xMotivo>Lote recebido com sucesso</xMotivo><cUF>35</cUF>"
+    "<dhRecbto>2020-11-20T08:14:32-03:00</dhRecbto>"
+    "<infRec><nRec>351000000000001</nRec><tMed>1</tMed></infRec>"
+    "</retEnviNFe>",
+    "NFeAutorizacao4",
+)
+
+
+class TransmissaoFake:
+    """Serializa a mensagem uma única vez, como o zeep na transmissão"""
+
+    def __init__(self, certificado):
+        self.certificado = certificado
+        self.retorno = RetornoFake(RET_ENVI_NFE)
+
+    def cliente(self, url):
+        return contextlib.nullcontext()
+
+    def enviar(self, operacao, mensagem):
+        etree.tostring(mensagem)
+        return self.retorno
+
+
+class Contador:
+    def __init__(self):
+        self.serializacoes = 0
+        self.leituras = 0
+        self._tostring = etree.tostring
+        self._fromstring = etree.fromstring
+
+    def tostring(self, *args, **kwargs):
+        if kwargs.get("method") != "c14n":
+            self.serializacoes += 1
+        return self._tostring(*args, **kwargs)
+
+    def fromstring(self, *args, **kwargs):
+        self.leituras += 1
+        return self._fromstring(*args, **kwargs)
+
+
+def main(quantidade=200, itens=50):
+    certificado = TestCertificateMixin()._load_certificate()
+    nfe = NFe(TransmissaoFake(certificado), "35", ambiente="2")
+    nfe._pool_clientes = None
+    nfe._monitor_saude = None
+    edocs = [monta_nfe(n, "55", itens)[1] for n in range(1, quantidade + 1)]
+    # Aquece o serviço de assinatura
+    nfe.envia_documento(monta_nfe(0, "55", itens)[1])
+
+    inicio = time.perf_counter()
+    for edoc in edocs:
+        assert nfe.envia_documento(edoc).resposta.cStat == "103"
+    tempo = (time.perf_counter() - inicio) / quantidade
+
+    contador = Contador()
+    with mock.patch.object(etree, "tostring", contador.tostring), mock.patch.object(
+        etree, "fromstring", contador.fromstring
+    ):
+        nfe.envia_documento(edocs[0])
+
+    picos = []
+    tracemalloc.start()
+    for edoc in edocs[:20]:
+        tracemalloc.reset_peak()
+        atual = tracemalloc.get_traced_memory()[0]
+        nfe.envia_documento(edoc)
+        picos.append(tracemalloc.get_traced_memory()[1] - atual)
+    tracemalloc.stop()
+
+    print(
+        f"{itens} itens: {tempo * 1000:7.2f} ms/NF-e"
+        f"  pico {sum(picos) / len(picos) / 1024:7.1f} KiB/NF-e"
+        f"  serializações {contador.serializacoes}  leituras {contador.leituras}"
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,81 @@
+"""Benchmark do custo da instrumentação no _post: consultas de status do
+serviço com uma transmissão simulada (sem rede), para que o tempo medido
+seja apenas o do processamento local (serialização e análise da resposta).
+
+- nula: instrumentação padrão, sem registro;
+- histograma: ColetorHistograma em memória.
+
+O custo de cada span é medido isoladamente e comparado ao tempo do _post,
+que abre SPANS_POR_POST spans (post, serializacao, transmissao e analise).
+
+Uso::
+
+    python -m tests.benchmarks.bench_instrumentacao [quantidade]
+"""
+
+import contextlib
+import sys
+import timeit
+
+from erpbrasil.edoc.instrumentacao import (
+    FASE_POST,
+    INSTRUMENTACAO,
+    ColetorHistograma,
+)
+from erpbrasil.edoc.nfe import NFe
+
+from ..sefaz_stub import ret_cons_stat_serv
+from .fixtures import RetornoFake, envelope_soap
+
+SPANS_POR_POST = 4
+
+
+class TransmissaoFake:
+    """Responde a todas as operações com o retConsStatServ, sem rede."""
+
+    certificado = None
+
+    def __init__(self):
+        self.retorno = RetornoFake(
+            envelope_soap(ret_cons_stat_serv(None), "NFeStatusServico4")
+        )
+
+    def cliente(self, url):
+        return contextlib.nullcontext()
+
+    def enviar(self, operacao, mensagem):
+        return self.retorno
+
+
+def custo_span(instrumentacao, repeticoes):
+    def abrir_span():
+        with instrumentacao.span(FASE_POST, uf="35", operacao="op", url="url") as s:
+            s.definir(c_stat="107")
+
+    return min(timeit.repeat(abrir_span, number=repeticoes, repeat=5)) / repeticoes
+
+
+def main(quantidade=2000):
+    for nome, instrumentacao in (
+        ("nula", INSTRUMENTACAO),
+        ("histograma", ColetorHistograma()),
+    ):
+        nfe = NFe(TransmissaoFake(), "35", ambiente="2")
+        nfe._pool_clientes = None
+        nfe._monitor_saude = None
+        nfe._instrumentacao = instrumentacao
+        assert nfe.status_servico().resposta.cStat == "107"
+        post = (
+            min(timeit.repeat(nfe.status_servico, number=quantidade, repeat=5))
+            / quantidade
+        )
+        span = custo_span(instrumentacao, quantidade * 10)
+        print(
+            f"{nome:<12} _post {post * 1e6:8.1f} us"
+            f"  span {span * 1e9:7.0f} ns"
+            f"  custo {SPANS_POR_POST * span / post:6.2%} do _post"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
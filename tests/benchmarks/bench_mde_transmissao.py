@@ -0,0 +1,64 @@
+"""Benchmark da preparação do envio da MDe: sigla da UF do cUFAutor
+(MDe._post) e montagem do nfeCabecMsg (TransmissaoMDE._argumentos),
+comparadas à busca linear em SIGLA_ESTADO e ao cabeçalho interpretado a cada
+envio.
+
+Uso::
+
+    python -m tests.benchmarks.bench_mde_transmissao
+"""
+
+import timeit
+
+from erpbrasil.edoc.mde import NAMESPACE_WSDL, SIGLA_ESTADO, TransmissaoMDE
+from lxml import etree
+
+DIST_DFE_INT = etree.fromstring(
+    '<distDFeInt xmlns="http://www.portalfiscal.inf.br/nfe" versao="1.01">'
+    "<tpAmb>1</tpAmb><cUFAutor>35</cUFAutor></distDFeInt>"
+)
+
+
+def uf_busca_linear(c_uf_autor):
+    uf_list = [uf for nUF, uf in SIGLA_ESTADO.items() if nUF == str(c_uf_autor)]
+    return uf_list[0] if uf_list else None
+
+
+def uf_indice(c_uf_autor):
+    return SIGLA_ESTADO.get(str(c_uf_autor))
+
+
+def cabecalho_interpretado(mensagem, uf):
+    header_str = (
+        '<nfeCabecMsg xmlns="{}">'
+        "<cUF>{}</cUF>"
+        "<versaoDados>{}</versaoDados>"
+        "</nfeCabecMsg>".format(NAMESPACE_WSDL, uf, "1.00")
+    )
+    return {"nfeDadosMsg": mensagem, "_soapheaders": [etree.fromstring(header_str)]}
+
+
+def medir(nome, funcao, repeticoes):
+    tempo = min(timeit.repeat(funcao, number=repeticoes, repeat=5))
+    print(f"{nome:<36} {tempo / repeticoes * 1e6:8.2f} us")
+
+
+def main(repeticoes=100000):
+    transmissao = TransmissaoMDE.__new__(TransmissaoMDE)
+    # 91 (AN) é a última UF da tabela: pior caso da busca linear
+    medir("UF: busca linear", lambda: uf_busca_linear(91), repeticoes)
+    medir("UF: SIGLA_ESTADO.get", lambda: uf_indice(91), repeticoes)
+    medir(
+        "nfeCabecMsg: interpretado por envio",
+        lambda: cabecalho_interpretado(DIST_DFE_INT, "SP"),
+        repeticoes,
+    )
+    medir(
+        "nfeCabecMsg: _argumentos",
+        lambda: transmissao._argumentos(DIST_DFE_INT, "nfeDistDFeInteresse", uf="SP"),
+        repeticoes,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark do pool de clientes SOAP: 1000 consultas de status do serviço
+contra o servidor stub local, com e sem o pool.
+
+Uso::
+
+    python -m tests.benchmarks.bench_pool [quantidade]
+"""
+
+import sys
+import time
+from unittest import mock
+
+from erpbrasil.edoc.nfe import NFe
+from erpbrasil.edoc.pool import PoolClientes
+from erpbrasil.transmissao import TransmissaoSOAP
+
+from ..sefaz_stub import ServidorSefazStub
+from ..test_certificate_mixin import TestCertificateMixin
+
+
+def executar(nfe, quantidade):
+    inicio = time.perf_counter()
+    for _ in range(quantidade):
+        assert nfe.status_servico().resposta.cStat == "107"
+    return time.perf_counter() - inicio
+
+
+def main(quantidade=1000):
+    certificado = TestCertificateMixin()._load_certificate()
+    with ServidorSefazStub(certificado) as stub, mock.patch(
+        "erpbrasil.edoc.nfe.localizar_url",
+        return_value=stub.url("NFeStatusServico4"),
+    ):
+        for nome, pool in (("sem pool", None), ("com pool", PoolClientes())):
+            nfe = NFe(TransmissaoSOAP(certificado), "35", ambiente="2")
+            nfe._pool_clientes = pool
+            stub.contadores.clear()
+            tempo = executar(nfe, quantidade)
+            print(
+                f"{nome:<10} {quantidade} chamadas em {tempo:7.2f}s"
+                f" ({quantidade / tempo:7.1f} chamadas/s,"
+                f" {stub.contadores['wsdl']} downloads do WSDL)"
+            )
+            if pool is not None:
+                pool.limpar()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,81 @@
+"""Benchmark da geração de QR Codes de NFC-e: NFCe.monta_qrcode e
+_generate_qrcode_contingency, um documento por vez, comparados à geração em
+lote do QRCodeNFCe, com e sem a gravação em CSV.
+
+Uso::
+
+    python -m tests.benchmarks.bench_qrcode [quantidade]
+"""
+
+import io
+import sys
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from erpbrasil.edoc.nfce import NFCe
+from erpbrasil.edoc.qrcode_lote import QRCodeNFCe, gravar_csv
+
+DIGEST_VALUE = "K5XNc/Yvko52bOUfIRPzlx55rI4="
+DATA_EMISSAO = "2020-11-20T08:14:32-03:00"
+TOTAL = "10.00"
+
+
+def medir(nome, quantidade, executar):
+    inicio = time.perf_counter()
+    executar()
+    tempo = time.perf_counter() - inicio
+    print(f"{nome:<28} {tempo:6.2f}s ({quantidade / tempo:10.0f} QR Codes/s)")
+
+
+def main(quantidade=200000):
+    nfce = NFCe(mock.Mock(), "35", ambiente="2", csc_token="000001", csc_code="CSC")
+    gerador = QRCodeNFCe("35", "2", "000001", "CSC")
+    chaves = [
+        "35201100000000000191650010%08d9%08d0" % (numero, numero)
+        for numero in range(quantidade)
+    ]
+    edocs = [
+        SimpleNamespace(
+            infNFe=SimpleNamespace(
+                Id="NFe" + chave,
+                ide=SimpleNamespace(dhEmi=DATA_EMISSAO),
+                total=SimpleNamespace(ICMSTot=SimpleNamespace(vNF=TOTAL)),
+            )
+        )
+        for chave in chaves
+    ]
+    medir(
+        "monta_qrcode",
+        quantidade,
+        lambda: [nfce.monta_qrcode(chave) for chave in chaves],
+    )
+    medir("QRCodeNFCe.qrcodes", quantidade, lambda: list(gerador.qrcodes(chaves)))
+    medir(
+        "_generate_qrcode_contingency",
+        quantidade,
+        lambda: [
+            nfce._generate_qrcode_contingency(edoc, DIGEST_VALUE) for edoc in edocs
+        ],
+    )
+    medir(
+        "qrcodes_contingencia",
+        quantidade,
+        lambda: list(
+            gerador.qrcodes_contingencia(
+                chaves,
+                [DATA_EMISSAO] * quantidade,
+                [TOTAL] * quantidade,
+                [DIGEST_VALUE] * quantidade,
+            )
+        ),
+    )
+    medir(
+        "qrcodes + gravar_csv",
+        quantidade,
+        lambda: gravar_csv(io.StringIO(), chaves, gerador.qrcodes(chaves)),
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
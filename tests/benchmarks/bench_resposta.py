@@ -0,0 +1,40 @@
+"""Benchmark da interpretação das respostas SOAP (analisar_retorno_raw).
+
+Uso::
+
+    python -m tests.benchmarks.bench_resposta
+"""
+
+import timeit
+
+from erpbrasil.edoc.resposta import analisar_retorno_raw
+from nfelib.v4_00 import retConsReciNFe, retDistDFeInt
+
+from .fixtures import RetornoFake, ret_cons_reci_nfe, ret_dist_dfe_int
+
+CENARIOS = [
+    ("retDistDFeInt (50 docZip)", ret_dist_dfe_int(50), retDistDFeInt),
+    ("retConsReciNFe (50 protNFe)", ret_cons_reci_nfe(50), retConsReciNFe),
+]
+
+
+def main(repeticoes=200):
+    for nome, texto, classe in CENARIOS:
+        retorno = RetornoFake(texto)
+        tempo = min(
+            timeit.repeat(
+                lambda retorno=retorno, classe=classe: analisar_retorno_raw(
+                    "operacao", None, "", retorno, classe
+                ),
+                number=repeticoes,
+                repeat=5,
+            )
+        )
+        print(
+            f"{nome:<32} {len(texto) / 1024:8.1f} KiB"
+            f" {tempo / repeticoes * 1e6:10.1f} us/resposta"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Geração de respostas SOAP sintéticas para os benchmarks."""
+
+import base64
+import gzip
+
+NFE_NS = "http://www.portalfiscal.inf.br/nfe"
+SOAP_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+
+CHAVE = "35200309091076000144550010001807401003642343"
+
+
+class RetornoFake:
+    """Imita o objeto ``requests.Response`` retornado pelo zeep."""
+
+    status_code = 200
+
+    def __init__(self, text):
+        self.text = text
+        self.content = text.encode("utf-8")
+
+    def raise_for_status(self):
+        pass
+
+
+def envelope_soap(corpo, wsdl):
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<soap:Envelope xmlns:soap="{SOAP_NS}">'
+        "<soap:Body>"
+        f'<nfeResultMsg xmlns="http://www.portalfiscal.inf.br/nfe/wsdl/{wsdl}">'
+        f"{corpo}"
+        "</nfeResultMsg>"
+        "</soap:Body></soap:Envelope>"
+    )
+
+
+def res_nfe(nsu):
+    return (
+        f'<resNFe xmlns="{NFE_NS}" versao="1.01">'
+        f"<chNFe>{CHAVE}</chNFe><CNPJ>09091076000144</CNPJ>"
+        f"<xNome>EMPRESA {nsu}</xNome><IE>123456789</IE>"
+        "<dhEmi>2020-03-01T10:00:00-03:00</dhEmi><tpNF>1</tpNF>"
+        "<vNF>100.00</vNF><digVal>abcd1234abcd1234abcd1234abcd=</digVal>"
+        "<dhRecbto>2020-03-01T10:00:01-03:00</dhRecbto>"
+        f"<nProt>1352000{nsu:08d}</nProt><cSitNFe>1</cSitNFe>"
+        "</resNFe>"
+    )
+
+
+def doc_zip(xml):
+    return base64.b64encode(gzip.compress(xml.encode("utf-8"))).decode("ascii")
+
+
+def ret_dist_dfe_int(quantidade=50, nsu_inicial=1):
+    documentos = "".join(
+        f'<docZip NSU="{nsu:015d}" schema="resNFe_v1.01.xsd">'
+        f"{doc_zip(res_nfe(nsu))}</docZip>"
+        for nsu in range(nsu_inicial, nsu_inicial + quantidade)
+    )
+    ultimo = nsu_inicial + quantidade - 1
+    corpo = (
+        f'<retDistDFeInt xmlns="{NFE_NS}" versao="1.01">'
+        "<tpAmb>1</tpAmb><verAplic>1.2.1</verAplic><cStat>138</cStat>"
+        "<xMotivo>Documento localizado</xMotivo>"
+        "<dhResp>2020-11-20T07:55:35-03:00</dhResp>"
+        f"<ultNSU>{ultimo:015d}</ultNSU><maxNSU>{ultimo:015d}</maxNSU>"
+        f"<loteDistDFeInt>{documentos}</loteDistDFeInt>"
+        "</retDistDFeInt>"
+    )
+    return envelope_soap(corpo, "NFeDistribuicaoDFe")
+
+
+def prot_nfe(indice):
+    return (
+        f'<protNFe versao="4.00"><infProt Id="ID1352000{indice:08d}">'
+        f"<tpAmb>1</tpAmb><verAplic>SP_NFE_PL009_V4</verAplic>"
+        f"<chNFe>{CHAVE}</chNFe><dhRecbto>2020-11-20T08:14:32-03:00</dhRecbto>"
+        f"<nProt>1352000{indice:08d}</nProt>"
+        "<digVal>abcd1234abcd1234abcd1234abcd=</digVal>"
+        "<cStat>100</cStat><xMotivo>Autorizado o uso da NF-e</xMotivo>"
+        "</infProt></protNFe>"
+    )
+
+
+def ret_cons_reci_nfe(quantidade=50):
+    protocolos = "".join(prot_nfe(indice) for indice in range(quantidade))
+    corpo = (
+        f'<retConsReciNFe xmlns="{NFE_NS}" versao="4.00">'
+        "<tpAmb>1</tpAmb><verAplic>SP_NFE_PL009_V4</verAplic>"
+        "<nRec>351000000000001</nRec><cStat>104</cStat>"
+        "<xMotivo>Lote processado</xMotivo><cUF>35</cUF>"
+        "<dhRecbto>2020-11-20T08:14:32-03:00</dhRecbto>"
+        f"{protocolos}"
+        "</retConsReciNFe>"
+    )
+    return envelope_soap(corpo, "NFeRetAutorizacao4")
@@ -0,0 +1,608 @@
+"""Servidor HTTPS local que imita os webservices SOAP da SEFAZ.
+
+Utilizado pelos testes e benchmarks que precisam de um servidor real, sem
+acessar a rede nem consumir a cota de requisições da SEFAZ.
+"""
+
+import base64
+import collections
+import gzip
+import os
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from erpbrasil.assinatura.certificado import ArquivoCertificado
+from erpbrasil.edoc import nfe as nfe_module
+from erpbrasil.edoc.nfe import NFe
+from erpbrasil.edoc.pool import PoolClientes
+from erpbrasil.transmissao import TransmissaoSOAP
+from lxml import etree
+from nfelib.v4_00 import retEnviNFe
+
+from .test_certificate_mixin import TestCertificateMixin
+
+NFE_NS = "http://www.portalfiscal.inf.br/nfe"
+WSDL_NS = "http://www.portalfiscal.inf.br/nfe/wsdl/"
+SOAP12_NS = "http://www.w3.org/2003/05/soap-envelope"
+
+# Com ``parte``, a mensagem de cada operação é enviada no elemento ``parte``
+# de um elemento com o nome da operação, como no WSDL da distribuição de DF-e
+ServicoStub = collections.namedtuple(
+    "ServicoStub", ["nome", "operacoes", "parte"], defaults=(None,)
+)
+
+WSDL = """<?xml version="1.0" encoding="utf-8"?>
+<wsdl:definitions xmlns:wsdl="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap12="http://schemas.xmlsoap.org/wsdl/soap12/"
+    xmlns:s="http://www.w3.org/2001/XMLSchema"
+    xmlns:tns="{namespace}" targetNamespace="{namespace}">
+  <wsdl:types>
+    <s:schema elementFormDefault="qualified" targetNamespace="{namespace}">
+      <s:element name="nfeDadosMsg">
+        <s:complexType mixed="true">
+          <s:sequence><s:any/></s:sequence>
+        </s:complexType>
+      </s:element>
+      <s:element name="nfeResultMsg">
+        <s:complexType mixed="true">
+          <s:sequence><s:any/></s:sequence>
+        </s:complexType>
+      </s:element>{elementos}
+    </s:schema>
+  </wsdl:types>
+  {mensagens}
+  <wsdl:portType name="{nome}Soap12">{port_type}</wsdl:portType>
+  <wsdl:binding name="{nome}Soap12" type="tns:{nome}Soap12">
+    <soap12:binding transport="http://schemas.xmlsoap.org/soap/http"/>
+    {binding}
+  </wsdl:binding>
+  <wsdl:service name="{nome}">
+    <wsdl:port name="{nome}Soap12" binding="tns:{nome}Soap12">
+      <soap12:address location="{location}"/>
+    </wsdl:port>
+  </wsdl:service>
+</wsdl:definitions>
+"""
+
+MENSAGENS = """
+  <wsdl:message name="{operacao}In">
+    <wsdl:part name="{parte}" element="tns:{elemento}"/>
+  </wsdl:message>
+  <wsdl:message name="{operacao}Out">
+    <wsdl:part name="{operacao}Result" element="tns:nfeResultMsg"/>
+  </wsdl:message>
+"""
+
+ELEMENTO_OPERACAO = """
+      <s:element name="{operacao}">
+        <s:complexType>
+          <s:sequence>
+            <s:element minOccurs="0" name="{parte}">
+              <s:complexType mixed="true">
+                <s:sequence><s:any/></s:sequence>
+              </s:complexType>
+            </s:element>
+          </s:sequence>
+        </s:complexType>
+      </s:element>"""
+
+PORT_TYPE = """
+    <wsdl:operation name="{operacao}">
+      <wsdl:input message="tns:{operacao}In"/>
+      <wsdl:output message="tns:{operacao}Out"/>
+    </wsdl:operation>
+"""
+
+BINDING = """
+    <wsdl:operation name="{operacao}">
+      <soap12:operation soapAction="{namespace}/{operacao}" style="document"/>
+      <wsdl:input><soap12:body use="literal"/></wsdl:input>
+      <wsdl:output><soap12:body use="literal"/></wsdl:output>
+    </wsdl:operation>
+"""
+
+RESPOSTA = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    f'<soap:Envelope xmlns:soap="{SOAP12_NS}"><soap:Body>'
+    '<nfeResultMsg xmlns="{namespace}">{resultado}</nfeResultMsg>'
+    "</soap:Body></soap:Envelope>"
+)
+
+
+def ret_cons_stat_serv(dados):
+    return (
+        f'<retConsStatServ versao="4.00" xmlns="{NFE_NS}">'
+        "<tpAmb>2</tpAmb><verAplic>STUB</verAplic><cStat>107</cStat>"
+        "<xMotivo>Servico em Operacao</xMotivo><cUF>35</cUF>"
+        "<dhRecbto>2020-11-20T08:14:32-03:00</dhRecbto><tMed>1</tMed>"
+        "</retConsStatServ>"
+    )
+
+
+def prot_nfe(chave, protocolo, c_stat="100"):
+    return (
+        '<protNFe versao="4.00"><infProt>'
+        "<tpAmb>2</tpAmb><verAplic>STUB</verAplic>"
+        f"<chNFe>{chave}</chNFe><dhRecbto>2020-11-20T08:14:32-03:00</dhRecbto>"
+        f"<nProt>{protocolo}</nProt><digVal>abcd1234abcd1234abcd1234abcd=</digVal>"
+        f"<cStat>{c_stat}</cStat><xMotivo>Autorizado o uso da NF-e</xMotivo>"
+        "</infProt></protNFe>"
+    )
+
+
+class SefazSimulada:
+    """Estado dos serviços de autorização: lotes recebidos e seus protocolos.
+
+    :param t_med: tempo médio (tMed) informado no recibo
+    :param consultas_em_processamento: quantidade de consultas ao recibo que
+        retornam 105 (lote em processamento) antes do resultado
+    """
+
+    def __init__(self, t_med=0, consultas_em_processamento=0):
+        self.t_med = t_med
+        self.consultas_em_processamento = consultas_em_processamento
+        self.lotes = {}
+        self.autorizadas = {}
+        self._lock = threading.Lock()
+        self._protocolo = 135000000000000
+
+    def _protocolos(self, chaves):
+        with self._lock:
+            inicio = self._protocolo
+            self._protocolo += len(chaves)
+            for indice, chave in enumerate(chaves):
+                self.autorizadas[chave] = prot_nfe(chave, inicio + indice)
+        return "".join(self.autorizadas[chave] for chave in chaves)
+
+    def autorizacao(self, dados):
+        chaves = [inf.get("Id")[3:] for inf in dados.iter(f"{{{NFE_NS}}}infNFe")]
+        if dados.findtext(f"{{{NFE_NS}}}indSinc") == "1":
+            return (
+                f'<retEnviNFe versao="4.00" xmlns="{NFE_NS}">'
+                "<tpAmb>2</tpAmb><verAplic>STUB</verAplic><cStat>104</cStat>"
+                "<xMotivo>Lote processado</xMotivo><cUF>35</cUF>"
+                "<dhRecbto>2020-11-20T08:14:32-03:00</dhRecbto>"
+                f"{self._protocolos(chaves)}</retEnviNFe>"
+            )
+        with self._lock:
+            recibo = f"35{len(self.lotes) + 1:013d}"
+            self.lotes[recibo] = [chaves, self.consultas_em_processamento]
+        return (
+            f'<retEnviNFe versao="4.00" xmlns="{NFE_NS}">'
+            "<tpAmb>2</tpAmb><verAplic>STUB</verAplic><cStat>103</cStat>"
+            "<xMotivo>Lote recebido com sucesso</xMotivo><cUF>35</cUF>"
+            "<dhRecbto>2020-11-20T08:14:32-03:00</dhRecbto>"
+            f"<infRec><nRec>{recibo}</nRec><tMed>{self.t_med}</tMed></infRec>"
+            "</retEnviNFe>"
+        )
+
+    def ret_autorizacao(self, dados):
+        recibo = dados.findtext(f"{{{NFE_NS}}}nRec")
+        with self._lock:
+            lote = self.lotes.get(recibo)
+            em_processamento = lote is not None and lote[1] > 0
+            if em_processamento:
+                lote[1] -= 1
+        if lote is None or em_processamento:
+            c_stat, motivo, protocolos = (
+                ("105", "Lote em processamento", "")
+                if lote
+                else ("106", "Lote nao localizado", "")
+            )
+        else:
+            c_stat, motivo = "104", "Lote processado"
+            protocolos = self._protocolos(lote[0])
+        return (
+            f'<retConsReciNFe versao="4.00" xmlns="{NFE_NS}">'
+            "<tpAmb>2</tpAmb><verAplic>STUB</verAplic>"
+            f"<nRec>{recibo}</nRec><cStat>{c_stat}</cStat>"
+            f"<xMotivo>{motivo}</xMotivo><cUF>35</cUF>"
+            "<dhRecbto>2020-11-20T08:14:32-03:00</dhRecbto>"
+            f"{protocolos}</retConsReciNFe>"
+        )
+
+    def consulta(self, dados):
+        protocolo = self.autorizadas.get(dados.findtext(f"{{{NFE_NS}}}chNFe"))
+        c_stat, motivo = (
+            ("100", "Autorizado o uso da NF-e")
+            if protocolo
+            else ("217", "NF-e nao consta na base de dados da SEFAZ")
+        )
+        return (
+            f'<retConsSitNFe versao="4.00" xmlns="{NFE_NS}">'
+            "<tpAmb>2</tpAmb><verAplic>STUB</verAplic>"
+            f"<cStat>{c_stat}</cStat><xMotivo>{motivo}</xMotivo><cUF>35</cUF>"
+            f"<dhRecbto>2020-11-20T08:14:32-03:00</dhRecbto>"
+            f"<chNFe>{dados.findtext(f'{{{NFE_NS}}}chNFe')}</chNFe>"
+            f"{protocolo or ''}</retConsSitNFe>"
+        )
+
+    def evento(self, dados):
+        with self._lock:
+            inicio = self._protocolo
+            self._protocolo += len(dados)
+        ret_eventos = "".join(
+            '<retEvento versao="1.00"><infEvento>'
+            "<tpAmb>2</tpAmb><verAplic>STUB</verAplic>"
+            f"<cOrgao>{inf.findtext(f'{{{NFE_NS}}}cOrgao')}</cOrgao>"
+            "<cStat>135</cStat><xMotivo>Evento registrado e vinculado a NF-e</xMotivo>"
+            f"<chNFe>{inf.findtext(f'{{{NFE_NS}}}chNFe')}</chNFe>"
+            f"<tpEvento>{inf.findtext(f'{{{NFE_NS}}}tpEvento')}</tpEvento>"
+            f"<nSeqEvento>{inf.findtext(f'{{{NFE_NS}}}nSeqEvento')}</nSeqEvento>"
+            "<dhRegEvento>2020-11-20T08:14:32-03:00</dhRegEvento>"
+            f"<nProt>{inicio + indice}</nProt></infEvento></retEvento>"
+            for indice, inf in enumerate(dados.iter(f"{{{NFE_NS}}}infEvento"))
+        )
+        return (
+            f'<retEnvEvento versao="1.00" xmlns="{NFE_NS}">'
+            f"<idLote>{dados.findtext(f'{{{NFE_NS}}}idLote')}</idLote>"
+            "<tpAmb>2</tpAmb><verAplic>STUB</verAplic><cOrgao>35</cOrgao>"
+            "<cStat>128</cStat><xMotivo>Lote de Evento Processado</xMotivo>"
+            f"{ret_eventos}</retEnvEvento>"
+        )
+
+    def servicos(self):
+        return dict(
+            SERVICOS_PADRAO,
+            NFeRecepcaoEvento4=ServicoStub(
+                "NFeRecepcaoEvento4",
+                {"nfeRecepcaoEvento": self.evento, "nfeRecepcaoEventoNF": self.evento},
+            ),
+            NFeConsultaProtocolo4=ServicoStub(
+                "NFeConsultaProtocolo4", {"nfeConsultaNF": self.consulta}
+            ),
+            NFeAutorizacao4=ServicoStub(
+                "NFeAutorizacao4", {"nfeAutorizacaoLote": self.autorizacao}
+            ),
+            NFeRetAutorizacao4=ServicoStub(
+                "NFeRetAutorizacao4", {"nfeRetAutorizacaoLote": self.ret_autorizacao}
+            ),
+        )
+
+
+def res_nfe(nsu):
+    return (
+        f'<resNFe xmlns="{NFE_NS}" versao="1.01">'
+        f"<chNFe>3520030909107600014455001000{nsu:09d}10036423</chNFe>"
+        f"<CNPJ>09091076000144</CNPJ><xNome>EMPRESA {nsu}</xNome>"
+        "<IE>123456789</IE><dhEmi>2020-03-01T10:00:00-03:00</dhEmi><tpNF>1</tpNF>"
+        "<vNF>100.00</vNF><digVal>abcd1234abcd1234abcd1234abcd=</digVal>"
+        "<dhRecbto>2020-03-01T10:00:01-03:00</dhRecbto>"
+        f"<nProt>1352000{nsu:08d}</nProt><cSitNFe>1</cSitNFe>"
+        "</resNFe>"
+    )
+
+
+class DistribuicaoSimulada:
+    """Distribuição de DF-e com ``quantidade`` documentos resNFe, entregues
+    em páginas de até ``por_pagina`` documentos a partir do ultNSU enviado.
+
+    :param consumo_indevido: quantidade de consultas iniciais rejeitadas com
+        o cStat 656
+    :param parte: parte do elemento nfeDistDFeInteresse com a mensagem
+        (ServicoStub), como no WSDL da SEFAZ utilizado pelo MDe
+    """
+
+    def __init__(self, quantidade=0, por_pagina=50, consumo_indevido=0, parte=None):
+        self.documentos = [
+            (nsu, base64.b64encode(gzip.compress(res_nfe(nsu).encode())).decode())
+            for nsu in range(1, quantidade + 1)
+        ]
+        self.por_pagina = por_pagina
+        self.consumo_indevido = consumo_indevido
+        self.parte = parte
+        self.consultas = []
+
+    def dist_dfe_interesse(self, dados):
+        ult_nsu = int(dados.findtext(f".//{{{NFE_NS}}}ultNSU"))
+        self.consultas.append(ult_nsu)
+        max_nsu = len(self.documentos)
+        if self.consumo_indevido:
+            self.consumo_indevido -= 1
+            c_stat, motivo, documentos = "656", "Rejeicao: Consumo Indevido", []
+        else:
+            documentos = self.documentos[ult_nsu : ult_nsu + self.por_pagina]
+            c_stat, motivo = (
+                ("138", "Documento localizado")
+                if documentos
+                else ("137", "Nenhum documento localizado")
+            )
+        if documentos:
+            ult_nsu = documentos[-1][0]
+        lote = "".join(
+            f'<docZip NSU="{nsu:015d}" schema="resNFe_v1.01.xsd">{doc_zip}</docZip>'
+            for nsu, doc_zip in documentos
+        )
+        return (
+            f'<retDistDFeInt xmlns="{NFE_NS}" versao="1.01">'
+            f"<tpAmb>2</tpAmb><verAplic>STUB</verAplic><cStat>{c_stat}</cStat>"
+            f"<xMotivo>{motivo}</xMotivo><dhResp>2020-11-20T07:55:35-03:00</dhResp>"
+            f"<ultNSU>{ult_nsu:015d}</ultNSU><maxNSU>{max_nsu:015d}</maxNSU>"
+            + (f"<loteDistDFeInt>{lote}</loteDistDFeInt>" if lote else "")
+            + "</retDistDFeInt>"
+        )
+
+    def servicos(self):
+        return dict(
+            SERVICOS_PADRAO,
+            NFeDistribuicaoDFe=ServicoStub(
+                "NFeDistribuicaoDFe",
+                {"nfeDistDFeInteresse": self.dist_dfe_interesse},
+                self.parte,
+            ),
+        )
+
+
+SERVICOS_PADRAO = {
+    "NFeStatusServico4": ServicoStub(
+        "NFeStatusServico4", {"nfeStatusServicoNF": ret_cons_stat_serv}
+    ),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _servico(self):
+        caminho = self.path.split("?")[0].strip("/")
+        return self.server.stub.servicos.get(caminho.split("/")[0])
+
+    def _responder(self, status, corpo, content_type):
+        corpo = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        servico = self._servico()
+        if servico is None:
+            return self._responder(404, "", "text/plain")
+        self.server.stub.contadores["wsdl"] += 1
+        self._responder(200, self.server.stub.wsdl(servico), "text/xml; charset=utf-8")
+
+    def do_POST(self):
+        stub = self.server.stub
+        servico = self._servico()
+        corpo = self.rfile.read(int(self.headers["Content-Length"]))
+        if servico is None:
+            return self._responder(404, "", "text/plain")
+        if stub.indisponivel:
+            return self._responder(503, "", "text/plain")
+        acao = self.headers.get("Content-Type", "").split('action="')[-1]
+        operacao = acao.rstrip('"').split("/")[-1]
+        handler = servico.operacoes.get(operacao)
+        if handler is None:
+            return self._responder(500, "", "text/plain")
+        envelope = etree.fromstring(corpo)
+        dados = envelope.find(f"{{{SOAP12_NS}}}Body")[0][0]
+        if servico.parte:
+            dados = dados[0]
+        stub.contadores[operacao] += 1
+        latencia = stub.latencia
+        if isinstance(latencia, dict):
+            latencia = latencia.get(operacao, 0)
+        if latencia:
+            time.sleep(latencia)
+        resultado = handler(dados)
+        self._responder(
+            200,
+            RESPOSTA.format(namespace=WSDL_NS + servico.nome, resultado=resultado),
+            "application/soap+xml; charset=utf-8",
+        )
+
+
+class ServidorSefazStub:
+    """Servidor HTTPS em uma thread, utilizando o próprio certificado de teste.
+
+    Os serviços são indexados pelo primeiro segmento do caminho da URL e cada
+    operação é tratada por uma função que recebe o elemento enviado em
+    ``nfeDadosMsg`` e retorna o XML de resposta.
+
+        with ServidorSefazStub(certificado) as stub:
+            url = stub.url("NFeStatusServico4")
+
+    :param latencia: segundos de espera antes de cada resposta, ou
+        dicionário {operação: segundos}
+    """
+
+    def __init__(self, certificado, servicos=None, latencia=0):
+        self.certificado = certificado
+        self.servicos = servicos or SERVICOS_PADRAO
+        self.latencia = latencia
+        # Responde 503 a todas as operações, simulando o autorizador fora do ar
+        self.indisponivel = False
+        self.contadores = collections.Counter()
+        self._servidor = None
+        self._thread = None
+        # O requests ignora o verify=False das sessões quando estas variáveis
+        # estão definidas, e o certificado do stub é autoassinado.
+        self._ambiente = mock.patch.dict(
+            os.environ, {"REQUESTS_CA_BUNDLE": "", "CURL_CA_BUNDLE": ""}
+        )
+
+    def __enter__(self):
+        self._ambiente.start()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._servidor.daemon_threads = True
+        self._servidor.stub = self
+        contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        with ArquivoCertificado(self.certificado, "w") as (cert, chave):
+            contexto.load_cert_chain(certfile=cert, keyfile=chave)
+        self._servidor.socket = contexto.wrap_socket(
+            self._servidor.socket, server_side=True
+        )
+        self._thread = threading.Thread(target=self._servidor.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        self._ambiente.stop()
+
+    @property
+    def endereco(self):
+        return f"https://127.0.0.1:{self._servidor.server_address[1]}"
+
+    def url(self, servico):
+        return f"{self.endereco}/{servico}/{servico}.asmx?wsdl"
+
+    def wsdl(self, servico):
+        namespace = WSDL_NS + servico.nome
+        return WSDL.format(
+            namespace=namespace,
+            nome=servico.nome,
+            location=f"{self.endereco}/{servico.nome}/{servico.nome}.asmx",
+            elementos="".join(
+                ELEMENTO_OPERACAO.format(operacao=op, parte=servico.parte)
+                for op in servico.operacoes
+                if servico.parte
+            ),
+            mensagens="".join(
+                MENSAGENS.format(operacao=op, parte="parameters", elemento=op)
+                if servico.parte
+                else MENSAGENS.format(
+                    operacao=op, parte="nfeDadosMsg", elemento="nfeDadosMsg"
+                )
+                for op in servico.operacoes
+            ),
+            port_type="".join(
+                PORT_TYPE.format(operacao=op) for op in servico.operacoes
+            ),
+            binding="".join(
+                BINDING.format(operacao=op, namespace=namespace)
+                for op in servico.operacoes
+            ),
+        )
+
+
+# Serviço do stub (primeiro segmento da URL) de cada webservice da NF-e
+SERVICOS_STUB = {
+    nfe_module.WS_NFE_SITUACAO: "NFeStatusServico4",
+    nfe_module.WS_NFE_CONSULTA: "NFeConsultaProtocolo4",
+    nfe_module.WS_NFE_AUTORIZACAO: "NFeAutorizacao4",
+    nfe_module.WS_NFE_RET_AUTORIZACAO: "NFeRetAutorizacao4",
+    nfe_module.WS_DFE_DISTRIBUICAO: "NFeDistribuicaoDFe",
+    nfe_module.WS_NFE_RECEPCAO_EVENTO: "NFeRecepcaoEvento4",
+}
+
+
+def monta_nfe(
+    numero, mod="55", itens=0, dh_emi="2020-11-20T08:14:32-03:00", tp_emis="1"
+):
+    """NF-e (55) ou NFC-e (65) de SP com ``itens`` produtos de R$ 10,00.
+
+    :return: tupla (chave, edoc)
+    """
+    chave = "35201100000000000191%s001%09d%s%08d0" % (mod, numero, tp_emis, numero)
+    det = [
+        retEnviNFe.detType(
+            nItem=str(item),
+            prod=retEnviNFe.prodType(
+                cProd="%06d" % item,
+                cEAN="SEM GTIN",
+                xProd=f"PRODUTO DE TESTE {item}",
+                NCM="61091000",
+                CFOP="5102",
+                uCom="UN",
+                qCom="1.0000",
+                vUnCom="10.00",
+                vProd="10.00",
+                cEANTrib="SEM GTIN",
+                uTrib="UN",
+                qTrib="1.0000",
+                vUnTrib="10.00",
+                indTot="1",
+            ),
+        )
+        for item in range(1, itens + 1)
+    ]
+    total = "%.2f" % (10 * itens)
+    edoc = retEnviNFe.TNFe(
+        infNFe=retEnviNFe.infNFeType(
+            Id="NFe" + chave,
+            versao="4.00",
+            ide=retEnviNFe.ideType(
+                cUF="35",
+                cNF="%08d" % numero,
+                natOp="Venda",
+                mod=mod,
+                nNF=numero,
+                dhEmi=dh_emi,
+                tpEmis=tp_emis,
+            ),
+            emit=retEnviNFe.emitType(CNPJ="00000000000191", xNome="Empresa Teste"),
+            det=det,
+            total=retEnviNFe.totalType(
+                ICMSTot=retEnviNFe.ICMSTotType(vProd=total, vNF=total)
+            ),
+        ),
+    )
+    if mod == "65":
+        edoc.infNFeSupl = retEnviNFe.infNFeSuplType(qrCode="", urlChave="https://sefaz")
+    edoc.original_tagname_ = "NFe"
+    return chave, edoc
+
+
+class SefazStubMixin(TestCertificateMixin):
+    """
+    Mixin para testes executados contra o ServidorSefazStub.
+
+    O setUp inicia o stub com os serviços de ``servicos_stub`` (por padrão
+    os da SefazSimulada em ``self.sefaz``) e redireciona o localizar_url dos
+    ``modulos_localizar_url`` para o stub (mock em ``self.localizar_url``).
+    Os documentos criados por
+    ``documento`` utilizam o pool de clientes do teste.
+    """
+
+    # Módulos de erpbrasil.edoc cujo localizar_url é substituído
+    modulos_localizar_url = ("nfe",)
+
+    def setUp(self):
+        super().setUp()
+        servicos = self.servicos_stub()
+        if servicos is not None:
+            self.stub = self.inicia_stub(servicos)
+        self.pool = PoolClientes()
+        self.addCleanup(self.pool.limpar)
+        self.localizar_url = mock.Mock(side_effect=self.url_stub)
+        for modulo in self.modulos_localizar_url:
+            patcher = mock.patch(
+                f"erpbrasil.edoc.{modulo}.localizar_url", self.localizar_url
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def servicos_stub(self):
+        """Serviços do stub iniciado no setUp, None para não iniciá-lo"""
+        self.sefaz = SefazSimulada()
+        return self.sefaz.servicos()
+
+    def inicia_stub(self, servicos=None, **kwargs):
+        stub = ServidorSefazStub(self.certificate, servicos=servicos, **kwargs)
+        stub.__enter__()
+        self.addCleanup(stub.__exit__)
+        return stub
+
+    def url_stub(self, servico, *args, **kwargs):
+        return self.stub.url(SERVICOS_STUB[servico])
+
+    def documento(self, classe=NFe, transmissao=None, **kwargs):
+        """Documento (NFe, NFCe, MDe...) de SP, em homologação"""
+        documento = classe(
+            transmissao or TransmissaoSOAP(self.certificate, cache=False),
+            "35",
+            **kwargs,
+        )
+        documento._pool_clientes = self.pool
+        return documento
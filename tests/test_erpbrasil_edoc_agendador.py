@@ -0,0 +1,142 @@
+import threading
+import time
+from concurrent.futures import CancelledError
+from types import SimpleNamespace
+from unittest import TestCase
+
+from erpbrasil.edoc.agendador import AgendadorRecibos
+
+
+class DocumentoFake:
+    _maximo_tentativas_consulta_recibo = 3
+
+    def __init__(self, consultas_em_processamento=0, erro=None):
+        self.consultas_em_processamento = consultas_em_processamento
+        self.erro = erro
+        self.consultas = []
+        self.processos = []
+        self._lock = threading.Lock()
+
+    def _tempo_espera(self, proc_envio):
+        return proc_envio.tempo
+
+    def _edoc_situacao_em_processamento(self, proc_recibo):
+        return proc_recibo.resposta.cStat == "105"
+
+    def consulta_recibo(self, proc_envio):
+        if self.erro:
+            raise self.erro
+        with self._lock:
+            self.consultas.append(proc_envio.recibo)
+            em_processamento = (
+                self.consultas.count(proc_envio.recibo)
+                <= self.consultas_em_processamento
+            )
+        c_stat = "105" if em_processamento else "104"
+        return SimpleNamespace(resposta=SimpleNamespace(cStat=c_stat))
+
+    def monta_processo(self, edoc, proc_envio, proc_recibo):
+        self.processos.append((edoc, proc_envio.recibo))
+
+
+def envio(recibo, tempo=0):
+    return SimpleNamespace(recibo=recibo, tempo=tempo)
+
+
+class AgendadorRecibosTests(TestCase):
+    def setUp(self):
+        self.agendador = AgendadorRecibos(threads=2)
+        self.addCleanup(self.agendador.fechar)
+
+    def test_consulta_por_vencimento(self):
+        documento = DocumentoFake()
+        for recibo, tempo in (("3", 0.15), ("1", 0.05), ("2", 0.1)):
+            self.agendador.agendar(documento, envio(recibo, tempo), edoc=recibo)
+        concluidos = [
+            recibo.proc_envio.recibo for recibo in self.agendador.concluidos(5)
+        ]
+        self.assertEqual(concluidos, ["1", "2", "3"])
+        self.assertEqual(documento.consultas, ["1", "2", "3"])
+        self.assertEqual(sorted(documento.processos), [(r, r) for r in "123"])
+
+    def test_reagenda_em_processamento(self):
+        documento = DocumentoFake(consultas_em_processamento=2)
+        recibo = self.agendador.agendar(documento, envio("1"))
+        self.assertEqual(recibo.resultado(5).resposta.cStat, "104")
+        self.assertEqual(recibo.tentativa, 2)
+        self.assertEqual(len(documento.consultas), 3)
+
+    def test_maximo_tentativas(self):
+        documento = DocumentoFake(consultas_em_processamento=10)
+        recibo = self.agendador.agendar(documento, envio("1"))
+        self.assertEqual(recibo.resultado(5).resposta.cStat, "105")
+        self.assertEqual(len(documento.consultas), 4)
+        self.assertEqual(documento.processos, [(None, "1")])
+
+    def test_callback(self):
+        documento = DocumentoFake()
+        concluidos = []
+        evento = threading.Event()
+
+        def callback(recibo):
+            concluidos.append(recibo.proc_envio.recibo)
+            if len(concluidos) == 50:
+                evento.set()
+
+        for numero in range(50):
+            self.agendador.agendar(documento, envio(str(numero)), callback=callback)
+        self.assertTrue(evento.wait(5))
+        self.assertEqual(sorted(concluidos, key=int), [str(n) for n in range(50)])
+        self.assertEqual(list(self.agendador.concluidos(5)), [])
+
+    def test_erro(self):
+        documento = DocumentoFake(erro=ConnectionError("sem rede"))
+        recibo = self.agendador.agendar(documento, envio("1"))
+        with self.assertRaises(ConnectionError):
+            recibo.resultado(5)
+
+    def test_muitos_recibos_poucas_threads(self):
+        documento = DocumentoFake(consultas_em_processamento=1)
+        inicio = time.monotonic()
+        for numero in range(2000):
+            self.agendador.agendar(documento, envio(str(numero), 0.2))
+        self.assertEqual(len(list(self.agendador.concluidos(5))), 2000)
+        # As esperas de todos os recibos acontecem ao mesmo tempo
+        self.assertLess(time.monotonic() - inicio, 3)
+        self.assertEqual(len(documento.consultas), 4000)
+
+    def test_fechar_cancela_pendentes(self):
+        documento = DocumentoFake()
+        recibo = self.agendador.agendar(documento, envio("1", 60))
+        self.agendador.fechar()
+        self.assertEqual(len(self.agendador), 0)
+        with self.assertRaises(CancelledError):
+            recibo.resultado(5)
+        self.assertEqual(list(self.agendador.concluidos(5)), [recibo])
+        self.assertEqual(documento.consultas, [])
+
+    def test_fechar_durante_a_consulta(self):
+        documento = DocumentoFake(consultas_em_processamento=1)
+        consultando = threading.Event()
+        liberar = threading.Event()
+        consulta_recibo = documento.consulta_recibo
+
+        def consultar(proc_envio):
+            consultando.set()
+            liberar.wait(5)
+            return consulta_recibo(proc_envio)
+
+        documento.consulta_recibo = consultar
+        recibo = self.agendador.agendar(documento, envio("1"))
+        self.assertTrue(consultando.wait(5))
+        fechar = threading.Thread(target=self.agendador.fechar)
+        fechar.start()
+        while not self.agendador._fechado:
+            time.sleep(0.01)
+        liberar.set()
+        fechar.join(5)
+        # Em processamento: não é reagendado com o agendador encerrado
+        with self.assertRaises(CancelledError):
+            recibo.resultado(5)
+        self.assertEqual(recibo.tentativa, 0)
+        self.assertEqual(len(self.agendador), 0)
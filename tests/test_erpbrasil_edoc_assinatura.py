@@ -0,0 +1,133 @@
+import base64
+import copy
+from io import StringIO
+from unittest import TestCase, mock, skipUnless
+
+from erpbrasil.assinatura.assinatura import Assinatura
+from erpbrasil.assinatura.certificado import Certificado
+from erpbrasil.base import misc
+from erpbrasil.edoc import assinatura
+from erpbrasil.edoc.assinatura import (
+    ServicoAssinatura,
+    encerrar_servicos_assinatura,
+    servico_assinatura,
+)
+from erpbrasil.edoc.provedores import ginfes
+from erpbrasil.edoc.provedores.cidades import NFSeFactory
+from erpbrasil.transmissao import TransmissaoSOAP
+from lxml import etree
+
+from .sefaz_stub import monta_nfe
+from .test_certificate_mixin import TestCertificateMixin
+from .test_erpbrasil_edoc_nfse_ginfes import create_nfse_object
+
+DS = "{http://www.w3.org/2000/09/xmldsig#}"
+
+
+def exporta(raiz):
+    output = StringIO()
+    raiz.export(output, 0, pretty_print=False)
+    return output.getvalue()
+
+
+class ServicoAssinaturaTests(TestCertificateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.servico = ServicoAssinatura(self.certificate, processos=2)
+        self.addCleanup(self.servico.fechar)
+
+    def test_assina_igual_assinatura(self):
+        chave, edoc = monta_nfe(1)
+        xml = exporta(edoc)
+        esperado = Assinatura(self.certificate).assina_xml2(
+            etree.fromstring(xml), edoc.infNFe.Id
+        )
+        self.assertEqual(
+            self.servico.assina(xml, edoc.infNFe.Id),
+            esperado.replace("\n", "").replace("\r", ""),
+        )
+
+    def test_assina_elemento(self):
+        chave, edoc = monta_nfe(1)
+        xml = exporta(edoc)
+        elemento = etree.fromstring(xml)
+        assinado = self.servico.assina_elemento(elemento, edoc.infNFe.Id)
+        # Assinado no próprio elemento, sem serializá-lo
+        self.assertIs(assinado, elemento)
+        self.assertEqual(
+            etree.tostring(assinado, encoding=str),
+            self.servico.assina(xml, edoc.infNFe.Id),
+        )
+
+    def test_assina_lote_processos(self):
+        edocs = [monta_nfe(numero)[1] for numero in range(1, 7)]
+        itens = [(exporta(edoc), edoc.infNFe.Id) for edoc in edocs]
+        esperado = [self.servico.assina(*item) for item in itens]
+        self.assertEqual(self.servico.assina_lote(itens), esperado)
+        self.assertIsNotNone(self.servico._executor)
+
+    def test_assina_lote_pequeno_sem_processos(self):
+        chave, edoc = monta_nfe(1)
+        self.servico.assina_lote([(exporta(edoc), edoc.infNFe.Id)])
+        self.assertIsNone(self.servico._executor)
+
+    def test_servico_compartilhado(self):
+        self.assertIs(
+            servico_assinatura(self.certificate), servico_assinatura(self.certificate)
+        )
+        # O mesmo certificado (PFX), carregado em outro objeto Certificado
+        certificado = Certificado(
+            base64.b64encode(self.certificate._arquivo), self.certificate._senha
+        )
+        self.assertIs(
+            servico_assinatura(certificado), servico_assinatura(self.certificate)
+        )
+
+    def test_servicos_descartados(self):
+        self.addCleanup(encerrar_servicos_assinatura)
+        with mock.patch.object(assinatura, "MAXIMO_SERVICOS_ASSINATURA", 1):
+            primeiro = servico_assinatura(self.certificate)
+            with mock.patch.object(primeiro, "fechar") as fechar:
+                segundo = servico_assinatura(self._load_certificate())
+            fechar.assert_called_once_with()
+            self.assertIs(servico_assinatura(segundo.certificado), segundo)
+            self.assertIsNot(servico_assinatura(self.certificate), primeiro)
+
+
+@skipUnless(ginfes.ginfes, "nfselib.ginfes não instalada")
+class GinfesAssinaturaTests(TestCertificateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.nfse = NFSeFactory(
+            transmissao=TransmissaoSOAP(self.certificate),
+            ambiente="2",
+            cidade_ibge=3132404,
+            cnpj_prestador=misc.punctuation_rm("23.130.935/0001-98"),
+            im_prestador=misc.punctuation_rm("35172"),
+        )
+
+    def test_assina_rps(self):
+        edoc = create_nfse_object()
+        xml_assinado = self.nfse._prepara_envia_documento(edoc)
+        # Mesmo resultado da assinatura do lote inteiro com a referência da RPS
+        self.assertEqual(
+            xml_assinado,
+            self.nfse.assina_raiz(exporta(edoc), "rps334"),
+        )
+
+    def test_assina_varias_rps(self):
+        edoc = create_nfse_object()
+        rps = edoc.LoteRps.ListaRps.Rps[0]
+        for numero in (335, 336):
+            outra = copy.deepcopy(rps)
+            outra.InfRps.Id = "rps%d" % numero
+            edoc.LoteRps.ListaRps.Rps.append(outra)
+
+        lote = etree.fromstring(self.nfse._prepara_envia_documento(edoc))
+        lista_rps = lote.findall(".//{*}Rps")
+        self.assertEqual(len(lista_rps), 3)
+        for rps in lista_rps:
+            referencia = rps.find(f"{DS}Signature/{DS}SignedInfo/{DS}Reference")
+            self.assertEqual(
+                referencia.get("URI"), "#" + rps.find("{*}InfRps").get("Id")
+            )
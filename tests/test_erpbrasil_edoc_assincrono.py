@@ -0,0 +1,145 @@
+import asyncio
+import time
+from unittest import TestCase, mock, skipUnless
+
+from erpbrasil.edoc import assincrono
+from erpbrasil.edoc.assincrono import fechar_sessoes_assincronas, sessao_assincrona
+from erpbrasil.edoc.mde import MDe, TransmissaoMDE
+from lxml import etree
+
+from .sefaz_stub import DistribuicaoSimulada, SefazStubMixin, monta_nfe
+
+CNPJ_MDE = "09091076000144"
+
+
+@skipUnless(hasattr(assincrono, "aiohttp"), "aiohttp não instalado")
+class AssincronoNFeTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.sefaz.consultas_em_processamento = 1
+        self.stub.latencia = 0.2
+        self.nfe = self.documento()
+
+    def executar(self, coroutine):
+        async def executar():
+            try:
+                return await coroutine
+            finally:
+                await fechar_sessoes_assincronas()
+
+        return asyncio.run(executar())
+
+    def test_status_servico_async(self):
+        retorno = self.executar(self.nfe.status_servico_async())
+        self.assertEqual(retorno.resposta.cStat, "107")
+        # Mesmo resultado da chamada síncrona
+        sincrono = self.nfe.status_servico()
+        self.assertEqual(retorno.retorno.content, sincrono.retorno.content)
+        self.assertIsInstance(retorno.envio_xml, str)
+        self.assertEqual(retorno.envio_xml, sincrono.envio_xml)
+
+    def test_cliente_reservado_durante_a_chamada(self):
+        em_uso = []
+        enviar = assincrono.SessaoAssincrona.enviar
+
+        async def registrar(sessao, *args):
+            em_uso.append([item.em_uso for item in self.pool._clientes.values()])
+            # Clientes ociosos são descartados a cada novo cliente do pool
+            self.pool.tempo_ocioso = 0
+            self.pool._descartar_ociosos()
+            return await enviar(sessao, *args)
+
+        with mock.patch.object(assincrono.SessaoAssincrona, "enviar", registrar):
+            retorno = self.executar(self.nfe.status_servico_async())
+        self.assertEqual(retorno.resposta.cStat, "107")
+        self.assertEqual(em_uso, [[1]])
+        self.assertEqual(len(self.pool), 1)
+        self.assertEqual([item.em_uso for item in self.pool._clientes.values()], [0])
+
+    def test_chamadas_simultaneas(self):
+        async def consultas():
+            return await asyncio.gather(
+                *(self.nfe.status_servico_async() for _ in range(10))
+            )
+
+        inicio = time.monotonic()
+        retornos = self.executar(consultas())
+        self.assertEqual([r.resposta.cStat for r in retornos], ["107"] * 10)
+        # As requisições aguardam a latência do servidor ao mesmo tempo
+        self.assertLess(time.monotonic() - inicio, 10 * self.stub.latencia)
+        self.assertEqual(self.stub.contadores["nfeStatusServicoNF"], 10)
+
+    def test_processar_documento_async(self):
+        chave, edoc = monta_nfe(1)
+
+        async def processar():
+            return [
+                processo async for processo in self.nfe.processar_documento_async(edoc)
+            ]
+
+        processos = self.executar(processar())
+        self.assertEqual(
+            [processo.resposta.cStat for processo in processos], ["103", "104"]
+        )
+        self.assertEqual(self.stub.contadores["nfeRetAutorizacaoLote"], 2)
+        self.assertIn(chave, processos[-1].processos)
+        envio = etree.fromstring(processos[0].envio_xml)
+        self.assertEqual(envio.find("{*}NFe/{*}infNFe").get("Id"), "NFe" + chave)
+
+    def test_sessao_por_event_loop(self):
+        async def sessao():
+            try:
+                return sessao_assincrona(self.certificate), sessao_assincrona(
+                    self.certificate
+                )
+            finally:
+                await fechar_sessoes_assincronas()
+
+        primeira, segunda = asyncio.run(sessao())
+        self.assertIs(primeira, segunda)
+        self.assertIsNot(asyncio.run(sessao())[0], primeira)
+
+
+@skipUnless(hasattr(assincrono, "aiohttp"), "aiohttp não instalado")
+class AssincronoMDeTests(SefazStubMixin, TestCase):
+    modulos_localizar_url = ("nfe", "mde")
+
+    def setUp(self):
+        super().setUp()
+        transmissao = TransmissaoMDE(self.certificate, cache=False)
+        self.mde = self.documento(MDe, transmissao, versao="1.01")
+
+    def servicos_stub(self):
+        self.distribuicao = DistribuicaoSimulada(3, parte="nfeDadosMsg")
+        return self.distribuicao.servicos()
+
+    def test_consultar_distribuicao_async(self):
+        envelopes = []
+        post = assincrono.SessaoAssincrona.post
+
+        async def registrar(sessao, url, dados, cabecalhos):
+            envelopes.append(etree.fromstring(dados))
+            return await post(sessao, url, dados, cabecalhos)
+
+        async def consultar():
+            try:
+                return await self.mde.consultar_distribuicao_async(
+                    CNPJ_MDE, ultimo_nsu="0"
+                )
+            finally:
+                await fechar_sessoes_assincronas()
+
+        with mock.patch.object(assincrono.SessaoAssincrona, "post", registrar):
+            retorno = asyncio.run(consultar())
+        self.assertEqual(retorno.resposta.cStat, "138")
+
+        # Mesmo envelope da chamada síncrona, com o nfeCabecMsg da UF
+        with mock.patch.object(
+            self.mde, "analisar_retorno_raw", wraps=self.mde.analisar_retorno_raw
+        ) as analisar:
+            self.mde.consultar_distribuicao(CNPJ_MDE, ultimo_nsu="0")
+        esperado = etree.fromstring(analisar.call_args[0][3].request.body)
+        self.assertEqual(self.distribuicao.consultas, [0, 0])
+        (envelope,) = envelopes
+        self.assertEqual(envelope.findtext(".//{*}nfeCabecMsg/{*}cUF"), "SP")
+        self.assertEqual(etree.tostring(envelope), etree.tostring(esperado))
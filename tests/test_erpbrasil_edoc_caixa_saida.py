@@ -0,0 +1,179 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from erpbrasil.edoc.caixa_saida import (
+    ESTADO_ASSINADO,
+    ESTADO_AUTORIZADO,
+    ESTADO_ENVIADO,
+    ESTADO_RECIBO,
+    ArmazenamentoSaida,
+    ArmazenamentoSaidaMemoria,
+    ArmazenamentoSaidaSQLite,
+)
+from requests import HTTPError
+
+from .sefaz_stub import SefazStubMixin, monta_nfe
+
+CHAVE = "35201100000000000191550010000000011000000010"
+
+
+class ArmazenamentoSaidaTests(TestCase):
+    def armazenamentos(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        sqlite = ArmazenamentoSaidaSQLite(os.path.join(diretorio.name, "saida.db"))
+        self.addCleanup(sqlite.fechar)
+        return [ArmazenamentoSaidaMemoria(), sqlite]
+
+    def test_transicoes(self):
+        for armazenamento in self.armazenamentos():
+            armazenamento.registrar(CHAVE, ESTADO_ASSINADO, xml="<NFe/>")
+            armazenamento.registrar(CHAVE, ESTADO_ENVIADO)
+            armazenamento.registrar(
+                CHAVE, ESTADO_RECIBO, "<ret/>", "351", contingencia=True, c_stat="103"
+            )
+            self.assertEqual(
+                armazenamento.documento(CHAVE),
+                (CHAVE, ESTADO_RECIBO, "351", True, "<NFe/>"),
+            )
+            self.assertEqual(
+                armazenamento.pendentes(), [armazenamento.documento(CHAVE)]
+            )
+
+            armazenamento.registrar(CHAVE, ESTADO_AUTORIZADO, "<prot/>", c_stat="100")
+            self.assertEqual(armazenamento.pendentes(), [])
+            self.assertEqual(
+                [(t.estado, t.c_stat, t.xml) for t in armazenamento.transicoes(CHAVE)],
+                [
+                    (ESTADO_ASSINADO, None, "<NFe/>"),
+                    (ESTADO_ENVIADO, None, None),
+                    (ESTADO_RECIBO, "103", "<ret/>"),
+                    (ESTADO_AUTORIZADO, "100", "<prot/>"),
+                ],
+            )
+
+            # Assinado novamente: o recibo anterior é descartado
+            armazenamento.registrar(CHAVE, ESTADO_ASSINADO, xml="<NFe2/>")
+            self.assertEqual(
+                armazenamento.documento(CHAVE),
+                (CHAVE, ESTADO_ASSINADO, None, False, "<NFe2/>"),
+            )
+
+    def test_armazenamento_incompleto(self):
+        class SemTransicoes(ArmazenamentoSaida):
+            def registrar(self, chave, estado, **kwargs):
+                pass
+
+            def documento(self, chave):
+                return None
+
+            def pendentes(self):
+                return []
+
+        with self.assertRaises(TypeError):
+            SemTransicoes()
+
+
+class CaixaSaidaNFeTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.caminho = os.path.join(diretorio.name, "saida.db")
+
+    def nfe(self):
+        """Simula um novo processo, com uma nova conexão ao banco"""
+        caixa_saida = ArmazenamentoSaidaSQLite(self.caminho)
+        self.addCleanup(caixa_saida.fechar)
+        nfe = self.documento()
+        nfe._caixa_saida = caixa_saida
+        return nfe
+
+    def test_processar_documento(self):
+        nfe = self.nfe()
+        chave, edoc = monta_nfe(1)
+        processos = list(nfe.processar_documento(edoc))
+        self.assertEqual([p.resposta.cStat for p in processos], ["103", "104"])
+        self.assertEqual(
+            [t.estado for t in nfe._caixa_saida.transicoes(chave)],
+            [ESTADO_ASSINADO, ESTADO_ENVIADO, ESTADO_RECIBO, ESTADO_AUTORIZADO],
+        )
+        documento = nfe._caixa_saida.documento(chave)
+        self.assertIn(f'Id="NFe{chave}"', documento.xml)
+        self.assertIn("<Signature", documento.xml)
+        self.assertIn("<nProt>", nfe._caixa_saida.transicoes(chave)[-1].xml)
+
+    def test_retomar_recibos(self):
+        nfe = self.nfe()
+        chaves = []
+        for numero in range(1, 4):
+            chave, edoc = monta_nfe(numero)
+            chaves.append(chave)
+            processos = nfe.processar_documento(edoc)
+            # O processo é interrompido após o envio, antes da consulta ao recibo
+            self.assertEqual(next(processos).resposta.cStat, "103")
+            processos.close()
+        nfe.envia_lote([monta_nfe(numero)[1] for numero in range(4, 6)])
+        self.assertEqual(
+            {documento.estado for documento in nfe._caixa_saida.pendentes()},
+            {ESTADO_RECIBO},
+        )
+
+        nfe = self.nfe()
+        processos = list(nfe.retomar_saida())
+        self.assertEqual([p.resposta.cStat for p in processos], ["104"] * 4)
+        self.assertEqual(nfe._caixa_saida.pendentes(), [])
+        self.assertEqual(
+            nfe._caixa_saida.documento(chaves[0]).estado, ESTADO_AUTORIZADO
+        )
+        self.assertEqual(self.stub.contadores["nfeAutorizacaoLote"], 4)
+        self.assertEqual(self.stub.contadores["nfeRetAutorizacaoLote"], 4)
+
+    def test_retomar_enviados_sem_retorno(self):
+        nfe = self.nfe()
+        recebida, edoc = monta_nfe(1)
+        list(nfe.processar_documento(edoc))
+        # A SEFAZ recebeu o documento, mas o retorno do envio foi perdido
+        nfe._caixa_saida.registrar(recebida, ESTADO_ENVIADO)
+
+        perdida, edoc = monta_nfe(2)
+        self.stub.indisponivel = True
+        with self.assertRaises(HTTPError):
+            nfe.envia_documento(edoc)
+        self.assertEqual(nfe._caixa_saida.documento(perdida).estado, ESTADO_ENVIADO)
+        self.stub.indisponivel = False
+
+        nfe = self.nfe()
+        processos = list(nfe.retomar_saida())
+        self.assertEqual(sorted(p.resposta.cStat for p in processos), ["100", "217"])
+        self.assertEqual(nfe._caixa_saida.documento(recebida).estado, ESTADO_AUTORIZADO)
+        # Não consta na SEFAZ: pode ser reenviado com o mesmo XML assinado
+        documento = nfe._caixa_saida.documento(perdida)
+        self.assertEqual(documento.estado, ESTADO_ASSINADO)
+        self.assertIn(f'Id="NFe{perdida}"', documento.xml)
+        self.assertEqual(self.stub.contadores["nfeAutorizacaoLote"], 1)
+
+    def test_retomar_lote_nao_localizado(self):
+        nfe = self.nfe()
+        chave, edoc = monta_nfe(1)
+        processos = nfe.processar_documento(edoc)
+        self.assertEqual(next(processos).resposta.cStat, "103")
+        processos.close()
+        # O recibo expirou na SEFAZ sem que o lote fosse consultado
+        self.sefaz.lotes.clear()
+
+        nfe = self.nfe()
+        processos = list(nfe.retomar_saida())
+        self.assertEqual([p.resposta.cStat for p in processos], ["106"])
+        documento = nfe._caixa_saida.documento(chave)
+        self.assertEqual(documento.estado, ESTADO_ASSINADO)
+        self.assertIsNone(documento.recibo)
+        self.assertIn(f'Id="NFe{chave}"', documento.xml)
+        self.assertEqual(nfe._caixa_saida.transicoes(chave)[-1].c_stat, "106")
+
+    def test_retomar_sem_caixa_saida(self):
+        nfe = self.nfe()
+        nfe._caixa_saida = None
+        with self.assertRaises(ValueError):
+            list(nfe.retomar_saida())
@@ -0,0 +1,92 @@
+import time
+from unittest import TestCase, mock
+
+from erpbrasil.edoc.limite import LimitadorRequisicoes, RegraLimite
+from requests import HTTPError
+
+from .sefaz_stub import SefazStubMixin, monta_nfe
+
+
+class ConsultaDocumentosTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.nfe = self.documento()
+
+    def test_consulta_documentos(self):
+        autorizadas = []
+        for numero in range(1, 4):
+            chave, edoc = monta_nfe(numero)
+            list(self.nfe.processar_documento(edoc))
+            autorizadas.append(chave)
+        # NFC-e do RS, não emitida
+        nfce_rs = "43" + monta_nfe(9)[0][2:20] + "65" + monta_nfe(9)[0][22:]
+
+        situacoes = {
+            situacao.chave: situacao
+            for situacao in self.nfe.consulta_documentos(
+                autorizadas + [nfce_rs], concorrencia=2
+            )
+        }
+        self.assertEqual(len(situacoes), 4)
+        for chave in autorizadas:
+            situacao = situacoes[chave]
+            self.assertEqual(situacao.c_stat, "100")
+            self.assertEqual(situacao.prot_nfe.infProt.chNFe, chave)
+            self.assertTrue(situacao.emitido)
+        self.assertEqual(situacoes[nfce_rs].c_stat, "217")
+        self.assertIsNone(situacoes[nfce_rs].prot_nfe)
+        self.assertFalse(situacoes[nfce_rs].emitido)
+        # Cada grupo é consultado no autorizador da sua UF e modelo
+        self.assertIn(
+            mock.call("NfeConsultaProtocolo", "43", "65", 2, False),
+            self.localizar_url.call_args_list,
+        )
+        self.assertEqual(self.stub.contadores["nfeConsultaNF"], 4)
+
+    def test_limitador(self):
+        chaves = [monta_nfe(numero)[0] for numero in range(1, 6)]
+        limitador = LimitadorRequisicoes(
+            regra_padrao=RegraLimite(capacidade=1, taxa=20.0)
+        )
+        inicio = time.monotonic()
+        situacoes = list(
+            self.nfe.consulta_documentos(chaves, concorrencia=5, limitador=limitador)
+        )
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.2)
+        self.assertEqual({situacao.c_stat for situacao in situacoes}, {"217"})
+        # O limitador vale somente para estas consultas
+        self.assertIsNone(self.nfe._limitador)
+
+    def test_documento_por_grupo(self):
+        chaves = [monta_nfe(numero)[0] for numero in range(1, 4)]
+        chaves += ["43" + chave[2:] for chave in chaves]
+        limitador = LimitadorRequisicoes()
+        with mock.patch.object(
+            self.nfe, "_documento_consulta", wraps=self.nfe._documento_consulta
+        ) as documento_consulta, mock.patch.object(
+            self.nfe, "_consulta_situacao", wraps=self.nfe._consulta_situacao
+        ) as consulta_situacao:
+            situacoes = list(self.nfe.consulta_documentos(chaves, limitador=limitador))
+        self.assertEqual(len(situacoes), 6)
+        self.assertEqual(
+            documento_consulta.call_args_list,
+            [
+                mock.call("35", "55", limitador),
+                mock.call("43", "55", limitador),
+            ],
+        )
+        # As chaves de cada grupo compartilham o mesmo documento
+        documentos = {}
+        for (documento, chave), _ in consulta_situacao.call_args_list:
+            documentos.setdefault(chave[:2], set()).add(id(documento))
+        self.assertEqual([len(ids) for ids in documentos.values()], [1, 1])
+
+    def test_erro_nao_interrompe(self):
+        self.stub.indisponivel = True
+        situacoes = list(
+            self.nfe.consulta_documentos([monta_nfe(n)[0] for n in range(1, 3)])
+        )
+        self.assertEqual(len(situacoes), 2)
+        for situacao in situacoes:
+            self.assertIsInstance(situacao.erro, HTTPError)
+            self.assertIsNone(situacao.c_stat)
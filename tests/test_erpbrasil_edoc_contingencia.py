@@ -0,0 +1,167 @@
+import binascii
+import os
+import tempfile
+from datetime import datetime
+from unittest import TestCase, mock
+
+from erpbrasil.edoc.caixa_saida import (
+    ESTADO_AUTORIZADO,
+    ESTADO_CONTINGENCIA,
+    ArmazenamentoSaidaSQLite,
+)
+from erpbrasil.edoc.contingencia import FilaContingenciaNFCe
+from erpbrasil.edoc.nfce import NFCe
+from lxml import etree
+
+from .sefaz_stub import SefazStubMixin, monta_nfe
+
+
+class FilaContingenciaTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.nfce = self.documento(NFCe, csc_token="000001", csc_code="CSC")
+        self.fila = FilaContingenciaNFCe(self.nfce, concorrencia=1)
+
+    def emitir(self):
+        chaves = []
+        for numero, hora in ((1, "10"), (2, "08"), (3, "09")):
+            chave, edoc = monta_nfe(
+                numero, "65", 1, f"2020-11-20T{hora}:00:00-03:00", tp_emis="9"
+            )
+            assinada = etree.fromstring(self.fila.emitir(edoc))
+            digest_value = assinada.findtext(".//{*}DigestValue")
+            self.assertIn(
+                binascii.hexlify(digest_value.encode()).decode(),
+                assinada.findtext("{*}infNFeSupl/{*}qrCode"),
+            )
+            chaves.append(chave)
+        return chaves
+
+    def test_qrcode_contingencia_uma_assinatura(self):
+        chave, edoc = monta_nfe(1, "65", 1, tp_emis="9")
+        with mock.patch.object(
+            self.nfce, "assina_elemento", wraps=self.nfce.assina_elemento
+        ) as assina:
+            assinada = self.nfce.assina_documento(edoc)
+        self.assertEqual(assina.call_count, 1)
+        self.assertEqual(
+            assinada.findtext("{*}infNFeSupl/{*}qrCode"), edoc.infNFeSupl.qrCode
+        )
+        # Igual à assinatura do documento com o QR Code já incluído
+        esperado = self.nfce.assina_elemento(edoc, edoc.infNFe.Id)
+        self.assertEqual(etree.tostring(assinada), etree.tostring(esperado))
+
+    def test_qrcode_contingencia_sem_qrcode(self):
+        chave, edoc = monta_nfe(1, "65", 1, tp_emis="9")
+        edoc.infNFeSupl.qrCode = None
+        assinada = self.nfce.assina_documento(edoc)
+        supl = assinada.find("{*}infNFeSupl")
+        self.assertEqual(
+            [etree.QName(filho).localname for filho in supl], ["qrCode", "urlChave"]
+        )
+        self.assertEqual(supl.findtext("{*}qrCode"), edoc.infNFeSupl.qrCode)
+        esperado = self.nfce.assina_elemento(edoc, edoc.infNFe.Id)
+        self.assertEqual(etree.tostring(assinada), etree.tostring(esperado))
+
+    def test_emitir_sem_transmitir(self):
+        chaves = self.emitir()
+        self.assertNotIn("nfeAutorizacaoLote", self.stub.contadores)
+        pendentes = self.fila.pendentes()
+        self.assertEqual(
+            [documento.chave for documento in pendentes],
+            [chaves[1], chaves[2], chaves[0]],
+        )
+        assinada = etree.fromstring(pendentes[0].xml)
+        self.assertIsNotNone(assinada.find("{*}Signature"))
+
+    def test_transmitir_pela_ordem_de_emissao(self):
+        chaves = self.emitir()
+        with mock.patch.object(self.nfce, "assina_elemento") as assina:
+            envios = list(self.fila.transmitir())
+        assina.assert_not_called()
+        self.assertEqual(
+            [envio.chave for envio in envios], [chaves[1], chaves[2], chaves[0]]
+        )
+        self.assertEqual({envio.estado for envio in envios}, {ESTADO_AUTORIZADO})
+        self.assertEqual(
+            list(self.sefaz.autorizadas), [chaves[1], chaves[2], chaves[0]]
+        )
+        self.assertEqual(self.fila.armazenamento.pendentes(), [])
+        protocolo = self.fila.armazenamento.transicoes(chaves[0])[-1]
+        self.assertEqual(protocolo.estado, ESTADO_AUTORIZADO)
+        self.assertEqual(protocolo.c_stat, "100")
+        self.assertIn(chaves[0], protocolo.xml)
+
+    def test_transmitir_sem_conexao(self):
+        chaves = self.emitir()
+        self.stub.indisponivel = True
+        envios = list(self.fila.transmitir())
+        self.assertEqual(len(envios), 1)
+        self.assertEqual(envios[0].estado, ESTADO_CONTINGENCIA)
+        self.assertIsNotNone(envios[0].erro)
+        self.assertEqual(len(self.fila.pendentes()), 3)
+
+        self.stub.indisponivel = False
+        envios = list(self.fila.transmitir())
+        self.assertEqual(sorted(envio.chave for envio in envios), sorted(chaves))
+
+    def test_transmitir_sem_conexao_caixa_saida(self):
+        # A fila compartilha a caixa de saída da NFCe
+        self.nfce._caixa_saida = self.fila.armazenamento
+        chaves = self.emitir()
+        self.stub.indisponivel = True
+        envios = list(self.fila.transmitir())
+        self.assertEqual(envios[0].estado, ESTADO_CONTINGENCIA)
+        self.assertEqual(
+            {documento.estado for documento in self.fila.armazenamento.pendentes()},
+            {ESTADO_CONTINGENCIA},
+        )
+        self.assertEqual(len(self.fila.a_vencer(margem=24 * 3600)), 3)
+
+        self.stub.indisponivel = False
+        envios = list(self.fila.transmitir())
+        self.assertEqual(sorted(envio.chave for envio in envios), sorted(chaves))
+        self.assertEqual(self.stub.contadores["nfeAutorizacaoLote"], 3)
+        self.assertEqual(self.fila.armazenamento.pendentes(), [])
+
+    def test_transmitir_espacado(self):
+        self.emitir()
+        with mock.patch.object(
+            self.fila.limitador, "adquirir", wraps=self.fila.limitador.adquirir
+        ) as adquirir:
+            list(self.fila.transmitir())
+        self.assertEqual(adquirir.call_count, 3)
+        self.assertIsNone(self.nfce._limitador)
+
+    def test_a_vencer(self):
+        self.emitir()
+        emissao = datetime.fromisoformat("2020-11-20T08:00:00-03:00").timestamp()
+        self.fila.relogio = lambda: emissao + 23 * 3600
+        self.assertEqual(
+            [round(restante) for documento, restante in self.fila.a_vencer()],
+            [3600, 7200],
+        )
+        self.fila.relogio = lambda: emissao + 25 * 3600
+        self.assertEqual(
+            [round(restante) for documento, restante in self.fila.a_vencer()],
+            [-3600, 0, 3600],
+        )
+        self.fila.relogio = lambda: emissao
+        self.assertEqual(self.fila.a_vencer(), [])
+
+    def test_armazenamento_sqlite(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        caminho = os.path.join(diretorio.name, "contingencia.db")
+        armazenamento = ArmazenamentoSaidaSQLite(caminho)
+        self.fila.armazenamento = armazenamento
+        chaves = self.emitir()
+        armazenamento.fechar()
+
+        armazenamento = ArmazenamentoSaidaSQLite(caminho)
+        self.addCleanup(armazenamento.fechar)
+        self.fila.armazenamento = armazenamento
+        self.assertEqual(len(self.fila.pendentes()), 3)
+        list(self.fila.transmitir())
+        self.assertEqual(armazenamento.pendentes(), [])
+        self.assertEqual(armazenamento.documento(chaves[0]).estado, ESTADO_AUTORIZADO)
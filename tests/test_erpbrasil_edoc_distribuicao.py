@@ -0,0 +1,154 @@
+import base64
+import gzip
+import tempfile
+from types import SimpleNamespace
+from unittest import TestCase
+
+from erpbrasil.edoc.distribuicao import (
+    ArmazenamentoCursor,
+    ArmazenamentoCursorArquivo,
+    ArmazenamentoCursorMemoria,
+    CursorDistribuicao,
+    SincronizadorDistribuicao,
+    descompactar_doc_zip,
+    documentos_distribuicao,
+)
+from lxml import etree
+from nfelib.v4_00 import retDistDFeInt, retEnviNFe
+
+from .sefaz_stub import NFE_NS, DistribuicaoSimulada, SefazStubMixin, prot_nfe
+
+CNPJ = "09091076000144"
+
+
+class SincronizadorDistribuicaoTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.nfe = self.documento(versao="1.01")
+        self.agora = 1000.0
+
+    def servicos_stub(self):
+        # O stub é iniciado por cada teste, com a sua distribuição
+        return None
+
+    def inicia_distribuicao(self, distribuicao):
+        self.distribuicao = distribuicao
+        self.stub = self.inicia_stub(distribuicao.servicos())
+
+    def sincronizador(self, armazenamento=None):
+        return SincronizadorDistribuicao(
+            self.nfe, armazenamento, relogio=lambda: self.agora
+        )
+
+    def test_sincroniza_todas_as_paginas(self):
+        self.inicia_distribuicao(DistribuicaoSimulada(120))
+        sincronizador = self.sincronizador()
+        documentos = list(sincronizador.sincronizar(CNPJ))
+
+        self.assertEqual([int(d.nsu) for d in documentos], list(range(1, 121)))
+        self.assertEqual(self.distribuicao.consultas, [0, 50, 100])
+        self.assertEqual(documentos[0].tipo, "resNFe")
+        self.assertEqual(
+            etree.fromstring(documentos[0].xml).findtext("{*}xNome"), "EMPRESA 1"
+        )
+        cursor = sincronizador.cursor(CNPJ)
+        self.assertEqual(cursor.ult_nsu, "%015d" % 120)
+        self.assertEqual(cursor.proxima_consulta, self.agora + 3600)
+
+    def test_aguarda_intervalo(self):
+        self.inicia_distribuicao(DistribuicaoSimulada(10))
+        sincronizador = self.sincronizador()
+        self.assertEqual(len(list(sincronizador.sincronizar(CNPJ))), 10)
+        self.assertEqual(sincronizador.pendentes([CNPJ]), [])
+        self.assertEqual(list(sincronizador.sincronizar(CNPJ)), [])
+        self.assertEqual(len(self.distribuicao.consultas), 1)
+
+        self.agora += 3600
+        self.assertEqual(sincronizador.pendentes([CNPJ]), [CNPJ])
+        self.assertEqual(list(sincronizador.sincronizar(CNPJ)), [])
+        # A consulta seguinte parte do último NSU
+        self.assertEqual(self.distribuicao.consultas, [0, 10])
+
+    def test_consumo_indevido(self):
+        self.inicia_distribuicao(DistribuicaoSimulada(10, consumo_indevido=1))
+        sincronizador = self.sincronizador()
+        self.assertEqual(list(sincronizador.sincronizar(CNPJ)), [])
+        self.assertEqual(sincronizador.proxima_consulta(CNPJ), self.agora + 3600)
+        self.assertEqual(len(list(sincronizador.sincronizar(CNPJ, forcar=True))), 10)
+
+    def test_retoma_pagina_interrompida(self):
+        self.inicia_distribuicao(DistribuicaoSimulada(120))
+        with tempfile.TemporaryDirectory() as diretorio:
+            sincronizador = self.sincronizador(ArmazenamentoCursorArquivo(diretorio))
+            documentos = sincronizador.sincronizar(CNPJ)
+            for _ in range(60):
+                next(documentos)
+            documentos.close()
+
+            # Somente a primeira página foi concluída
+            sincronizador = self.sincronizador(ArmazenamentoCursorArquivo(diretorio))
+            self.assertEqual(sincronizador.cursor(CNPJ).ult_nsu, "%015d" % 50)
+            restantes = list(sincronizador.sincronizar(CNPJ))
+        self.assertEqual(int(restantes[0].nsu), 51)
+        self.assertEqual(len(restantes), 70)
+
+    def test_sincronizar_pendentes(self):
+        self.inicia_distribuicao(DistribuicaoSimulada(5))
+        armazenamento = ArmazenamentoCursorMemoria()
+        armazenamento.gravar("1", CursorDistribuicao(proxima_consulta=self.agora + 1))
+        sincronizador = self.sincronizador(armazenamento)
+        documentos = list(sincronizador.sincronizar_pendentes(["1", "2"]))
+        self.assertEqual({cnpj for cnpj, documento in documentos}, {"2"})
+        self.assertEqual(len(documentos), 5)
+
+    def test_armazenamento_incompleto(self):
+        class SomenteLeitura(ArmazenamentoCursor):
+            def ler(self, cnpj_cpf):
+                return None
+
+        with self.assertRaises(TypeError):
+            SomenteLeitura()
+
+
+class DocumentosDistribuicaoTests(TestCase):
+    def resposta(self, quantidade):
+        consulta = etree.fromstring(
+            f'<distDFeInt xmlns="{NFE_NS}"><distNSU><ultNSU>0</ultNSU></distNSU>'
+            "</distDFeInt>"
+        )
+        return retDistDFeInt.parseString(
+            DistribuicaoSimulada(quantidade).dist_dfe_interesse(consulta).encode(),
+            silence=True,
+        )
+
+    def test_documentos(self):
+        resposta = self.resposta(3)
+        documentos = list(documentos_distribuicao(resposta))
+        self.assertEqual([d.nsu for d in documentos], ["%015d" % n for n in (1, 2, 3)])
+        self.assertEqual(documentos[2].schema, "resNFe_v1.01.xsd")
+        self.assertEqual(documentos[2].etree().findtext("{*}xNome"), "EMPRESA 3")
+        self.assertIsNotNone(resposta.loteDistDFeInt.docZip[0].valueOf_)
+
+    def test_liberar(self):
+        resposta = self.resposta(3)
+        documentos = documentos_distribuicao(resposta, liberar=True)
+        next(documentos)
+        self.assertIsNone(resposta.loteDistDFeInt.docZip[0].valueOf_)
+        self.assertIsNotNone(resposta.loteDistDFeInt.docZip[1].valueOf_)
+
+    def test_sem_documentos(self):
+        self.assertEqual(list(documentos_distribuicao(self.resposta(0))), [])
+
+    def test_descompacta_em_blocos(self):
+        xml = f'<nfeProc xmlns="{NFE_NS}" versao="4.00">{prot_nfe("1" * 44, 1)}'
+        xml += "</nfeProc>"
+        conteudo = base64.encodebytes(gzip.compress(xml.encode())).decode()
+        doc_zip = SimpleNamespace(
+            NSU="1", schema="procNFe_v4.00.xsd", valueOf_=conteudo
+        )
+
+        documento = descompactar_doc_zip(doc_zip, tamanho_bloco=16)
+        self.assertEqual(documento.xml, xml.encode())
+        self.assertEqual(documento.tipo, "procNFe")
+        processo = documento.binding(retEnviNFe.TNfeProc)
+        self.assertEqual(processo.protNFe.infProt.chNFe, "1" * 44)
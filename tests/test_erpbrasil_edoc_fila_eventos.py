@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+from unittest import TestCase
+
+from erpbrasil.edoc.fila_eventos import FilaEventos
+from erpbrasil.edoc.nfe import NFe
+
+from .sefaz_stub import SefazStubMixin, monta_nfe
+
+PROTOCOLO = "135000000000001"
+
+
+class FilaEventosTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.nfe = self.documento()
+
+    def cancelamento(self, numero):
+        chave = monta_nfe(numero)[0]
+        return chave, self.nfe.cancela_documento(chave, PROTOCOLO, "Erro no preço")
+
+    def test_lotes_por_tamanho(self):
+        retornos = []
+        with FilaEventos(intervalo=60) as fila:
+            pendentes = {
+                chave: fila.adicionar(self.nfe, evento, callback=retornos.append)
+                for chave, evento in map(self.cancelamento, range(1, 46))
+            }
+        self.assertEqual(self.stub.contadores["nfeRecepcaoEvento"], 3)
+        self.assertEqual(len(retornos), 45)
+        for chave, pendente in pendentes.items():
+            self.assertEqual(pendente.resultado().infEvento.chNFe, chave)
+            self.assertEqual(pendente.c_stat, "135")
+            self.assertEqual(pendente.proc_envio.resposta.cStat, "128")
+        self.assertEqual(
+            sorted({len(p.proc_envio.resposta.retEvento) for p in retornos}),
+            [5, 20],
+        )
+
+    def test_lote_por_intervalo(self):
+        fila = FilaEventos(intervalo=0.05)
+        self.addCleanup(fila.fechar)
+        pendentes = [fila.adicionar(self.nfe, self.cancelamento(n)[1]) for n in (1, 2)]
+        for pendente in pendentes:
+            self.assertEqual(pendente.resultado(timeout=10).infEvento.cStat, "135")
+        self.assertEqual(len(fila), 0)
+        self.assertEqual(self.stub.contadores["nfeRecepcaoEvento"], 1)
+
+    def test_evento_repetido_em_outro_lote(self):
+        chave, evento = self.cancelamento(1)
+        with FilaEventos(intervalo=60) as fila:
+            primeiro = fila.adicionar(self.nfe, evento)
+            segundo = fila.adicionar(self.nfe, evento)
+        self.assertEqual(self.stub.contadores["nfeRecepcaoEvento"], 2)
+        self.assertIsNot(primeiro.proc_envio, segundo.proc_envio)
+        self.assertEqual(segundo.resultado().infEvento.chNFe, chave)
+
+    def test_retornos_evento_lote_rejeitado(self):
+        eventos = [self.cancelamento(n)[1] for n in (1, 2)]
+        proc_envio = SimpleNamespace(resposta=SimpleNamespace(cStat="215"))
+        self.assertEqual(NFe.retornos_evento(proc_envio, eventos), [None, None])
@@ -0,0 +1,114 @@
+import contextlib
+from unittest import TestCase, mock
+
+from erpbrasil.edoc.instrumentacao import (
+    FASE_ANALISE,
+    FASE_ASSINATURA,
+    FASE_POST,
+    FASE_SERIALIZACAO,
+    FASE_TRANSMISSAO,
+    ColetorHistograma,
+    Histograma,
+    InstrumentacaoOpenTelemetry,
+)
+from requests import HTTPError
+
+from .sefaz_stub import SefazStubMixin, monta_nfe
+
+OPERACAO = "nfeStatusServicoNF"
+
+
+class HistogramaTests(TestCase):
+    def test_percentil(self):
+        histograma = Histograma(limites=(0.01, 0.1, 1, float("inf")))
+        self.assertIsNone(histograma.percentil(50))
+        for duracao in [0.005] * 90 + [0.05] * 9 + [3]:
+            histograma.registrar(duracao)
+        self.assertEqual(histograma.contagens, [90, 9, 0, 1])
+        self.assertEqual(histograma.percentil(50), 0.01)
+        self.assertEqual(histograma.percentil(95), 0.1)
+        self.assertEqual(histograma.percentil(100), 3)
+        self.assertAlmostEqual(histograma.media, (0.45 + 0.45 + 3) / 100)
+
+
+class TracerFake:
+    def __init__(self):
+        self.spans = []
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, nome, attributes=None):
+        span = mock.Mock(nome=nome, atributos=dict(attributes))
+        span.set_attributes.side_effect = span.atributos.update
+        self.spans.append(span)
+        yield span
+
+
+class InstrumentacaoNFeTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.nfe = self.documento()
+        self.nfe._monitor_saude = None
+
+    def test_histograma(self):
+        coletor = self.nfe._instrumentacao = ColetorHistograma()
+        self.nfe.status_servico()
+        self.nfe.status_servico()
+        for fase in (FASE_POST, FASE_TRANSMISSAO, FASE_ANALISE):
+            self.assertEqual(coletor.histograma(fase, OPERACAO).contagem, 2)
+        self.assertEqual(coletor.histograma(FASE_SERIALIZACAO, None).contagem, 2)
+        self.assertEqual(coletor.c_stats, {(OPERACAO, "107"): 2})
+        post = coletor.histograma(FASE_POST, OPERACAO)
+        # O post inclui as demais fases
+        self.assertGreaterEqual(
+            post.soma, coletor.histograma(FASE_TRANSMISSAO, OPERACAO).soma
+        )
+        self.assertEqual(len(coletor.resumo()), 4)
+
+    def test_erro(self):
+        coletor = self.nfe._instrumentacao = ColetorHistograma(
+            agrupar=("operacao", "erro")
+        )
+        self.stub.indisponivel = True
+        with self.assertRaises(HTTPError):
+            self.nfe.status_servico()
+        self.assertEqual(
+            coletor.histograma(FASE_POST, OPERACAO, "HTTPError").contagem, 1
+        )
+        self.assertEqual(coletor.c_stats, {})
+
+    def test_open_telemetry_sem_pacote(self):
+        with mock.patch(
+            "erpbrasil.edoc.instrumentacao.trace", None
+        ), self.assertRaisesRegex(ImportError, "opentelemetry-api"):
+            InstrumentacaoOpenTelemetry()
+
+    def test_open_telemetry(self):
+        tracer = TracerFake()
+        self.nfe._instrumentacao = InstrumentacaoOpenTelemetry(tracer)
+        chave, edoc = monta_nfe(1)
+        self.nfe.assina_raiz(edoc, edoc.infNFe.Id)
+        self.nfe.status_servico()
+
+        self.assertEqual(
+            [span.nome for span in tracer.spans],
+            [
+                "erpbrasil.edoc." + fase
+                for fase in (
+                    FASE_ASSINATURA,
+                    FASE_SERIALIZACAO,
+                    FASE_POST,
+                    FASE_SERIALIZACAO,
+                    FASE_TRANSMISSAO,
+                    FASE_ANALISE,
+                )
+            ],
+        )
+        self.assertEqual(
+            tracer.spans[0].atributos, {"erpbrasil.edoc.id": "NFe" + chave}
+        )
+        post = tracer.spans[2].atributos
+        self.assertEqual(post["erpbrasil.edoc.uf"], "35")
+        self.assertEqual(post["erpbrasil.edoc.operacao"], OPERACAO)
+        self.assertEqual(post["erpbrasil.edoc.c_stat"], "107")
+        self.assertGreater(post["erpbrasil.edoc.bytes_envio"], 0)
+        self.assertGreater(post["erpbrasil.edoc.bytes_retorno"], 0)
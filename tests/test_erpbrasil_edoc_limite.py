@@ -0,0 +1,147 @@
+import asyncio
+from unittest import TestCase, mock
+
+from erpbrasil.edoc.limite import (
+    MODO_FILA,
+    MODO_REJEITAR,
+    ArmazenamentoLimite,
+    ArmazenamentoLimiteMemoria,
+    LimitadorRequisicoes,
+    LimiteExcedido,
+    RegraLimite,
+)
+
+from .sefaz_stub import DistribuicaoSimulada, SefazStubMixin
+
+CHAVE = ("09091076000144", "35", "nfeStatusServicoNF")
+
+
+class LimitadorRequisicoesTests(TestCase):
+    def setUp(self):
+        self.agora = 1000.0
+        self.esperas = []
+
+    def dormir(self, espera):
+        self.esperas.append(espera)
+        self.agora += espera
+
+    def limitador(self, **kwargs):
+        kwargs.setdefault("dormir", self.dormir)
+        return LimitadorRequisicoes(
+            regra_padrao=RegraLimite(capacidade=2, taxa=1.0),
+            relogio=lambda: self.agora,
+            **kwargs,
+        )
+
+    def test_bloquear(self):
+        limitador = self.limitador()
+        for _ in range(4):
+            limitador.adquirir(CHAVE)
+        self.assertEqual(self.esperas, [1.0, 1.0])
+        # Cada CNPJ, UF e serviço tem o seu balde
+        limitador.adquirir(CHAVE[:1] + ("43",) + CHAVE[2:])
+        self.assertEqual(len(self.esperas), 2)
+
+    def test_fila(self):
+        limitador = self.limitador(modo=MODO_FILA, dormir=self.esperas.append)
+        for _ in range(4):
+            limitador.adquirir(CHAVE)
+        # Sem avançar o relógio, cada chamada reserva o token seguinte
+        self.assertEqual(self.esperas, [1.0, 2.0])
+
+    def test_fila_espera_maxima(self):
+        limitador = self.limitador(
+            modo=MODO_FILA, espera_maxima=1.5, dormir=self.esperas.append
+        )
+        for _ in range(3):
+            limitador.adquirir(CHAVE)
+        with self.assertRaises(LimiteExcedido) as contexto:
+            limitador.adquirir(CHAVE)
+        self.assertEqual(contexto.exception.espera, 2.0)
+        # A chamada rejeitada não reserva um token, nem atrasa a seguinte
+        self.agora += 1.0
+        limitador.adquirir(CHAVE)
+        self.assertEqual(self.esperas, [1.0, 1.0])
+
+    def test_armazenamento_incompleto(self):
+        class SemBloqueio(ArmazenamentoLimite):
+            def consumir(self, chave, capacidade, taxa, agora, **kwargs):
+                return 0
+
+        with self.assertRaises(TypeError):
+            SemBloqueio()
+
+    def test_rejeitar(self):
+        limitador = self.limitador(modo=MODO_REJEITAR)
+        limitador.adquirir(CHAVE)
+        limitador.adquirir(CHAVE)
+        with self.assertRaises(LimiteExcedido) as contexto:
+            limitador.adquirir(CHAVE)
+        self.assertEqual(contexto.exception.chave, CHAVE)
+        self.assertEqual(contexto.exception.espera, 1.0)
+
+    def test_consumo_indevido(self):
+        armazenamento = ArmazenamentoLimiteMemoria()
+        limitador = self.limitador(armazenamento=armazenamento)
+        limitador.registrar_retorno(CHAVE, "656")
+        self.assertEqual(armazenamento.ler(CHAVE), (self.agora + 3600, 0.5))
+        with self.assertRaises(LimiteExcedido) as contexto:
+            limitador.adquirir(CHAVE)
+        self.assertEqual(contexto.exception.espera, 3600)
+
+        # Após o bloqueio a taxa é reduzida à metade
+        self.agora += 3600
+        for _ in range(3):
+            limitador.adquirir(CHAVE)
+        self.assertEqual(self.esperas, [2.0])
+
+        # e recuperada aos poucos a cada requisição bem sucedida
+        for _ in range(20):
+            limitador.registrar_retorno(CHAVE, "107")
+        self.assertEqual(armazenamento.ler(CHAVE)[1], 1.0)
+
+    def test_adquirir_async(self):
+        limitador = LimitadorRequisicoes(
+            regra_padrao=RegraLimite(capacidade=1, taxa=100.0), modo=MODO_FILA
+        )
+
+        async def adquirir():
+            await asyncio.gather(*(limitador.adquirir_async(CHAVE) for _ in range(3)))
+
+        with mock.patch("asyncio.sleep", wraps=asyncio.sleep) as sleep:
+            asyncio.run(adquirir())
+        self.assertEqual(sleep.call_count, 2)
+
+
+class LimitadorNFeTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.nfe = self.documento(versao="1.01")
+        self.nfe._cache_status_servico = None
+        self.nfe._limitador = LimitadorRequisicoes(
+            regra_padrao=RegraLimite(capacidade=1, taxa=0.001), modo=MODO_REJEITAR
+        )
+
+    def servicos_stub(self):
+        self.distribuicao = DistribuicaoSimulada(consumo_indevido=1)
+        return self.distribuicao.servicos()
+
+    def test_limite_por_servico(self):
+        self.assertEqual(self.nfe.status_servico().resposta.cStat, "107")
+        with self.assertRaises(LimiteExcedido) as contexto:
+            self.nfe.status_servico()
+        self.assertEqual(
+            contexto.exception.chave,
+            (self.certificate.cnpj_cpf, "35", "nfeStatusServicoNF"),
+        )
+        self.assertEqual(self.stub.contadores["nfeStatusServicoNF"], 1)
+
+    def test_consumo_indevido(self):
+        proc = self.nfe.consultar_distribuicao("09091076000144", "0".zfill(15))
+        self.assertEqual(proc.resposta.cStat, "656")
+        self.nfe._limitador.regra_padrao = RegraLimite(capacidade=10, taxa=1.0)
+        # O CNPJ fica bloqueado no serviço, sem novas requisições à SEFAZ
+        with self.assertRaises(LimiteExcedido):
+            self.nfe.consultar_distribuicao("09091076000144", "0".zfill(15))
+        self.assertEqual(len(self.distribuicao.consultas), 1)
+        self.assertEqual(self.nfe.status_servico().resposta.cStat, "107")
@@ -0,0 +1,95 @@
+from unittest import TestCase
+
+from erpbrasil.edoc import nfe as nfe_module
+from lxml import etree
+
+from .sefaz_stub import SefazStubMixin, monta_nfe
+
+
+class LoteNFeTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.nfe = self.documento()
+
+    def test_envia_lote(self):
+        documentos = dict(monta_nfe(numero) for numero in range(1, 4))
+        proc_envio = self.nfe.envia_lote(list(documentos.values()))
+        self.assertEqual(proc_envio.resposta.cStat, "103")
+        self.assertEqual(self.stub.contadores["nfeAutorizacaoLote"], 1)
+        nfes = proc_envio.envio_raiz.findall("{%s}NFe" % self.nfe._namespace)
+        self.assertEqual(len(nfes), 3)
+        self.assertEqual(proc_envio.envio_raiz.findtext("{*}indSinc"), "0")
+
+    def test_envia_lote_limite(self):
+        edocs = [monta_nfe(numero)[1] for numero in range(51)]
+        with self.assertRaises(ValueError):
+            self.nfe.envia_lote(edocs)
+        with self.assertRaises(ValueError):
+            self.nfe.envia_lote([])
+
+    def test_monta_lotes(self):
+        xmls = ["<NFe/>"] * 120
+        self.assertEqual(
+            [len(lote) for lote in self.nfe._monta_lotes(xmls)], [50, 50, 20]
+        )
+        grande = "x" * (nfe_module.NFE_LOTE_TAMANHO_MAXIMO // 2)
+        self.assertEqual(self.nfe._monta_lotes([grande, grande, grande]), [[0, 1], [2]])
+        with self.assertRaises(ValueError):
+            self.nfe._monta_lotes(["x" * (nfe_module.NFE_LOTE_TAMANHO_MAXIMO + 1)])
+
+    def test_processar_lote(self):
+        self.sefaz.consultas_em_processamento = 1
+        documentos = dict(monta_nfe(numero) for numero in range(1, 61))
+        processos = list(self.nfe.processar_lote(list(documentos.values())))
+
+        self.assertEqual(
+            [proc.webservice for proc in processos],
+            ["nfeAutorizacaoLote"] * 2 + ["nfeRetAutorizacaoLote"] * 2,
+        )
+        self.assertEqual(self.stub.contadores["nfeAutorizacaoLote"], 2)
+        self.assertEqual(self.stub.contadores["nfeRetAutorizacaoLote"], 4)
+
+        autorizadas = {}
+        for proc_recibo in processos[2:]:
+            self.assertEqual(proc_recibo.resposta.cStat, "104")
+            autorizadas.update(proc_recibo.processos)
+        self.assertEqual(set(autorizadas), set(documentos))
+        for chave, processo in autorizadas.items():
+            self.assertEqual(processo.find("{*}NFe/{*}infNFe").get("Id"), "NFe" + chave)
+            self.assertEqual(processo.findtext("{*}protNFe/{*}infProt/{*}chNFe"), chave)
+            self.assertIsNotNone(processo.find("{*}NFe/{*}Signature"))
+
+    def test_processar_documento_envio_xml(self):
+        chave, edoc = monta_nfe(1)
+        processos = list(self.nfe.processar_documento(edoc))
+        proc_envio = processos[0]
+        self.assertEqual(proc_envio.webservice, "nfeAutorizacaoLote")
+        self.assertIn(chave, processos[-1].processos)
+        # O XML do envio mantém a NF-e movida para o nfeProc pelo monta_processo
+        self.assertIsNone(proc_envio.envio_raiz.find("{*}NFe"))
+        envio = etree.fromstring(proc_envio.envio_xml)
+        self.assertEqual(envio.find("{*}NFe/{*}infNFe").get("Id"), "NFe" + chave)
+
+    def test_processar_lote_sincrono_um_documento(self):
+        self.nfe.envio_sincrono = True
+        chave, edoc = monta_nfe(1)
+        processos = list(self.nfe.processar_lote([edoc]))
+        self.assertEqual(len(processos), 1)
+        self.assertEqual(processos[0].resposta.cStat, "104")
+        self.assertIn(chave, processos[0].processos)
+        self.assertNotIn("nfeRetAutorizacaoLote", self.stub.contadores)
+
+    def test_enviar_lote_evento(self):
+        chaves = [monta_nfe(numero)[0] for numero in range(1, 3)]
+        eventos = [
+            self.nfe.cancela_documento(chave, "135000000000001", "Cancelamento teste")
+            for chave in chaves
+        ]
+        proc = self.nfe.enviar_lote_evento(eventos)
+        self.assertEqual(proc.resposta.cStat, "128")
+        self.assertEqual(
+            [ret.infEvento.chNFe for ret in proc.resposta.retEvento], chaves
+        )
+        self.assertEqual(
+            {ret.infEvento.cStat for ret in proc.resposta.retEvento}, {"135"}
+        )
@@ -1,9 +1,10 @@
 import logging.config
 import os
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import vcr
-from erpbrasil.edoc.mde import MDe, TransmissaoMDE
+from erpbrasil.edoc.mde import NAMESPACE_WSDL, MDe, TransmissaoMDE
+from lxml import etree
 from requests import Session
 
 from .test_certificate_mixin import TestCertificateMixin
@@ -80,3 +81,67 @@ class Tests(TestCertificateMixin, TestCase):
         )
 
         self.assertIn(ret.resposta.cStat, VALID_CSTAT_LIST)
+
+
+class TransmissaoMDETests(TestCertificateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.transmissao = TransmissaoMDE(self.certificate)
+        self.dist_dfe_int = etree.fromstring(
+            '<distDFeInt xmlns="http://www.portalfiscal.inf.br/nfe" versao="1.01">'
+            "<tpAmb>1</tpAmb><cUFAutor>35</cUFAutor></distDFeInt>"
+        )
+
+    def test_cabecalho_distribuicao(self):
+        args, kwargs = self.transmissao._argumentos(
+            self.dist_dfe_int, "nfeDistDFeInteresse", uf="SP"
+        )
+        self.assertEqual(args, ())
+        self.assertIs(kwargs["nfeDadosMsg"], self.dist_dfe_int)
+        (cabecalho,) = kwargs["_soapheaders"]
+        self.assertEqual(
+            etree.tostring(cabecalho).decode(),
+            f'<nfeCabecMsg xmlns="{NAMESPACE_WSDL}"><cUF>SP</cUF>'
+            "<versaoDados>1.00</versaoDados></nfeCabecMsg>",
+        )
+        args, kwargs = self.transmissao._argumentos(
+            self.dist_dfe_int, "nfeDistDFeInteresse", uf="SP"
+        )
+        self.assertIs(kwargs["_soapheaders"][0], cabecalho)
+
+    def test_mensagem_sem_cabecalho(self):
+        evento = etree.fromstring(
+            '<envEvento xmlns="http://www.portalfiscal.inf.br/nfe" versao="1.00"/>'
+        )
+        self.assertEqual(
+            self.transmissao._argumentos(evento, "nfeRecepcaoEventoNF", uf="SP"),
+            ((evento,), {}),
+        )
+        self.assertEqual(
+            self.transmissao._argumentos(self.dist_dfe_int, "nfeDistDFeInteresse"),
+            ((self.dist_dfe_int,), {}),
+        )
+
+    def test_interpretar_mensagem(self):
+        # Retorna a mensagem, como em TransmissaoSOAP
+        self.assertIs(
+            self.transmissao.interpretar_mensagem(
+                self.dist_dfe_int, operacao="nfeDistDFeInteresse", uf="SP"
+            ),
+            self.dist_dfe_int,
+        )
+        mensagem = self.transmissao.interpretar_mensagem(
+            etree.tostring(self.dist_dfe_int).decode()
+        )
+        self.assertEqual(etree.tostring(mensagem), etree.tostring(self.dist_dfe_int))
+
+    def test_enviar(self):
+        cliente = mock.MagicMock()
+        self.transmissao._cliente = cliente
+        self.transmissao.enviar("nfeDistDFeInteresse", self.dist_dfe_int, uf="SP")
+        cliente.service.__getitem__.assert_called_once_with("nfeDistDFeInteresse")
+        operacao = cliente.service.__getitem__.return_value
+        operacao.assert_called_once_with(
+            nfeDadosMsg=self.dist_dfe_int,
+            _soapheaders=[self.transmissao.cabecalho(NAMESPACE_WSDL, "SP")],
+        )
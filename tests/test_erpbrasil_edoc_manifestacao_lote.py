@@ -0,0 +1,91 @@
+from unittest import TestCase, mock
+
+from erpbrasil.edoc.distribuicao import DocumentoDistribuicao
+from erpbrasil.edoc.mde import (
+    CIENCIA_DA_OPERACAO,
+    OPERACAO_NAO_REALIZADA,
+    MDe,
+)
+from lxml import etree
+from requests import HTTPError
+
+from .sefaz_stub import SefazStubMixin, res_nfe
+
+CNPJ = "09091076000144"
+
+
+def chave_nfe(nsu):
+    return etree.fromstring(res_nfe(nsu).encode()).findtext("{*}chNFe")
+
+
+class ManifestacaoLoteTests(SefazStubMixin, TestCase):
+    modulos_localizar_url = ("nfe", "mde")
+
+    def setUp(self):
+        super().setUp()
+        self.mde = self.documento(MDe, versao="1.01")
+
+    def enviados(self):
+        return self.stub.contadores.get("nfeRecepcaoEventoNF", 0)
+
+    def test_manifestar_lote(self):
+        chaves = [chave_nfe(nsu) for nsu in range(1, 46)]
+        manifestacoes = [(chave, CIENCIA_DA_OPERACAO) for chave in chaves[:-1]]
+        manifestacoes.append(
+            (chaves[-1], OPERACAO_NAO_REALIZADA, "Mercadoria devolvida")
+        )
+        with mock.patch.object(
+            self.mde, "assina_raizes", wraps=self.mde.assina_raizes
+        ) as assina:
+            resultados = self.mde.manifestar_lote(manifestacoes, CNPJ)
+        self.assertEqual(self.enviados(), 3)
+        self.assertEqual(
+            [len(chamada.args[0]) for chamada in assina.call_args_list], [20, 20, 5]
+        )
+        self.assertEqual(list(resultados), chaves)
+        for chave, resultado in resultados.items():
+            self.assertEqual(resultado.c_stat, "135")
+            self.assertEqual(resultado.ret_evento.infEvento.chNFe, chave)
+            self.assertIsNone(resultado.erro)
+        self.assertEqual(resultados[chaves[-1]].tp_evento, OPERACAO_NAO_REALIZADA)
+
+    def test_falha_registrada(self):
+        # O _post do MDe passa pelos mesmos registros do DocumentoEletronico
+        self.mde._monitor_saude = mock.Mock()
+        self.mde._cache_status_servico = mock.Mock()
+        self.stub.indisponivel = True
+        with self.assertRaises(HTTPError):
+            self.mde.ciencia_da_operacao(chave_nfe(1), CNPJ)
+        self.mde._monitor_saude.registrar_falha.assert_called_once()
+        self.mde._cache_status_servico.invalidar.assert_called_once()
+
+        self.stub.indisponivel = False
+        self.mde.ciencia_da_operacao(chave_nfe(1), CNPJ)
+        self.mde._monitor_saude.registrar_sucesso.assert_called_once()
+
+    def test_manifestacao_repetida(self):
+        chave = chave_nfe(1)
+        with self.assertRaises(ValueError):
+            self.mde.manifestar_lote(
+                [(chave, CIENCIA_DA_OPERACAO), (chave, OPERACAO_NAO_REALIZADA)], CNPJ
+            )
+        self.assertEqual(self.enviados(), 0)
+
+    def test_falha_no_envio(self):
+        self.stub.indisponivel = True
+        resultados = self.mde.ciencia_da_operacao_lote([chave_nfe(1)], CNPJ)
+        self.assertIsNone(resultados[chave_nfe(1)].ret_evento)
+        self.assertIsNotNone(resultados[chave_nfe(1)].erro)
+
+    def test_ciencia_da_operacao_distribuicao(self):
+        cancelada = res_nfe(2).replace("<cSitNFe>1</cSitNFe>", "<cSitNFe>3</cSitNFe>")
+        documentos = [
+            DocumentoDistribuicao("1", "resNFe_v1.01.xsd", res_nfe(1).encode()),
+            DocumentoDistribuicao("2", "resNFe_v1.01.xsd", cancelada.encode()),
+            DocumentoDistribuicao("3", "procNFe_v4.00.xsd", b"<nfeProc/>"),
+            DocumentoDistribuicao("4", "resNFe_v1.01.xsd", res_nfe(1).encode()),
+        ]
+        resultados = self.mde.ciencia_da_operacao_distribuicao(documentos, CNPJ)
+        self.assertEqual(list(resultados), [chave_nfe(1)])
+        self.assertEqual(resultados[chave_nfe(1)].tp_evento, CIENCIA_DA_OPERACAO)
+        self.assertEqual(self.enviados(), 1)
@@ -0,0 +1,66 @@
+from unittest import TestCase, mock
+
+from erpbrasil.edoc.mensagem import (
+    CONS_CAD,
+    CONS_SIT_NFE,
+    CONS_STAT_SERV,
+)
+from erpbrasil.edoc.nfe import NFe
+from nfelib.v4_00 import retConsCad, retConsSitNFe
+
+CHAVE = "35200159594315000157550010000000012062777161"
+
+
+class MensagemTests(TestCase):
+    def setUp(self):
+        self.nfe = NFe(mock.Mock(), "35", versao="4.00", ambiente="2")
+        self.nfe._url = mock.Mock(return_value="https://sefaz")
+
+    def binding(self, metodo, *args):
+        with mock.patch.object(self.nfe, "_mensagens_modelo", False):
+            raiz = metodo(*args)[0]
+        return self.nfe._generateds_to_string_etree(raiz)[0]
+
+    def test_modelos_iguais_binding(self):
+        for metodo, args in (
+            (self.nfe._prepara_status_servico, ()),
+            (self.nfe._prepara_consulta_documento, (CHAVE,)),
+            (self.nfe._prepara_consulta_recibo, ("351000000000001",)),
+        ):
+            raiz = metodo(*args)[0]
+            self.assertIsInstance(raiz, str)
+            self.assertEqual(raiz, self.binding(metodo, *args))
+
+    def test_cons_cad_igual_binding(self):
+        for identificacao in (
+            {"CNPJ": "59594315000157"},
+            {"CPF": "12345678909"},
+            {"IE": "ISENTO"},
+        ):
+            binding = retConsCad.TConsCad(
+                versao="2.00",
+                infCons=retConsCad.infConsType(
+                    xServ="CONS-CAD", UF="SP", **identificacao
+                ),
+            )
+            binding.original_tagname_ = "ConsCad"
+            self.assertEqual(
+                CONS_CAD.montar(UF="SP", **identificacao),
+                self.nfe._generateds_to_string_etree(binding)[0],
+            )
+
+    def test_valor_fora_do_padrao_utiliza_binding(self):
+        self.assertIsNone(CONS_SIT_NFE.montar(versao="4.00", tpAmb="2", chNFe="1"))
+        self.assertIsNone(CONS_STAT_SERV.montar(versao="4.00", tpAmb="2"))
+        self.assertIsNone(CONS_CAD.montar(UF="SP", CNPJ="<59594315000157>"))
+        raiz = self.nfe._prepara_consulta_documento("NFe" + CHAVE)[0]
+        self.assertIsInstance(raiz, retConsSitNFe.TConsSitNFe)
+        self.assertEqual(raiz.chNFe, "NFe" + CHAVE)
+
+    def test_consultar_cadastro(self):
+        with mock.patch.object(self.nfe, "_post") as post:
+            self.nfe.consultar_cadastro("SP", cnpj="59594315000157")
+        raiz, url, operacao, classe = post.call_args[0]
+        self.assertEqual(raiz, CONS_CAD.montar(UF="SP", CNPJ="59594315000157"))
+        self.assertIn("<CNPJ>59594315000157</CNPJ></infCons>", raiz)
+        self.assertEqual(operacao, "consultaCadastro")
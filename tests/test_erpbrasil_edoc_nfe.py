@@ -1,6 +1,15 @@
-from unittest import TestCase
+from unittest import TestCase, mock
 
-from erpbrasil.edoc.nfe import NFe
+from erpbrasil.edoc.nfe import (
+    LACUNAS_ROTAS,
+    ROTAS,
+    WS_DFE_DISTRIBUICAO,
+    WS_NFE_AUTORIZACAO,
+    WS_NFE_CADASTRO,
+    WS_NFE_CONSULTA,
+    NFe,
+    localizar_url,
+)
 from lxml import etree
 
 
@@ -54,3 +63,50 @@ class NFeTests(TestCase):
         child_tags = [child.tag for child in children]
         self.assertIn("{http://www.portalfiscal.inf.br/nfe}NFe", child_tags)
         self.assertIn("{http://www.portalfiscal.inf.br/nfe}protNFe", child_tags)
+
+
+class RotasTests(TestCase):
+    def test_rotas(self):
+        self.assertEqual(
+            localizar_url(WS_NFE_AUTORIZACAO, "35", "55", 1),
+            "https://nfe.fazenda.sp.gov.br/ws/nfeautorizacao4.asmx?wsdl",
+        )
+        self.assertEqual(
+            localizar_url(WS_NFE_CADASTRO, "43", "55", 2),
+            "https://cad.sefazrs.rs.gov.br/"
+            "ws/cadconsultacadastro/cadconsultacadastro4.asmx?wsdl",
+        )
+        self.assertEqual(
+            localizar_url(WS_NFE_AUTORIZACAO, "35", "55", 1, True),
+            "https://www.svc.fazenda.gov.br/NFeAutorizacao4/NFeAutorizacao4.asmx?wsdl",
+        )
+        self.assertEqual(
+            localizar_url(WS_DFE_DISTRIBUICAO, "29", "55", 2),
+            localizar_url(WS_DFE_DISTRIBUICAO, "91", "55", 2),
+        )
+
+    def test_lacunas(self):
+        # SVAN (MA) não atende a consulta cadastro
+        self.assertIn(("21", "55", 1, False, WS_NFE_CADASTRO), LACUNAS_ROTAS)
+        with self.assertRaisesRegex(KeyError, "UF 21"):
+            localizar_url(WS_NFE_CADASTRO, "21", "55", 1)
+
+    def test_modelo_fora_das_rotas(self):
+        # O autorizador do CE não divide as URLs por modelo
+        self.assertNotIn(("23", "57", 2, False, WS_NFE_CONSULTA), ROTAS)
+        self.assertEqual(
+            localizar_url(WS_NFE_CONSULTA, "23", "57", 2),
+            localizar_url(WS_NFE_CONSULTA, "23", "55", 2),
+        )
+        with self.assertRaisesRegex(KeyError, "modelo 57"):
+            localizar_url(WS_NFE_CONSULTA, "35", "57", 2)
+
+    def test_rotas_resolvidas_na_nfe(self):
+        nfe = NFe(False, "35", versao="4.00", ambiente="2")
+        with mock.patch(
+            "erpbrasil.edoc.nfe.localizar_url", wraps=localizar_url
+        ) as localizar:
+            for _ in range(3):
+                url = nfe._url(WS_NFE_AUTORIZACAO)
+        self.assertEqual(url, ROTAS[("35", "55", 2, False, WS_NFE_AUTORIZACAO)])
+        localizar.assert_called_once()
@@ -0,0 +1,108 @@
+import base64
+import os
+import threading
+from unittest import TestCase, mock
+
+from erpbrasil.assinatura.certificado import Certificado
+from erpbrasil.edoc import pool as pool_module
+from erpbrasil.edoc.nfe import NFe
+from erpbrasil.transmissao import TransmissaoSOAP
+
+from .sefaz_stub import SefazStubMixin
+
+
+class PoolClientesTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.pool.tamanho_maximo = 2
+        self.nfe = self.documento()
+
+    def test_reutiliza_cliente(self):
+        for _ in range(3):
+            self.assertEqual(self.nfe.status_servico().resposta.cStat, "107")
+        self.assertEqual(self.stub.contadores["wsdl"], 1)
+        self.assertEqual(self.stub.contadores["nfeStatusServicoNF"], 3)
+        self.assertEqual(len(self.pool), 1)
+        self.assertFalse(self.nfe._transmissao._cliente)
+
+    def test_sem_pool(self):
+        self.nfe._pool_clientes = None
+        self.nfe._transmissao._cache = None
+        for _ in range(2):
+            self.assertEqual(self.nfe.status_servico().resposta.cStat, "107")
+        self.assertEqual(self.stub.contadores["wsdl"], 2)
+        self.assertEqual(len(self.pool), 0)
+
+    def test_descarta_ociosos(self):
+        self.nfe.status_servico()
+        self.pool.tempo_ocioso = 0
+        self.nfe.status_servico()
+        self.assertEqual(self.stub.contadores["wsdl"], 2)
+        self.assertEqual(len(self.pool), 1)
+
+    def test_tamanho_maximo(self):
+        with mock.patch("erpbrasil.edoc.nfe.localizar_url") as localizar_url:
+            for consulta in ("a", "b", "c"):
+                localizar_url.return_value = (
+                    self.stub.url("NFeStatusServico4") + "&consulta=" + consulta
+                )
+                # A NFe guarda as URLs já resolvidas
+                self.nfe._rotas.clear()
+                self.nfe.status_servico()
+        self.assertEqual(len(self.pool), 2)
+        self.assertEqual(len(self.pool._sessoes), 1)
+        self.pool.limpar()
+        self.assertEqual(len(self.pool._sessoes), 0)
+
+    def test_clientes_por_thread(self):
+        urls = [
+            self.stub.url("NFeStatusServico4") + "&consulta=" + consulta
+            for consulta in ("a", "b")
+        ]
+        entrada = threading.Barrier(2)
+        clientes = {}
+
+        def usar(url):
+            with self.pool.cliente(self.nfe._transmissao, url) as cliente:
+                entrada.wait(5)
+                clientes[url] = (cliente, self.nfe._transmissao._cliente.cliente)
+                entrada.wait(5)
+
+        threads = [threading.Thread(target=usar, args=(url,)) for url in urls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for cliente, cliente_transmissao in clientes.values():
+            self.assertIs(cliente, cliente_transmissao)
+        self.assertIsNot(clientes[urls[0]][0], clientes[urls[1]][0])
+        self.assertFalse(self.nfe._transmissao._cliente)
+
+    def test_chave_privada_fora_do_disco(self):
+        arquivos = []
+        arquivo_certificado = pool_module.ArquivoCertificado
+
+        def registrar(*args):
+            arquivo = arquivo_certificado(*args)
+            arquivos.extend([arquivo.key_path, arquivo.cert_path])
+            return arquivo
+
+        with mock.patch.object(pool_module, "ArquivoCertificado", registrar):
+            self.assertEqual(self.nfe.status_servico().resposta.cStat, "107")
+        self.assertEqual(len(arquivos), 2)
+        self.assertFalse([arquivo for arquivo in arquivos if os.path.exists(arquivo)])
+        self.assertEqual(self.nfe.status_servico().resposta.cStat, "107")
+
+    def test_certificados_iguais_compartilham_cliente(self):
+        self.nfe.status_servico()
+        # O mesmo certificado (PFX), carregado em outro objeto Certificado
+        certificado = Certificado(
+            base64.b64encode(self.certificate._arquivo), self.certificate._senha
+        )
+        outra = TransmissaoSOAP(certificado, cache=False)
+        self.assertIsNot(outra.certificado, self.nfe._transmissao.certificado)
+        nfe = NFe(outra, "35", versao="4.00", ambiente="2")
+        nfe._pool_clientes = self.pool
+        self.assertEqual(nfe.status_servico().resposta.cStat, "107")
+        self.assertEqual(self.stub.contadores["wsdl"], 1)
+        self.assertEqual(len(self.pool._sessoes), 1)
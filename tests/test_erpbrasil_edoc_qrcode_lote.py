@@ -0,0 +1,98 @@
+import csv
+import io
+import os
+import tempfile
+from unittest import TestCase, mock, skipUnless
+
+from erpbrasil.edoc import qrcode_lote
+from erpbrasil.edoc.mdfe import MDFe
+from erpbrasil.edoc.nfce import NFCe
+from erpbrasil.edoc.qrcode_lote import (
+    QRCodeMDFe,
+    QRCodeNFCe,
+    gravar_csv,
+    gravar_parquet,
+)
+
+from .sefaz_stub import monta_nfe
+
+DIGEST_VALUE = "K5XNc/Yvko52bOUfIRPzlx55rI4="
+
+
+class QRCodeLoteTests(TestCase):
+    def setUp(self):
+        self.nfce = NFCe(
+            mock.Mock(), "35", ambiente="2", csc_token="000001", csc_code="CSC"
+        )
+        self.gerador = QRCodeNFCe("35", "2", "000001", "CSC")
+        self.documentos = [
+            monta_nfe(numero, "65", 1, tp_emis="9") for numero in range(1, 6)
+        ]
+        self.chaves = [chave for chave, edoc in self.documentos]
+
+    def test_qrcodes_iguais_nfce(self):
+        self.assertEqual(
+            list(self.gerador.qrcodes(self.chaves)),
+            [self.nfce.monta_qrcode(chave) for chave in self.chaves],
+        )
+
+    def test_qrcodes_contingencia_iguais_nfce(self):
+        edocs = [edoc for chave, edoc in self.documentos]
+        self.assertEqual(
+            list(
+                self.gerador.qrcodes_contingencia(
+                    self.chaves,
+                    [edoc.infNFe.ide.dhEmi for edoc in edocs],
+                    [edoc.infNFe.total.ICMSTot.vNF for edoc in edocs],
+                    [DIGEST_VALUE] * len(edocs),
+                )
+            ),
+            [
+                self.nfce._generate_qrcode_contingency(edoc, DIGEST_VALUE)
+                for edoc in edocs
+            ],
+        )
+
+    def test_qrcodes_mdfe(self):
+        mdfe = MDFe(mock.Mock(), "35", ambiente="2")
+        gerador = QRCodeMDFe("2")
+        self.assertEqual(
+            list(gerador.qrcodes(self.chaves)),
+            [mdfe.monta_qrcode(chave) for chave in self.chaves],
+        )
+        self.assertEqual(
+            list(gerador.qrcodes_contingencia(self.chaves[:1], [DIGEST_VALUE])),
+            [
+                mdfe.monta_qrcode(self.chaves[0])
+                + "&sign=4b35584e632f59766b6f3532624f55664952507a6c7835357249343d"
+            ],
+        )
+
+    def test_gravar_csv(self):
+        arquivo = io.StringIO()
+        with mock.patch.object(qrcode_lote, "TAMANHO_LOTE_GRAVACAO", 2):
+            quantidade = gravar_csv(
+                arquivo, self.chaves, self.gerador.qrcodes(self.chaves)
+            )
+        self.assertEqual(quantidade, 5)
+        linhas = list(csv.reader(io.StringIO(arquivo.getvalue())))
+        self.assertEqual(linhas[0], ["chave", "qrcode"])
+        self.assertEqual(
+            linhas[1:],
+            [[chave, self.nfce.monta_qrcode(chave)] for chave in self.chaves],
+        )
+
+    def test_gravar_parquet_sem_pyarrow(self):
+        with mock.patch.object(qrcode_lote, "pyarrow", None), self.assertRaisesRegex(
+            ImportError, r"erpbrasil\.edoc\[parquet\]"
+        ):
+            gravar_parquet("qrcodes.parquet", self.chaves, [])
+
+    @skipUnless(qrcode_lote.pyarrow is not None, "pyarrow não instalado")
+    def test_gravar_parquet(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        caminho = os.path.join(diretorio.name, "qrcodes.parquet")
+        gravar_parquet(caminho, self.chaves, self.gerador.qrcodes(self.chaves))
+        tabela = qrcode_lote.pyarrow.parquet.read_table(caminho)
+        self.assertEqual(tabela.column("chave").to_pylist(), self.chaves)
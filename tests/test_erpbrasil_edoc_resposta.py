@@ -0,0 +1,93 @@
+from unittest import TestCase
+
+from erpbrasil.edoc.resposta import (
+    analisar_retorno_raw,
+    localizar_corpo_soap,
+    localizar_resultado,
+)
+from nfelib.v4_00 import retConsStatServ
+
+RET_CONS_STAT_SERV = (
+    '<retConsStatServ versao="4.00" xmlns="http://www.portalfiscal.inf.br/nfe">'
+    "<tpAmb>1</tpAmb><verAplic>SP_NFE_PL009_V4</verAplic><cStat>107</cStat>"
+    "<xMotivo>Servico em Operacao</xMotivo><cUF>35</cUF>"
+    "<dhRecbto>2020-11-20T08:14:32-03:00</dhRecbto><tMed>1</tMed>"
+    "</retConsStatServ>"
+)
+
+
+class RetornoFake:
+    def __init__(self, text):
+        self.text = text
+        self.content = text.encode("utf-8")
+
+    def raise_for_status(self):
+        pass
+
+
+def envelope(prefixo, namespace, corpo):
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<{prefixo}:Envelope xmlns:{prefixo}="{namespace}">'
+        f"<{prefixo}:Header/>"
+        f"<{prefixo}:Body>"
+        '<nfeResultMsg xmlns="http://www.portalfiscal.inf.br/nfe/wsdl/'
+        f'NFeStatusServico4">\n{corpo}\n</nfeResultMsg>'
+        f"</{prefixo}:Body></{prefixo}:Envelope>"
+    )
+
+
+class RespostaTests(TestCase):
+    def test_analisar_retorno_soap11(self):
+        retorno = RetornoFake(
+            envelope(
+                "soap", "http://schemas.xmlsoap.org/soap/envelope/", RET_CONS_STAT_SERV
+            )
+        )
+        proc = analisar_retorno_raw(
+            "nfeStatusServicoNF", None, "", retorno, retConsStatServ
+        )
+        self.assertEqual(proc.resposta.cStat, "107")
+        self.assertEqual(proc.resposta.tMed, "1")
+
+    def test_analisar_retorno_soap12(self):
+        for prefixo in ("soap12", "env"):
+            retorno = RetornoFake(
+                envelope(
+                    prefixo,
+                    "http://www.w3.org/2003/05/soap-envelope",
+                    RET_CONS_STAT_SERV,
+                )
+            )
+            proc = analisar_retorno_raw(
+                "nfeStatusServicoNF", None, "", retorno, retConsStatServ
+            )
+            self.assertEqual(proc.resposta.cStat, "107")
+
+    def test_localizar_corpo_soap_invalido(self):
+        self.assertIsNone(localizar_corpo_soap(b"<html>erro</html>"))
+        self.assertIsNone(localizar_corpo_soap(b"Service Unavailable"))
+
+    def test_localizar_resultado_sem_o_nome_da_classe(self):
+        # A tag não contém o nome da classe: primeiro filho do resultado
+        corpo = localizar_corpo_soap(
+            envelope(
+                "soap",
+                "http://schemas.xmlsoap.org/soap/envelope/",
+                '<retConsStatServMDFe versao="3.00" '
+                'xmlns="http://www.portalfiscal.inf.br/mdfe">'
+                "<cStat>107</cStat></retConsStatServMDFe>",
+            )
+        )
+        resultado = localizar_resultado(corpo, "RetConsStatServMdfe")
+        self.assertEqual(
+            resultado.tag, "{http://www.portalfiscal.inf.br/mdfe}retConsStatServMDFe"
+        )
+        # O resultado do webservice nunca é retornado no lugar do filho
+        corpo = localizar_corpo_soap(
+            envelope(
+                "soap", "http://schemas.xmlsoap.org/soap/envelope/", RET_CONS_STAT_SERV
+            )
+        )
+        resultado = localizar_resultado(corpo, "nfeResultMsg")
+        self.assertTrue(resultado.tag.endswith("}retConsStatServ"))
@@ -0,0 +1,146 @@
+from unittest import TestCase
+
+from erpbrasil.edoc.saude import CIRCUITO_ABERTO, CIRCUITO_FECHADO, MonitorSaude
+from erpbrasil.edoc.status import CacheStatusServico
+from requests import HTTPError
+
+from .sefaz_stub import SERVICOS_STUB, SefazSimulada, SefazStubMixin, monta_nfe
+
+URL = "https://nfe.fazenda.sp.gov.br/ws/nfeautorizacao4.asmx"
+
+
+class MonitorSaudeTests(TestCase):
+    def setUp(self):
+        self.agora = 0
+        self.monitor = MonitorSaude(
+            limite_falhas=3, tempo_abertura=60, relogio=lambda: self.agora
+        )
+
+    def test_abre_apos_falhas_consecutivas(self):
+        self.monitor.registrar_falha(URL, timeout=True)
+        self.monitor.registrar_falha(URL, 0.5)
+        self.monitor.registrar_sucesso(URL, 0.1)
+        self.monitor.registrar_falha(URL, paralisado=True)
+        self.monitor.registrar_falha(URL)
+        self.assertTrue(self.monitor.disponivel(URL))
+        self.monitor.registrar_falha(URL)
+        self.assertFalse(self.monitor.disponivel(URL))
+
+        saude = self.monitor.saude(URL)
+        self.assertEqual(saude.estado, CIRCUITO_ABERTO)
+        self.assertEqual((saude.falhas, saude.timeouts, saude.paralisacoes), (5, 1, 1))
+        self.assertAlmostEqual(saude.latencia_media, 0.3)
+
+    def test_requisicao_de_teste(self):
+        for _ in range(3):
+            self.monitor.registrar_falha(URL)
+        self.agora = 59
+        self.assertFalse(self.monitor.disponivel(URL))
+        self.agora = 60
+        # Somente uma requisição de teste é liberada
+        self.assertTrue(self.monitor.disponivel(URL))
+        self.assertFalse(self.monitor.disponivel(URL))
+
+        self.monitor.registrar_falha(URL)
+        self.assertFalse(self.monitor.disponivel(URL))
+        self.agora = 120
+        self.assertTrue(self.monitor.disponivel(URL))
+        self.monitor.registrar_sucesso(URL, 0.1)
+        self.assertEqual(self.monitor.saude(URL).estado, CIRCUITO_FECHADO)
+        self.assertTrue(self.monitor.disponivel(URL))
+
+    def test_varios_testes_para_fechar(self):
+        self.monitor.sucessos_teste = 2
+        for _ in range(3):
+            self.monitor.registrar_falha(URL)
+        self.agora = 60
+        self.assertTrue(self.monitor.disponivel(URL))
+        self.monitor.registrar_sucesso(URL, 0.1)
+        self.assertEqual(self.monitor.saude(URL).estado, "meio_aberto")
+        self.assertTrue(self.monitor.disponivel(URL))
+        self.monitor.registrar_sucesso(URL, 0.1)
+        self.assertEqual(self.monitor.saude(URL).estado, CIRCUITO_FECHADO)
+
+
+class ContingenciaAutomaticaTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.normal = self.stub
+        self.svc = self.inicia_stub(SefazSimulada().servicos())
+
+        self.agora = 0
+        self.nfe = self.documento(contingencia_automatica=True)
+        self.nfe._cache_status_servico = None
+        self.nfe._monitor_saude = MonitorSaude(relogio=lambda: self.agora)
+
+    def url_stub(self, servico, estado, mod, ambiente, contingencia=False):
+        stub = self.svc if contingencia else self.normal
+        return stub.url(SERVICOS_STUB[servico])
+
+    def test_failover_svc(self):
+        self.normal.indisponivel = True
+        for _ in range(3):
+            with self.assertRaises(HTTPError):
+                self.nfe.status_servico()
+        proc_servico = self.nfe.status_servico()
+        self.assertEqual(proc_servico.resposta.cStat, "107")
+        self.assertEqual(proc_servico.contingencia, "SVC-AN")
+
+        # O circuito é mantido por serviço: a autorização ainda é normal
+        self.assertEqual(self.nfe.tipo_emissao(), "1")
+        for numero in range(3):
+            chave, edoc = monta_nfe(numero + 10)
+            edoc.infNFe.ide.tpEmis = self.nfe.tipo_emissao()
+            with self.assertRaises(HTTPError):
+                self.nfe.envia_documento(edoc)
+        self.assertEqual(self.nfe.tipo_emissao(), "6")
+
+        # A NF-e emitida em contingência e o seu recibo utilizam a SVC
+        chave, edoc = monta_nfe(1)
+        edoc.infNFe.ide.tpEmis = self.nfe.tipo_emissao()
+        processos = list(self.nfe.processar_documento(edoc))
+        self.assertEqual([p.resposta.cStat for p in processos], ["103", "104"])
+        self.assertEqual([p.contingencia for p in processos], ["SVC-AN"] * 2)
+        self.assertEqual(self.svc.contadores["nfeAutorizacaoLote"], 1)
+        self.assertEqual(self.svc.contadores["nfeRetAutorizacaoLote"], 1)
+
+        # O autorizador volta a operar: a requisição de teste fecha o circuito
+        self.normal.indisponivel = False
+        self.agora = 60
+        self.assertEqual(self.nfe.status_servico().contingencia, False)
+        self.assertEqual(self.nfe.tipo_emissao(), "1")
+        self.assertEqual(self.normal.contadores["nfeStatusServicoNF"], 1)
+
+    def test_cache_status_por_autorizador(self):
+        self.nfe._cache_status_servico = CacheStatusServico(ttl=600)
+        self.normal.indisponivel = True
+        for _ in range(3):
+            with self.assertRaises(HTTPError):
+                self.nfe.status_servico_cache()
+        self.assertEqual(self.nfe.status_servico_cache().contingencia, "SVC-AN")
+        self.assertEqual(self.nfe.status_servico_cache().contingencia, "SVC-AN")
+        self.assertEqual(self.svc.contadores["nfeStatusServicoNF"], 1)
+
+        # Com o circuito fechado o status da SVC não é reaproveitado, e a
+        # chave do cache não consome a requisição de teste
+        self.normal.indisponivel = False
+        self.agora = 60
+        self.nfe._chave_status_servico()
+        self.assertEqual(self.nfe.status_servico_cache().contingencia, False)
+        self.assertEqual(self.normal.contadores["nfeStatusServicoNF"], 1)
+
+    def test_envio_normal_segue_tp_emis(self):
+        chave, edoc = monta_nfe(1)
+        edoc.infNFe.ide.tpEmis = "1"
+        processos = list(self.nfe.processar_documento(edoc))
+        self.assertFalse(processos[0].contingencia)
+        self.assertEqual(self.normal.contadores["nfeAutorizacaoLote"], 1)
+        self.assertEqual(self.svc.contadores["nfeAutorizacaoLote"], 0)
+
+    def test_sem_contingencia_automatica(self):
+        self.nfe.contingencia_automatica = False
+        self.normal.indisponivel = True
+        for _ in range(4):
+            with self.assertRaises(HTTPError):
+                self.nfe.status_servico()
+        self.assertEqual(self.nfe.tipo_emissao(), "1")
@@ -0,0 +1,150 @@
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+from erpbrasil.edoc.status import CacheStatusServico
+from requests import HTTPError
+
+from .sefaz_stub import SefazStubMixin, monta_nfe
+
+CHAVE = (35, "55", "2", False)
+
+
+def proc_status(c_stat="107", conteudo=b"<retConsStatServ/>"):
+    return SimpleNamespace(
+        resposta=SimpleNamespace(cStat=c_stat),
+        retorno=SimpleNamespace(content=conteudo),
+    )
+
+
+class CacheStatusServicoTests(TestCase):
+    def setUp(self):
+        self.agora = 1000.0
+        self.cache = CacheStatusServico(ttl=60, relogio=lambda: self.agora)
+
+    def test_ttl(self):
+        consultar = mock.Mock(side_effect=lambda: proc_status())
+        primeira = self.cache.obter(CHAVE, consultar)
+        self.assertIs(self.cache.obter(CHAVE, consultar), primeira)
+        self.assertEqual(consultar.call_count, 1)
+        self.assertEqual((self.cache.acertos, self.cache.faltas), (1, 1))
+
+        self.agora += 60
+        self.assertIsNot(self.cache.obter(CHAVE, consultar), primeira)
+        self.assertEqual(consultar.call_count, 2)
+        # Chaves diferentes não compartilham a consulta
+        self.cache.obter((35, "65", "2", False), consultar)
+        self.assertEqual(consultar.call_count, 3)
+
+    def test_servico_paralisado(self):
+        consultar = mock.Mock(side_effect=lambda: proc_status("108"))
+        self.cache.obter(CHAVE, consultar)
+        self.agora += 14
+        self.cache.obter(CHAVE, consultar)
+        self.assertEqual(consultar.call_count, 1)
+        # A paralisação é consultada novamente após o ttl_paralisado
+        self.agora += 1
+        consultar.side_effect = lambda: proc_status()
+        self.assertEqual(self.cache.obter(CHAVE, consultar).resposta.cStat, "107")
+        self.agora += 59
+        self.cache.obter(CHAVE, consultar)
+        self.assertEqual(consultar.call_count, 2)
+
+    def test_invalidar(self):
+        consultar = mock.Mock(side_effect=lambda: proc_status())
+        self.cache.obter(CHAVE, consultar)
+        self.cache.invalidar(CHAVE)
+        self.cache.obter(CHAVE, consultar)
+        self.assertEqual(consultar.call_count, 2)
+        self.assertEqual(self.cache.contadores["invalidacoes"], 1)
+
+    def test_sem_resposta_nao_armazena(self):
+        consultar = mock.Mock(return_value=None)
+        self.cache.obter(CHAVE, consultar)
+        self.cache.obter(CHAVE, consultar)
+        self.assertEqual(consultar.call_count, 2)
+
+    def test_consultas_simultaneas(self):
+        cache = CacheStatusServico(ttl=60)
+        consultas = []
+
+        def consultar():
+            consultas.append(1)
+            time.sleep(0.2)
+            return proc_status()
+
+        resultados = []
+        threads = [
+            threading.Thread(
+                target=lambda: resultados.append(cache.obter(CHAVE, consultar))
+            )
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(len({id(proc) for proc in resultados}), 1)
+        self.assertEqual((cache.acertos, cache.faltas), (9, 1))
+
+    def test_compartilhado_entre_processos(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            relogio = lambda: self.agora  # noqa: E731
+            outro_processo = CacheStatusServico(60, diretorio, relogio)
+            outro_processo.obter(CHAVE, lambda: proc_status(conteudo=b"<ok/>"))
+
+            cache = CacheStatusServico(60, diretorio, relogio)
+            carregar = mock.Mock(
+                side_effect=lambda conteudo: proc_status(conteudo=conteudo)
+            )
+            consultar = mock.Mock()
+            proc = cache.obter(CHAVE, consultar, carregar)
+            self.assertEqual(proc.retorno.content, b"<ok/>")
+            consultar.assert_not_called()
+
+            outro_processo.invalidar(CHAVE)
+            cache.limpar()
+            consultar.return_value = proc_status()
+            cache.obter(CHAVE, consultar, carregar)
+            consultar.assert_called_once()
+
+
+class StatusServicoNFeTests(SefazStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = CacheStatusServico(ttl=60)
+
+    def nfe(self):
+        nfe = self.documento()
+        nfe._cache_status_servico = self.cache
+        nfe._consulta_servico_ao_enviar = True
+        return nfe
+
+    def test_processar_documento(self):
+        for numero in range(1, 4):
+            processos = list(self.nfe().processar_documento(monta_nfe(numero)[1]))
+            self.assertEqual(processos[0].resposta.cStat, "107")
+        self.assertEqual(self.stub.contadores["nfeStatusServicoNF"], 1)
+        self.assertEqual(self.stub.contadores["nfeAutorizacaoLote"], 3)
+        self.assertEqual((self.cache.acertos, self.cache.faltas), (2, 1))
+
+    def test_falha_transmissao_invalida(self):
+        nfe = self.nfe()
+        nfe.status_servico_cache()
+        raiz, url, operacao, classe = nfe._prepara_status_servico()
+        with self.assertRaises(HTTPError):
+            nfe._post(raiz, self.stub.url("Inexistente"), operacao, classe)
+        nfe.status_servico_cache()
+        self.assertEqual(self.stub.contadores["nfeStatusServicoNF"], 2)
+
+    def test_compartilhado_entre_processos(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            self.cache = CacheStatusServico(ttl=60, diretorio=diretorio)
+            self.nfe().status_servico_cache()
+            self.cache = CacheStatusServico(ttl=60, diretorio=diretorio)
+            proc_servico = self.nfe().status_servico_cache()
+        self.assertEqual(proc_servico.resposta.cStat, "107")
+        self.assertEqual(self.stub.contadores["nfeStatusServicoNF"], 1)
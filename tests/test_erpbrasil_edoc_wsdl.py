@@ -0,0 +1,119 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from erpbrasil.edoc import cli
+from erpbrasil.edoc.nfe import NFe
+from erpbrasil.edoc.pool import PoolClientes
+from erpbrasil.edoc.wsdl import CacheWSDL, atualizar_cache_wsdl, urls_wsdl
+from erpbrasil.transmissao import TransmissaoSOAP
+
+from .sefaz_stub import ServidorSefazStub
+from .test_certificate_mixin import TestCertificateMixin
+
+
+class CacheWSDLTests(TestCertificateMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+
+    def test_add_get(self):
+        cache = CacheWSDL(self.diretorio.name)
+        self.assertIsNone(cache.get("https://exemplo/ws?wsdl"))
+        cache.add("https://exemplo/ws?wsdl", b"<definitions/>")
+        self.assertEqual(len(os.listdir(self.diretorio.name)), 1)
+        # Nova instância: o documento é lido do disco
+        cache = CacheWSDL(self.diretorio.name)
+        self.assertEqual(cache.get("https://exemplo/ws?wsdl"), b"<definitions/>")
+
+    def test_urls_wsdl(self):
+        urls = urls_wsdl()
+        self.assertIn(
+            "https://nfe.fazenda.sp.gov.br/ws/nfestatusservico4.asmx?wsdl", urls
+        )
+        self.assertIn(
+            "https://www1.nfe.fazenda.gov.br/NFeDistribuicaoDFe/"
+            "NFeDistribuicaoDFe.asmx?wsdl",
+            urls,
+        )
+        self.assertIn(
+            "https://mdfe.svrs.rs.gov.br/ws/MDFeStatusServico/"
+            "MDFeStatusServico.asmx?wsdl",
+            urls,
+        )
+        self.assertIn("https://producao.ginfes.com.br/ServiceGinfesImpl?wsdl", urls)
+
+    def test_urls_wsdl_provedor_indisponivel(self):
+        def sem_biblioteca(*args):
+            raise ImportError("nfselib")
+
+        def com_erro(*args):
+            raise ValueError("provedor")
+
+        cidades = "erpbrasil.edoc.provedores.cidades.cidades"
+        # O logging.config.dictConfig de outros testes desativa os loggers
+        # existentes: o logger do módulo é substituído
+        with mock.patch.dict(cidades, {1: sem_biblioteca}, clear=True), mock.patch(
+            "erpbrasil.edoc.wsdl._logger"
+        ) as logger:
+            urls_wsdl()
+        logger.warning.assert_called_once()
+        self.assertEqual(logger.warning.call_args[0][1:3], ("sem_biblioteca", 1))
+        with mock.patch.dict(cidades, {1: com_erro}, clear=True), self.assertRaises(
+            ValueError
+        ):
+            urls_wsdl()
+
+    def test_inicio_sem_rede(self):
+        with ServidorSefazStub(self.certificate) as stub:
+            url = stub.url("NFeStatusServico4")
+            atualizadas, falhas = atualizar_cache_wsdl(
+                self.certificate, self.diretorio.name, urls=[url]
+            )
+            self.assertEqual((atualizadas, falhas), ([url], []))
+            self.assertEqual(stub.contadores["wsdl"], 1)
+
+            pool = PoolClientes(cache=CacheWSDL(self.diretorio.name))
+            self.addCleanup(pool.limpar)
+            nfe = NFe(TransmissaoSOAP(self.certificate, cache=False), "35")
+            nfe._pool_clientes = pool
+            with mock.patch("erpbrasil.edoc.nfe.localizar_url", return_value=url):
+                self.assertEqual(nfe.status_servico().resposta.cStat, "107")
+            self.assertEqual(stub.contadores["wsdl"], 1)
+
+
+class CliTests(TestCase):
+    def executar(self, senha=None, resultado=(["url"], [])):
+        with mock.patch.dict(os.environ), mock.patch(
+            "erpbrasil.assinatura.certificado.Certificado"
+        ) as certificado, mock.patch(
+            "erpbrasil.edoc.wsdl.atualizar_cache_wsdl", return_value=resultado
+        ), mock.patch("getpass.getpass", return_value="digitada") as getpass:
+            os.environ.pop(cli.VARIAVEL_SENHA_CERTIFICADO, None)
+            if senha is not None:
+                os.environ[cli.VARIAVEL_SENHA_CERTIFICADO] = senha
+            retorno = cli.main(
+                ["erpbrasil.edoc", "atualizar-wsdl", "--certificado", "a.pfx"]
+            )
+        return retorno, certificado, getpass
+
+    def test_senha_do_ambiente(self):
+        retorno, certificado, getpass = self.executar("secreta")
+        self.assertEqual(retorno, 0)
+        certificado.assert_called_once_with("a.pfx", "secreta")
+        getpass.assert_not_called()
+
+    def test_senha_solicitada(self):
+        retorno, certificado, getpass = self.executar()
+        self.assertEqual(retorno, 0)
+        certificado.assert_called_once_with("a.pfx", "digitada")
+        getpass.assert_called_once()
+
+    def test_falhas(self):
+        # Qualquer falha resulta em erro, mesmo com outros WSDL atualizados
+        with mock.patch("builtins.print"):
+            retorno, _, _ = self.executar("secreta", (["url"], ["outra"]))
+            self.assertEqual(retorno, 1)
+            retorno, _, _ = self.executar("secreta", ([], ["outra"]))
+            self.assertEqual(retorno, 1)